@@ -0,0 +1,274 @@
+"""
+Benchmark of the iOSBuild orchestration using stand-in `cmake` and `xcodebuild`.
+
+The full `build.iosBuild` pipeline is run for a synthetic project with the
+stand-in tools in `tests/tools`, which have configurable latency and produce
+synthetic static libraries, so no network, CMake or Xcode is required. For
+each number of platforms and libraries the wall time is split into the time
+spent inside the tools and the orchestration overhead (everything else,
+including starting each tool process). Results are stored as JSON and may be
+compared against a saved baseline.
+
+Usage:
+    python benchmarks/bench_build.py --platforms 1 3 19 --libraries 1 100 500
+    python benchmarks/bench_build.py --output results.json
+    python benchmarks/bench_build.py --baseline results.json --tolerance 0.2
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from ios_build import build  # noqa: E402
+from ios_build.parser import PLATFORMS  # noqa: E402
+from ios_build.printer import Printer  # noqa: E402
+
+TOOLS = os.path.join(ROOT, "tests", "tools")
+
+
+def readTimes(times_file: str) -> list[dict]:
+    if not os.path.isfile(times_file):
+        return []
+
+    with open(times_file) as f:
+        return [json.loads(line) for line in f]
+
+
+def toolTime(times: list[dict]) -> float:
+    """
+    Total time during which at least one tool was running, so that concurrent
+    invocations are not counted twice.
+
+    Args:
+        times (list[dict]): Start and end time of each invocation.
+
+    Returns:
+        float: Time in seconds
+    """
+    total = 0
+    end = None
+    for record in sorted(times, key=lambda record: record["start"]):
+        start = record["start"] if end is None else max(record["start"], end)
+        if record["end"] > start:
+            total += record["end"] - start
+        end = record["end"] if end is None else max(end, record["end"])
+
+    return total
+
+
+def runOnce(
+    n_platforms: int, n_libraries: int, jobs: int, latency: float, size: int
+) -> dict:
+    """
+    Run a complete build of a synthetic project in a new temporary directory.
+
+    Returns:
+        dict: Wall time, tool time and number of tool invocations
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "project")
+        os.makedirs(path)
+        with open(os.path.join(path, "CMakeLists.txt"), "w") as f:
+            f.write("project(benchmark)\n")
+        toolchain = os.path.join(tmp, "ios.toolchain.cmake")
+        with open(toolchain, "w") as f:
+            f.write("# stand-in toolchain\n")
+
+        times_file = os.path.join(tmp, "times.jsonl")
+        os.environ.update(
+            {
+                "IOS_BUILD_FAKE_TIMES": times_file,
+                "IOS_BUILD_FAKE_LIBRARIES": str(n_libraries),
+                "IOS_BUILD_FAKE_LIBRARY_SIZE": str(size),
+                "IOS_BUILD_FAKE_LATENCY": str(latency),
+            }
+        )
+
+        start = time.perf_counter()
+        build.iosBuild(
+            path=path,
+            build_prefix=os.path.join(tmp, "build"),
+            install_prefix=os.path.join(tmp, "install"),
+            output_dir=os.path.join(tmp, "output"),
+            toolchain=toolchain,
+            platforms=PLATFORMS[:n_platforms],
+            jobs=jobs,
+            cmake_command=os.path.join(TOOLS, "cmake"),
+            xcode_build_command=os.path.join(TOOLS, "xcodebuild"),
+            printer=Printer(print_level=-1),
+        )
+        wall = time.perf_counter() - start
+
+        frameworks = os.listdir(os.path.join(tmp, "output"))
+        assert len(frameworks) == n_libraries, "Missing frameworks"
+
+        times = readTimes(times_file)
+
+    tool = toolTime(times)
+    return {"wall": wall, "tool": tool, "overhead": wall - tool, "calls": len(times)}
+
+
+def benchmark(
+    n_platforms: int,
+    n_libraries: int,
+    jobs: int = 1,
+    latency: float = 0,
+    size: int = 0,
+    repeat: int = 3,
+) -> dict:
+    """
+    Time the fastest of `repeat` builds of `n_libraries` libraries for `n_platforms` platforms.
+
+    Returns:
+        dict: Benchmark parameters and timings in seconds
+    """
+    runs = [
+        runOnce(n_platforms, n_libraries, jobs, latency, size) for _ in range(repeat)
+    ]
+    best = min(runs, key=lambda run: run["wall"])
+
+    return {
+        "platforms": n_platforms,
+        "libraries": n_libraries,
+        "jobs": jobs,
+        **best,
+        "overhead_per_call": best["overhead"] / max(best["calls"], 1),
+    }
+
+
+def resultKey(result: dict) -> tuple:
+    return result["platforms"], result["libraries"], result["jobs"]
+
+
+def compare(results: list[dict], baseline: dict, tolerance: float) -> list[dict]:
+    """
+    Compare the wall time of each benchmark with the baseline.
+
+    Args:
+        results (list[dict]): Benchmark results
+        baseline (dict): Saved results of a previous run
+        tolerance (float): Allowed fractional increase in wall time
+
+    Returns:
+        list[dict]: Results which are slower than the baseline by more than `tolerance`.
+    """
+    previous = {resultKey(result): result for result in baseline["results"]}
+
+    print()
+    print(
+        "{0:>9} {1:>9} {2:>4} {3:>10} {4:>10} {5:>7}".format(
+            "platforms", "libraries", "jobs", "baseline", "wall", "ratio"
+        )
+    )
+    regressions = []
+    for result in results:
+        base = previous.get(resultKey(result))
+        if base is None:
+            continue
+        ratio = result["wall"] / base["wall"]
+        flag = ""
+        if ratio > 1 + tolerance:
+            regressions.append(result)
+            flag = " !"
+        print(
+            "{0:>9} {1:>9} {2:>4} {3:>9.3f}s {4:>9.3f}s {5:>7.2f}{6}".format(
+                *resultKey(result), base["wall"], result["wall"], ratio, flag
+            )
+        )
+
+    return regressions
+
+
+def main(args=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().split("\n")[0])
+    parser.add_argument("--platforms", type=int, nargs="+", default=[1, 3, 19])
+    parser.add_argument("--libraries", type=int, nargs="+", default=[1, 100, 500])
+    parser.add_argument("--jobs", type=int, nargs="+", default=[1])
+    parser.add_argument(
+        "--latency", type=float, default=0, help="Latency of each tool invocation"
+    )
+    parser.add_argument(
+        "--size", type=int, default=0, help="Size of each synthetic library in bytes"
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", help="Save results to a JSON file")
+    parser.add_argument("--baseline", help="Compare with results saved in a JSON file")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.2,
+        help="Allowed fractional slowdown compared with the baseline",
+    )
+    options = parser.parse_args(args)
+
+    for n in options.platforms:
+        if not 1 <= n <= len(PLATFORMS):
+            parser.error("--platforms must be between 1 and {}".format(len(PLATFORMS)))
+
+    print(
+        "{0:>9} {1:>9} {2:>4} {3:>10} {4:>10} {5:>10} {6:>6} {7:>10}".format(
+            "platforms",
+            "libraries",
+            "jobs",
+            "wall",
+            "tools",
+            "overhead",
+            "calls",
+            "per call",
+        )
+    )
+    results = []
+    for jobs in options.jobs:
+        for n_platforms in options.platforms:
+            for n_libraries in options.libraries:
+                result = benchmark(
+                    n_platforms,
+                    n_libraries,
+                    jobs=jobs,
+                    latency=options.latency,
+                    size=options.size,
+                    repeat=options.repeat,
+                )
+                results.append(result)
+                print(
+                    "{platforms:>9} {libraries:>9} {jobs:>4} {wall:>9.3f}s "
+                    "{tool:>9.3f}s {overhead:>9.3f}s {calls:>6} "
+                    "{overhead_per_call:>8.4f}s".format(**result)
+                )
+
+    output = {
+        "python": platform.python_version(),
+        "system": platform.platform(),
+        "latency": options.latency,
+        "size": options.size,
+        "repeat": options.repeat,
+        "results": results,
+    }
+    if options.output:
+        with open(options.output, "w") as f:
+            json.dump(output, f, indent=2)
+
+    if options.baseline:
+        with open(options.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, options.tolerance)
+        if regressions:
+            print(
+                "{} benchmarks slower than baseline by more than {:.0%}".format(
+                    len(regressions), options.tolerance
+                )
+            )
+            return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,126 @@
+"""
+Benchmark of `ios_build.fingerprint` over synthetic source trees.
+
+For each tree size the fingerprint is timed cold (no index, every file hashed),
+warm (index present, nothing changed) and incremental (1% of files modified).
+
+Usage:
+    python benchmarks/bench_fingerprint.py --files 10000 100000
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ios_build import fingerprint  # noqa: E402
+
+
+def createTree(path: str, n: int, file_size: int = 2048, per_dir: int = 100):
+    """
+    Create a synthetic source tree of `n` files in directories of `per_dir` files.
+
+    Args:
+        path (str): Root of the tree
+        n (int): Number of files
+        file_size (int, optional): Size of each file in bytes. Defaults to 2048.
+        per_dir (int, optional): Number of files per directory. Defaults to 100.
+    """
+    for i in range(n):
+        directory = os.path.join(path, "src", "module{}".format(i // per_dir))
+        if i % per_dir == 0:
+            os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, "file{}.c".format(i)), "wb") as f:
+            f.write(os.urandom(file_size))
+
+
+def modifyTree(path: str, n: int, fraction: float = 0.01):
+    """
+    Modify a fraction of the files of a tree created by `createTree`.
+    """
+    step = max(1, int(1 / fraction))
+    for i in range(0, n, step):
+        filepath = os.path.join(
+            path, "src", "module{}".format(i // 100), "file{}.c".format(i)
+        )
+        with open(filepath, "ab") as f:
+            f.write(b"// modified\n")
+
+
+def timeit(function, *args, **kwargs):
+    start = time.perf_counter()
+    result = function(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+
+def benchmark(n: int, jobs: int = None) -> dict:
+    """
+    Time fingerprinting a synthetic tree of `n` files.
+
+    Returns:
+        dict: Timings in seconds
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "project")
+        index_file = os.path.join(tmp, "index.json")
+        createTree(path, n)
+
+        # Files written in the last two seconds are always rehashed
+        time.sleep(fingerprint.RACY_INTERVAL_NS / 1e9)
+
+        cold, result = timeit(
+            fingerprint.fingerprint, path, index_file=index_file, jobs=jobs
+        )
+        assert result.files == n
+        # Index written after the racy interval
+        cold2, _ = timeit(
+            fingerprint.fingerprint,
+            path,
+            index_file=os.path.join(tmp, "cold.json"),
+            jobs=jobs,
+        )
+        time.sleep(fingerprint.RACY_INTERVAL_NS / 1e9)
+        fingerprint.fingerprint(path, index_file=index_file, jobs=jobs)
+
+        warm, result = timeit(
+            fingerprint.fingerprint, path, index_file=index_file, jobs=jobs
+        )
+        assert result.changed == []
+
+        modifyTree(path, n)
+        incremental, result = timeit(
+            fingerprint.fingerprint, path, index_file=index_file, jobs=jobs
+        )
+        assert len(result.changed) == len(range(0, n, 100))
+
+    return {
+        "files": n,
+        "cold": min(cold, cold2),
+        "warm": warm,
+        "incremental": incremental,
+    }
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().split("\n")[0])
+    parser.add_argument("--files", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--jobs", type=int, default=None)
+    options = parser.parse_args(args)
+
+    print(
+        "{0:>8} {1:>10} {2:>10} {3:>12}".format("files", "cold", "warm", "incremental")
+    )
+    for n in options.files:
+        result = benchmark(n, jobs=options.jobs)
+        print(
+            "{files:>8} {cold:>9.3f}s {warm:>9.3f}s {incremental:>11.3f}s".format(
+                **result
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Benchmark of `ios_build.search.findlibraries` on a synthetic install tree.
+
+Each platform directory contains a large header tree, CMake package files,
+shared data and a number of static libraries. The scanner is compared with
+the previous `os.walk` based implementation.
+
+Usage:
+    python benchmarks/bench_search.py --platforms 6 --headers 20000 --libraries 50
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ios_build import search  # noqa: E402
+from ios_build.printer import Printer  # noqa: E402
+
+
+def walkLibraries(directory: str) -> dict[str, str]:
+    """
+    Previous implementation of `search.findPlatformLibraries` for reference.
+    """
+    libraries = {}
+    for root, dirs, files in os.walk(directory):
+        for file in files:
+            if file.endswith(".a"):
+                name = os.path.basename(file).split(".")[0]
+                libraries[name] = os.path.join(root, file)
+
+    return libraries
+
+
+def walkFindLibraries(install_dir: str, platforms: list[str]) -> dict:
+    libraries = {}
+    for platform in platforms:
+        libraries[platform] = walkLibraries(os.path.join(install_dir, platform))
+
+    return search.invertDict(libraries)
+
+
+def touch(*path):
+    with open(os.path.join(*path), "w"):
+        pass
+
+
+def createInstallTree(path: str, headers: int, libraries: int):
+    """
+    Create a synthetic install tree for one platform.
+    """
+    for i in range(headers):
+        directory = os.path.join(path, "include", "module{}".format(i // 200))
+        if i % 200 == 0:
+            os.makedirs(directory)
+        touch(directory, "header{}.h".format(i))
+
+    lib_dir = os.path.join(path, "lib")
+    for i in range(libraries):
+        package = os.path.join(lib_dir, "cmake", "lib{}".format(i))
+        os.makedirs(package)
+        touch(package, "lib{}Config.cmake".format(i))
+        touch(lib_dir, "lib{}.a".format(i))
+
+    for i in range(headers // 10):
+        directory = os.path.join(path, "share", "data{}".format(i // 100))
+        if i % 100 == 0:
+            os.makedirs(directory)
+        touch(directory, "data{}.txt".format(i))
+
+
+def timeit(function, *args, repeat: int = 3, **kwargs):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function(*args, **kwargs)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+
+    return best, result
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().split("\n")[0])
+    parser.add_argument("--platforms", type=int, default=6)
+    parser.add_argument("--headers", type=int, default=20000)
+    parser.add_argument("--libraries", type=int, default=50)
+    parser.add_argument("--jobs", type=int, default=None)
+    options = parser.parse_args(args)
+
+    platforms = ["PLATFORM{}".format(i) for i in range(options.platforms)]
+    jobs = options.jobs or options.platforms
+    printer = Printer(print_level=-1)
+
+    with tempfile.TemporaryDirectory() as install_dir:
+        for platform in platforms:
+            createInstallTree(
+                os.path.join(install_dir, platform), options.headers, options.libraries
+            )
+
+        walk, expected = timeit(walkFindLibraries, install_dir, platforms)
+        scan, result = timeit(
+            search.findlibraries,
+            install_dir,
+            platforms=platforms,
+            jobs=jobs,
+            printer=printer,
+        )
+        assert result == expected
+
+    print(
+        "Platforms: {0}, headers: {1}, libraries: {2}".format(
+            options.platforms, options.headers, options.libraries
+        )
+    )
+    print("{0:<24} {1:>8.3f}s".format("os.walk (previous)", walk))
+    print("{0:<24} {1:>8.3f}s".format("scandir, {} jobs".format(jobs), scan))
+    print("{0:<24} {1:>8.1f}x".format("Speed up", walk / scan))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+"""
+Benchmark of the iOSBuild cold start on the `--help` and parse error paths.
+
+Each path is run in a new interpreter with `python -X importtime` and the
+import time of every module which is not already imported by a bare
+interpreter is summed, so the result is the cost of starting iOSBuild rather
+than Python. The run fails if the import time of any path exceeds the budget
+or if a module which is only needed to build, such as `requests`, is imported.
+
+The runner only parses arguments on macOS, so the platform is reported as
+macOS once the runner has been imported.
+
+Usage:
+    python benchmarks/bench_startup.py
+    python benchmarks/bench_startup.py --budget 50 --repeat 10
+    python benchmarks/bench_startup.py --output results.json
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Maximum import time in milliseconds of iOSBuild before arguments are parsed
+BUDGET = 75
+
+# Modules which must not be imported to print help or report invalid arguments
+FORBIDDEN = ["requests", "urllib3", "asyncio", "sqlite3", "ios_build.build"]
+
+PATHS = {
+    "help": ["--help"],
+    "parse-error": ["example", "-DPLATFORM=IOS"],
+    "missing-argument": [],
+    "stats-help": ["stats", "--help"],
+}
+
+SCRIPT = """
+import sys
+from ios_build import run
+sys.platform = "darwin"
+status = run.runner(args={args!r})
+print("IOS_BUILD_MODULES=" + ",".join(sorted(sys.modules)), file=sys.stderr)
+sys.exit(status)
+"""
+
+
+def parseImportTimes(stderr: str) -> dict[str, int]:
+    """
+    Self import time in microseconds of each module in `-X importtime` output.
+    """
+    times = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:") :].split("|")
+        if not fields[0].strip().isdigit():
+            continue
+        times[fields[2].strip()] = int(fields[0])
+
+    return times
+
+
+def runOnce(args: list[str] = None) -> dict:
+    """
+    Run the iOSBuild runner with `args` in a new interpreter, or a bare
+    interpreter if `args` is None.
+
+    Returns:
+        dict: Wall time in seconds, import times and imported modules.
+    """
+    script = "pass" if args is None else SCRIPT.format(args=args)
+    start = time.perf_counter()
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", script],
+        cwd=ROOT,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        text=True,
+    )
+    wall = time.perf_counter() - start
+
+    modules = []
+    for line in process.stderr.splitlines():
+        if line.startswith("IOS_BUILD_MODULES="):
+            modules = line[len("IOS_BUILD_MODULES=") :].split(",")
+
+    return {
+        "wall": wall,
+        "status": process.returncode,
+        "imports": parseImportTimes(process.stderr),
+        "modules": modules,
+    }
+
+
+def benchmark(name: str, args: list[str], baseline: set[str], repeat: int) -> dict:
+    """
+    Median wall and import time of `repeat` runs of a startup path, excluding
+    modules in `baseline`.
+    """
+    runs = [runOnce(args) for _ in range(repeat)]
+    imports = [
+        sum(t for module, t in run["imports"].items() if module not in baseline)
+        for run in runs
+    ]
+    slowest = {}
+    for run in runs:
+        for module, t in run["imports"].items():
+            if module not in baseline:
+                slowest[module] = max(slowest.get(module, 0), t)
+
+    return {
+        "path": name,
+        "args": args,
+        "status": runs[0]["status"],
+        "wall": statistics.median(run["wall"] for run in runs),
+        "import": statistics.median(imports) / 1e6,
+        "forbidden": [m for m in FORBIDDEN if m in runs[0]["modules"]],
+        "slowest": sorted(slowest, key=slowest.get, reverse=True)[:5],
+    }
+
+
+def main(args=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().split("\n")[0])
+    parser.add_argument(
+        "--budget",
+        type=float,
+        default=BUDGET,
+        help="Maximum import time in milliseconds (default={})".format(BUDGET),
+    )
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", help="Save results to a JSON file")
+    options = parser.parse_args(args)
+
+    baseline = set()
+    for _ in range(options.repeat):
+        baseline.update(runOnce()["imports"])
+
+    results = []
+    print(
+        "{0:>18} {1:>8} {2:>10} {3:>10}  {4}".format(
+            "path", "status", "wall (ms)", "import (ms)", "slowest imports"
+        )
+    )
+    for name, path_args in PATHS.items():
+        result = benchmark(name, path_args, baseline, options.repeat)
+        results.append(result)
+        print(
+            "{path:>18} {status:>8} {0:>10.1f} {1:>10.1f}  {2}".format(
+                result["wall"] * 1e3,
+                result["import"] * 1e3,
+                ", ".join(result["slowest"]),
+                **result,
+            )
+        )
+
+    if options.output:
+        with open(options.output, "w") as f:
+            json.dump({"budget": options.budget, "results": results}, f, indent=2)
+
+    failures = 0
+    for result in results:
+        if result["import"] * 1e3 > options.budget:
+            print(
+                "{0}: import time {1:.1f} ms exceeds budget of {2:.1f} ms".format(
+                    result["path"], result["import"] * 1e3, options.budget
+                )
+            )
+            failures += 1
+        if result["forbidden"]:
+            print(
+                "{0}: imports {1}".format(
+                    result["path"], ", ".join(result["forbidden"])
+                )
+            )
+            failures += 1
+
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
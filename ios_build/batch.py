@@ -0,0 +1,418 @@
+import os
+import concurrent.futures
+
+try:
+    import tomllib
+except ImportError:  # Python < 3.11
+    import tomli as tomllib
+
+from ios_build import build
+from ios_build.parser import parse, checkOptions, sortCMakeOptions
+from ios_build.toolchain import getToolchain
+from ios_build.printer import Printer, getPrinter
+from ios_build.trace import Tracer, getTracer, writeTrace
+from ios_build.errors import IOSBuildError
+
+# Options of each project which are paths relative to the manifest
+PATH_OPTIONS = ["path", "build_prefix", "install_prefix", "output_dir", "log_dir"]
+
+# Options of a project which have no command line option
+EXTRA_OPTIONS = ["platform_options", "xcode_build_command"]
+
+# Options of the `batch` command which may not be set by the manifest
+BATCH_OPTIONS = ["print_level", "watch", "trace_file"]
+
+# Parent directories of the build, install and output directory of each project
+DEFAULT_DIRECTORIES = {
+    "build_prefix": "build",
+    "install_prefix": "install",
+    "output_dir": "output",
+}
+
+
+def cmakeValue(value) -> str:
+    """
+    Convert a TOML value to a CMake cache value.
+    """
+    if isinstance(value, bool):
+        return "ON" if value else "OFF"
+    if isinstance(value, list):
+        return ";".join(cmakeValue(v) for v in value)
+
+    return str(value)
+
+
+def projectOptions(name: str, options: dict, defaults: dict, manifest_dir: str) -> dict:
+    """
+    Resolve the options of project `name` in a manifest. Options are those of
+    the command line (named as in the output of `parser.parse`), project options
+    override the manifest `defaults`. Values are checked as on the command
+    line, see `parser.checkOptions`. Relative paths are relative to the manifest
+    and each project is built, installed and output in its own subdirectory
+    of the default directories.
+
+    Args:
+        name (str): Project name
+        options (dict): Options of the project in the manifest.
+        defaults (dict): Options of all projects in the manifest.
+        manifest_dir (str): Directory containing the manifest.
+
+    Raises:
+        IOSBuildError: Raised if an option is unknown, invalid or missing.
+
+    Returns:
+        dict: Options of the project for `build.iosBuild`, and its `depends`.
+    """
+    options = dict(options)
+    depends = options.pop("depends", [])
+    if "path" not in options:
+        raise IOSBuildError("No path specified for project {}".format(name))
+
+    kwargs = parse(args=[options["path"]])
+    known = [*kwargs, *EXTRA_OPTIONS]
+    for key in [*defaults, *options]:
+        if key not in known or key in BATCH_OPTIONS:
+            raise IOSBuildError("Unknown option for project {0}: {1}".format(name, key))
+
+    for key, directory in DEFAULT_DIRECTORIES.items():
+        if key not in options:
+            options[key] = os.path.join(defaults.get(key, directory), name)
+    try:
+        kwargs.update(checkOptions({**defaults, **options}))
+    except IOSBuildError as error:
+        raise IOSBuildError("Invalid option for project {0}: {1}".format(name, error))
+
+    for key in PATH_OPTIONS:
+        if kwargs.get(key):
+            kwargs[key] = os.path.abspath(os.path.join(manifest_dir, kwargs[key]))
+    toolchain = kwargs["toolchain"]
+    kwargs["toolchain"] = [
+        mirror if "://" in mirror else os.path.join(manifest_dir, mirror)
+        for mirror in ([toolchain] if isinstance(toolchain, str) else toolchain)
+    ]
+
+    cmake_options = {
+        **defaults.get("cmake_options", {}),
+        **options.get("cmake_options", {}),
+    }
+    kwargs["cmake_options"] = sortCMakeOptions(
+        ["{0}={1}".format(k, cmakeValue(v)) for k, v in cmake_options.items()]
+    )
+
+    return {**kwargs, "depends": list(depends)}
+
+
+def loadManifest(manifest_file: str) -> dict[str, dict]:
+    """
+    Load a TOML manifest of CMake projects. The `defaults` table contains
+    options of all projects and each table in `projects` contains the `path` and
+    options of a project, with the names of the projects it `depends` on.
+
+    Args:
+        manifest_file (str): Path to manifest file
+
+    Raises:
+        IOSBuildError: Raised if the manifest is invalid.
+
+    Returns:
+        dict[str, dict]: Options of each project keyed by name, see `projectOptions`.
+    """
+    try:
+        with open(manifest_file, "rb") as f:
+            manifest = tomllib.load(f)
+    except OSError as error:
+        raise IOSBuildError("Cannot read manifest: {}".format(error))
+    except tomllib.TOMLDecodeError as error:
+        raise IOSBuildError("Invalid manifest {0}: {1}".format(manifest_file, error))
+
+    projects = manifest.get("projects", {})
+    if not projects:
+        raise IOSBuildError("No projects in manifest: {}".format(manifest_file))
+
+    manifest_dir = os.path.dirname(os.path.abspath(manifest_file))
+    defaults = manifest.get("defaults", {})
+    projects = {
+        name: projectOptions(name, options, defaults, manifest_dir)
+        for name, options in projects.items()
+    }
+
+    for name, project in projects.items():
+        for dependency in project["depends"]:
+            if dependency not in projects:
+                raise IOSBuildError(
+                    "Unknown dependency of project {0}: {1}".format(name, dependency)
+                )
+            missing = set(project["platforms"]) - set(projects[dependency]["platforms"])
+            if missing:
+                raise IOSBuildError(
+                    "Project {0} depends on {1} which is not built for {2}".format(
+                        name, dependency, ", ".join(sorted(missing))
+                    )
+                )
+    dependencyOrder({name: project["depends"] for name, project in projects.items()})
+
+    return projects
+
+
+def dependencyOrder(dependencies: dict[str, list[str]]) -> list[str]:
+    """
+    Order items so that each item follows all of its dependencies.
+
+    Args:
+        dependencies (dict[str, list[str]]): Dependencies of each item.
+
+    Raises:
+        IOSBuildError: Raised if the dependencies contain a cycle.
+
+    Returns:
+        list[str]: Items in dependency order
+    """
+    order = []
+    state = {}
+
+    def visit(item, path):
+        if state.get(item) == "done":
+            return
+        if state.get(item) == "visiting":
+            cycle = path[path.index(item) :] + [item]
+            raise IOSBuildError("Dependency cycle: {}".format(" -> ".join(cycle)))
+        state[item] = "visiting"
+        for dependency in dependencies[item]:
+            visit(dependency, path + [item])
+        state[item] = "done"
+        order.append(item)
+
+    for item in dependencies:
+        visit(item, [])
+
+    return order
+
+
+def allDependencies(name: str, projects: dict[str, dict]) -> list[str]:
+    """
+    Direct and indirect dependencies of project `name`, nearest first.
+    """
+    result = []
+    queue = list(projects[name]["depends"])
+    while queue:
+        dependency = queue.pop(0)
+        if dependency not in result:
+            result.append(dependency)
+            queue.extend(projects[dependency]["depends"])
+
+    return result
+
+
+def prefixPath(name: str, projects: dict[str, dict]) -> dict[str, dict]:
+    """
+    Platform options which add the install prefixes of all dependencies of
+    project `name` to `CMAKE_PREFIX_PATH`, after any value set by the project.
+
+    Args:
+        name (str): Project name
+        projects (dict[str, dict]): Options of each project, see `loadManifest`.
+
+    Returns:
+        dict[str, dict]: Platform options of the project
+    """
+    project = projects[name]
+    platform_options = {
+        platform: dict(options)
+        for platform, options in project.get("platform_options", {}).items()
+    }
+    dependencies = allDependencies(name, projects)
+    if not dependencies:
+        return platform_options
+
+    for platform in project["platforms"]:
+        options = platform_options.setdefault(platform, {})
+        user_path = options.get(
+            "CMAKE_PREFIX_PATH", project["cmake_options"].get("CMAKE_PREFIX_PATH")
+        )
+        prefixes = [user_path] if user_path else []
+        for dependency in dependencies:
+            configs = projects[dependency]["configs"]
+            install_dir = projects[dependency]["install_prefix"]
+            for config in configs:
+                config_dir = build.configDirectory(install_dir, config, configs)
+                prefixes.append(os.path.join(config_dir, platform))
+        options["CMAKE_PREFIX_PATH"] = ";".join(prefixes)
+
+    return platform_options
+
+
+def runGraph(
+    function, dependencies: dict[str, list[str]], jobs: int = 1, **kwargs
+) -> tuple[dict, dict, list]:
+    """
+    Call `function(item, **kwargs)` for each item once all of its dependencies
+    have completed, using a pool of `jobs` threads. As in `build.runJobs`, the
+    output of concurrent jobs is buffered and exceptions are collected. Items
+    which depend on a failed item are skipped.
+
+    Args:
+        function: Function to call for each item.
+        dependencies (dict[str, list[str]]): Dependencies of each item.
+        jobs (int, optional): Maximum number of concurrent jobs. Defaults to 1.
+
+    Returns:
+        tuple[dict, dict, list]: Results and exceptions of each job, keyed by item, and the skipped items.
+    """
+    results = {}
+    errors = {}
+    skipped = []
+    pending = dict(dependencies)
+
+    printer = getPrinter(**kwargs)
+    with concurrent.futures.ThreadPoolExecutor(max_workers=jobs) as executor:
+        running = {}
+        while True:
+            failed = True
+            while failed:
+                failed = [
+                    item
+                    for item, items in pending.items()
+                    if any(d in errors or d in skipped for d in items)
+                ]
+                for item in failed:
+                    skipped.append(item)
+                    del pending[item]
+
+            ready = [
+                item
+                for item, items in pending.items()
+                if all(d in results for d in items)
+            ]
+            for item in ready:
+                del pending[item]
+                job_printer = printer.buffered() if jobs > 1 else printer
+                job_kwargs = {**kwargs, "printer": job_printer}
+                future = executor.submit(function, item, **job_kwargs)
+                running[future] = (item, job_printer)
+
+            if not running:
+                break
+
+            done, _ = concurrent.futures.wait(
+                running, return_when=concurrent.futures.FIRST_COMPLETED
+            )
+            for future in done:
+                item, job_printer = running.pop(future)
+                if job_printer is not printer:
+                    printer.printBuffer(job_printer)
+                try:
+                    results[item] = future.result()
+                except Exception as error:
+                    errors[item] = error
+
+    return results, errors, skipped
+
+
+def sharedToolchains(projects: dict[str, dict], **kwargs) -> dict[str, str]:
+    """
+    Check the tools and acquire the toolchain file once for all projects
+    which use the same commands and toolchain.
+
+    Args:
+        projects (dict[str, dict]): Options of each project, see `loadManifest`.
+
+    Returns:
+        dict[str, str]: Path to the toolchain file of each project.
+    """
+    checked = {}
+    toolchains = {}
+    result = {}
+    for name, project in projects.items():
+        tools = (
+            project["cmake_command"],
+            project.get("xcode_build_command", "xcodebuild"),
+        )
+        if tools not in checked:
+            build.checkTools(
+                cmake_command=tools[0], xcode_build_command=tools[1], **kwargs
+            )
+            checked[tools] = True
+
+        key = (
+            tuple(project["toolchain"]),
+            project["toolchain_sha256"],
+            project["offline"],
+        )
+        if key not in toolchains:
+            toolchains[key] = getToolchain(**{**project, **kwargs})
+        result[name] = toolchains[key]
+
+    return result
+
+
+def buildProject(name: str, projects: dict[str, dict], toolchains: dict, **kwargs):
+    """
+    Build project `name` using `build.iosBuild`, finding its dependencies
+    using `CMAKE_PREFIX_PATH`.
+    """
+    printer = getPrinter(**kwargs)
+    printer.printValue("Project", name, end="\n")
+
+    project = {k: v for k, v in projects[name].items() if k != "depends"}
+    project["platform_options"] = prefixPath(name, projects)
+    tracer = getTracer(**kwargs)
+    with tracer.span("project", project=name):
+        build.iosBuild(toolchain_path=toolchains[name], **{**project, **kwargs})
+
+
+def batch(manifest: str, jobs: int = 1, **kwargs):
+    """
+    Build every project in the `manifest`, see `loadManifest`. The tools and
+    toolchain are checked once, then projects are built once their dependencies
+    are installed, with up to `jobs` independent projects built concurrently.
+    Projects which depend on a failed project are skipped.
+
+    Args:
+        manifest (str): Path to manifest file
+        jobs (int, optional): Number of projects to build concurrently. Defaults to 1.
+    """
+    printer = getPrinter(**kwargs)
+    projects = loadManifest(manifest)
+    printer.printValue("Projects", ", ".join(projects), end="\n")
+
+    toolchains = sharedToolchains(projects, **kwargs)
+
+    dependencies = {name: project["depends"] for name, project in projects.items()}
+    results, errors, skipped = runGraph(
+        buildProject,
+        dependencies,
+        jobs=jobs,
+        projects=projects,
+        toolchains=toolchains,
+        **kwargs,
+    )
+
+    printer.printValue(
+        "Projects",
+        "{0} built, {1} failed, {2} skipped".format(
+            len(results), len(errors), len(skipped)
+        ),
+    )
+    for name in skipped:
+        printer.printStat("Project skipped: {}".format(name), tick="cross")
+    build.raiseErrors(errors, list(projects), "Project", **kwargs)
+
+
+def runBatch(print_level: int = 0, trace_file: str = None, **kwargs):
+    """
+    Run the `batch` command using the options obtained from the parser.
+
+    Args:
+        trace_file (str, optional): Write a Chrome trace of all builds to this file. Defaults to None.
+    """
+    printer = Printer(print_level=print_level)
+    tracer = Tracer(enabled=bool(trace_file))
+
+    printer.printHeader(**kwargs)
+
+    try:
+        batch(printer=printer, tracer=tracer, **kwargs)
+    finally:
+        writeTrace(tracer, trace_file, printer=printer)
+
+    printer.printFooter(**kwargs)
@@ -1,13 +1,27 @@
 import os
+import time
 import shutil
+import concurrent.futures
 
+from ios_build import cache
 from ios_build import cmake
+from ios_build import fingerprint
+from ios_build import generator
+from ios_build import history
+from ios_build import jobserver
+from ios_build import launcher
+from ios_build import schedule
 from ios_build import search
 from ios_build import xcodebuild
 from ios_build.toolchain import getToolchain
+from ios_build.parser import MULTI_CONFIG_GENERATORS
 from ios_build.printer import Printer, getPrinter
+from ios_build.trace import Tracer, getTracer, writeTrace
 from ios_build.errors import IOSBuildError
 
+# Names in the source tree which are not inputs of the build
+IGNORE_PATTERNS = [".*", "*.xcframework"]
+
 
 def checkPath(path: str, **kwargs):
     """
@@ -86,33 +100,82 @@ def setupDirectory(
     return new_dir
 
 
-def createFrameworks(install_dir: str, output_dir: str = None, **kwargs):
+def createFrameworks(
+    install_dir: str,
+    output_dir: str = None,
+    jobs: int = 1,
+    framework_jobs: int = None,
+    libraries: dict[str, dict[str, str]] = None,
+    **kwargs,
+):
     """
     Searches for static libraries in the `install_dir` and uses them to create
     an `xcframework` for each. The framework contains versions of the library
-    for each platform.
+    for each platform. Up to `framework_jobs` frameworks are created concurrently,
+    failures are collected so that every library is attempted.
+    If `libraries` is specified, only frameworks for those libraries are created
+    and any existing frameworks for them are replaced. The sizes of the
+    libraries and frameworks are recorded in the build history.
 
     Args:
         install_dir (str): Parent directory containing static libraries for all platforms.
+        output_dir (str, optional): Directory in which to create the frameworks.
+        jobs (int, optional): Number of concurrent jobs. Defaults to 1.
+        framework_jobs (int, optional): Number of frameworks to create concurrently. Defaults to `jobs`.
+        libraries (dict[str, dict[str, str]], optional): Libraries as returned by `search.findlibraries`. Defaults to None.
     """
     if not output_dir:
         raise ValueError("No output directory specified")
+    os.makedirs(output_dir, exist_ok=True)
 
     printer = getPrinter(**kwargs)
 
     printer.print("Creating XCFrameworks...", verbosity=1)
-    libraries = search.findlibraries(install_dir, **kwargs)
-
-    n = 0
-    for lib, files in libraries.items():
-        xcodebuild.createXCFramework(output_dir, lib, files, **kwargs)
-        printer.printValue(
-            "Created XC Framework",
-            "{}.xcframwork".format(os.path.join(output_dir, lib)),
-            end="\n",
+    if libraries is None:
+        libraries = search.findlibraries(install_dir, jobs=jobs, **kwargs)
+    else:
+        for lib in libraries:
+            framework = os.path.join(output_dir, "{}.xcframework".format(lib))
+            if os.path.isdir(framework):
+                shutil.rmtree(framework)
+
+    def createFramework(lib, **job_kwargs):
+        tracer = getTracer(**job_kwargs)
+        with tracer.span("xcframework", library=lib):
+            xcodebuild.createXCFramework(output_dir, lib, libraries[lib], **job_kwargs)
+
+    tracer = getTracer(**kwargs)
+    start = time.monotonic()
+    with tracer.span("createFrameworks", libraries=len(libraries)):
+        results, errors = runJobs(
+            createFramework,
+            list(libraries),
+            jobs=framework_jobs or jobs,
+            keep_going=True,
+            **kwargs,
         )
-        n += 1
-    if n == 0:
+
+    recorder = history.getRecorder(**kwargs)
+    recorder.step("frameworks", time.monotonic() - start)
+    if recorder.enabled:
+        for lib in libraries:
+            for platform, library_file in libraries[lib].items():
+                size = os.path.getsize(library_file)
+                recorder.artifact("library", lib, size, platform=platform)
+            if lib in results:
+                framework = os.path.join(output_dir, "{}.xcframework".format(lib))
+                recorder.artifact("xcframework", lib, cache.treeSize(framework))
+
+    for lib in libraries:
+        if lib in results:
+            printer.printValue(
+                "Created XC Framework",
+                "{}.xcframwork".format(os.path.join(output_dir, lib)),
+                end="\n",
+            )
+    raiseErrors(errors, list(libraries), "XC Framework", **kwargs)
+
+    if not libraries:
         printer.print("No frameworks created", end="\t")
         printer.cross()
 
@@ -130,70 +193,403 @@ def cleanUp(build_dir: str, install_dir: str, clean_up: bool = False, **kwargs):
     """
     printer = getPrinter(**kwargs)
     printer.printStat("Cleaning Up", tick=False)
-    if clean_up:
-        shutil.rmtree(build_dir)
-        shutil.rmtree(install_dir)  # TODO Remove install_dir?
+    tracer = getTracer(**kwargs)
+    with tracer.span("cleanUp", clean_up=clean_up):
+        if clean_up:
+            shutil.rmtree(build_dir)
+            shutil.rmtree(install_dir)  # TODO Remove install_dir?
     printer.tick()
 
 
-def build(build_dir: str, platforms: list[str] = None, **kwargs):
+def runJobs(
+    function, items: list, jobs: int = 1, keep_going: bool = False, **kwargs
+) -> tuple[dict, dict]:
+    """
+    Call `function(item, **kwargs)` for each item in `items` using a pool of `jobs`
+    threads. The output of each job is buffered and printed in one piece when
+    the job completes so that the output of concurrent jobs is not interleaved.
+    Exceptions are collected rather than raised. If `jobs` is 1 the items are
+    run in order without buffering and stop at the first failure, unless
+    `keep_going` is specified, in which case every item is attempted.
+
+    Args:
+        function: Function to call for each item.
+        items (list): Items to process.
+        jobs (int, optional): Maximum number of concurrent jobs. Defaults to 1.
+        keep_going (bool, optional): Attempt every item when run in order. Defaults to False.
+
+    Returns:
+        tuple[dict, dict]: Results and exceptions of each job, keyed by item.
+    """
+    results = {}
+    errors = {}
+    if jobs <= 1:
+        for item in items:
+            try:
+                results[item] = function(item, **kwargs)
+            except Exception as error:
+                errors[item] = error
+                if not keep_going:
+                    break
+        return results, errors
+
+    printer = getPrinter(**kwargs)
+    with concurrent.futures.ThreadPoolExecutor(max_workers=jobs) as executor:
+        futures = {}
+        for item in items:
+            job_printer = printer.buffered()
+            job_kwargs = {**kwargs, "printer": job_printer}
+            future = executor.submit(function, item, **job_kwargs)
+            futures[future] = (item, job_printer)
+
+        for future in concurrent.futures.as_completed(futures):
+            item, job_printer = futures[future]
+            printer.printBuffer(job_printer)
+            try:
+                results[item] = future.result()
+            except Exception as error:
+                errors[item] = error
+
+    return results, errors
+
+
+def raiseErrors(errors: dict, items: list, name: str, **kwargs):
+    """
+    Report the items which failed in `runJobs` and raise the exception of the first
+    failed item (in the order of `items`), so that the error type is preserved.
+
+    Args:
+        errors (dict): Exceptions keyed by item.
+        items (list): All items in their original order.
+        name (str): Description of the items used in the report.
+    """
+    if not errors:
+        return
+
+    printer = getPrinter(**kwargs)
+    failed = [item for item in items if item in errors]
+    for item in failed:
+        printer.printStat("{} failed: {}".format(name, item), tick="cross")
+
+    raise errors[failed[0]]
+
+
+def configDirectory(directory: str, config: str, configs: list[str]) -> str:
+    """
+    Directory of `config` within `directory`, which is only separated by
+    configuration when more than one of `configs` is built.
+
+    Args:
+        directory (str): Install or output directory
+        config (str): CMake configuration
+        configs (list[str]): All configurations built
+
+    Returns:
+        str: Path to directory
+    """
+    if len(configs) == 1 or not directory:
+        return directory
+
+    return os.path.join(directory, config)
+
+
+def buildPlatform(
+    platform: str,
+    build_dir: str = None,
+    build_cache: bool = False,
+    configs: list[str] = None,
+    config_jobs: int = 1,
+    **kwargs,
+) -> dict[str, float]:
+    """
+    Setup the build directory for `platform` and run CMake for it.
+    If the build cache is enabled and contains the results of identical
+    builds of all `configs`, the installed trees are restored from the cache instead.
+    Multi-config generators configure the platform once and build each of
+    `configs` in the same build directory. Single-config generators configure
+    a build directory for each configuration, up to `config_jobs` of which are
+    built concurrently.
+
+    Args:
+        platform (str): Platform to build.
+        build_dir (str, optional): Parent directory for all build files. Defaults to None.
+        build_cache (bool, optional): Use the build cache. Defaults to False.
+        configs (list[str], optional): CMake configurations to build. Defaults to Release.
+        config_jobs (int, optional): Number of configurations to build concurrently. Defaults to 1.
+
+    Returns:
+        dict[str, float]: Duration in seconds of each CMake step summed over
+        `configs`, see `cmake.runCMake`, or None if the platform was restored
+        from the build cache.
+    """
+    if configs is None:
+        configs = ["Release"]
+    printer = getPrinter(**kwargs)
+    printer.printValue("Platform", platform, end="\n")
+    tracer = getTracer(**kwargs)
+
+    install_prefixes = {
+        config: os.path.join(
+            configDirectory(kwargs["install_dir"], config, configs), platform
+        )
+        for config in configs
+    }
+
+    if build_cache:
+        keys = {
+            config: cache.buildKey(platform=platform, config=config, **kwargs)
+            for config in configs
+        }
+        with tracer.span("restoreCache", platform=platform):
+            restored = all(
+                [
+                    cache.restore(keys[config], install_prefixes[config], **kwargs)
+                    for config in configs
+                ]
+            )
+        history.getRecorder(**kwargs).cacheResult(restored)
+        if restored:
+            printer.printStat("Restored from build cache")
+            return None
+
+    platform_dir = setupDirectory(
+        platform, prefix=build_dir, name="Build directory", **kwargs
+    )
+    launcher.resetStats(platform_dir, **kwargs)
+
+    generator_name = kwargs.get("generator", "Xcode")
+    if len(configs) == 1 or generator_name in MULTI_CONFIG_GENERATORS:
+        times = cmake.runCMake(
+            platform=platform,
+            platform_dir=platform_dir,
+            configs=configs,
+            install_prefixes=install_prefixes,
+            **kwargs,
+        )
+        # Only complete builds of one configuration are comparable between generators
+        if "configure" in times and len(configs) == 1:
+            generator.recordTimes(generator_name, platform, times)
+    else:
+
+        def buildConfig(config, **job_kwargs):
+            config_dir = setupDirectory(
+                config, prefix=platform_dir, name="Build directory", **job_kwargs
+            )
+            return cmake.runCMake(
+                platform=platform,
+                platform_dir=config_dir,
+                configs=[config],
+                install_prefixes=install_prefixes,
+                log_name=os.path.join(platform, config),
+                **job_kwargs,
+            )
+
+        results, errors = runJobs(buildConfig, configs, jobs=config_jobs, **kwargs)
+        raiseErrors(errors, configs, "Configuration", **kwargs)
+        times = {}
+        for config_times in results.values():
+            for step, duration in config_times.items():
+                times[step] = times.get(step, 0) + duration
+
+    if build_cache:
+        with tracer.span("storeCache", platform=platform):
+            for config in configs:
+                cache.store(
+                    keys[config], install_prefixes[config], platform=platform, **kwargs
+                )
+
+    return times
+
+
+def build(
+    build_dir: str,
+    platforms: list[str] = None,
+    jobs: int = 1,
+    build_cache: bool = False,
+    **kwargs,
+):
     """
     Loop through each platform and run CMake for each.
     This includes the configure step, building and installation.
+    Up to `jobs` platforms are built concurrently, the output of each
+    platform is printed once it completes. Concurrent platforms are started
+    longest first using the durations of previous builds, see `schedule`, and
+    the critical path of the platforms which were built is printed.
+    With a single-config generator, the configurations of each platform are
+    also built concurrently, sharing the `jobs` between the platforms so that
+    no more than `jobs` builds run at once. If `build_cache` is specified,
+    platforms are restored from the build cache where possible. If `max_procs`
+    is specified, all builds share a jobserver limiting the total number of
+    processes run by the native build tools.
 
     Args:
         build_dir (str): Parent directory for all build files
         platforms (list[str], optional): List of platforms to build. Defaults to None.
+        jobs (int, optional): Number of platforms to build concurrently. Defaults to 1.
+        build_cache (bool, optional): Use the build cache. Defaults to False.
+        max_procs (int, optional): Size of the jobserver. Defaults to None.
 
     Raises:
-        RuntimeError: _description_
+        RuntimeError: Raised if no platforms are specified.
     """
-    printer = getPrinter(**kwargs)
-
     if not platforms:
         raise RuntimeError("No platforms specified")
-    for platform in platforms:
-        printer.printValue("Platform", platform, end="\n")
 
-        platform_dir = setupDirectory(
-            platform, prefix=build_dir, name="Build directory", **kwargs
+    if build_cache:
+        ignore = [build_dir, kwargs.get("install_dir"), kwargs.get("output_dir")]
+        with getTracer(**kwargs).span("fingerprint"):
+            kwargs["source_digest"] = fingerprint.fingerprint(
+                kwargs["path"],
+                ignore=[d for d in ignore if d],
+                patterns=IGNORE_PATTERNS,
+            ).digest
+
+    printer = getPrinter(**kwargs)
+    order = platforms
+    if jobs > 1:
+        estimates = schedule.estimateDurations(kwargs["path"], platforms)
+        order = schedule.schedulePlatforms(platforms, estimates)
+        if estimates:
+            printer.printValue(
+                "Critical path estimate",
+                schedule.formatPath(
+                    *schedule.estimateCriticalPath(order, estimates, jobs)
+                ),
+            )
+
+    spans = {}
+
+    def timePlatform(platform, **job_kwargs):
+        start = time.monotonic()
+        times = buildPlatform(platform, **job_kwargs)
+        spans[platform] = (start, time.monotonic())
+        return times
+
+    tracer = getTracer(**kwargs)
+    launcher.resetAllStats(**kwargs)
+    with tracer.span("buildPlatforms", platforms=len(platforms)):
+        with jobserver.jobServer(**kwargs) as job_server:
+            results, errors = runJobs(
+                timePlatform,
+                order,
+                jobs=jobs,
+                build_dir=build_dir,
+                build_cache=build_cache,
+                config_jobs=max(1, jobs // len(platforms)),
+                job_server=job_server,
+                **kwargs,
+            )
+
+    if build_cache:
+        hits = sum(1 for times in results.values() if times is None)
+        printer.printValue(
+            "Build cache", "{0} hits, {1} misses".format(hits, len(results) - hits)
         )
 
-        cmake.runCMake(platform=platform, platform_dir=platform_dir, **kwargs)
+    recorder = history.getRecorder(**kwargs)
+    built = [p for p in platforms if p in results and results[p] is not None]
+    for platform in built:
+        start, end = spans[platform]
+        recorder.step("total", end - start, platform=platform)
+    if jobs > 1 and built:
+        path = schedule.criticalPath({platform: spans[platform] for platform in built})
+        printer.printValue("Critical path", schedule.formatPath(*path))
+    launcher.printStats(build_dir, built, **kwargs)
+
+    raiseErrors(errors, platforms, "Platform", **kwargs)
 
 
-def iosBuild(
+def checkTools(**kwargs):
+    """
+    Check the CMake and XCodeBuild commands are available.
+    """
+    cmake.checkCMake(**kwargs)
+    xcodebuild.checkXCodeBuild(**kwargs)
+
+
+def setupBuild(
     build_prefix: str = "build",
     install_prefix: str = "install",
+    log_dir: str = None,
+    toolchain_path: str = None,
     **kwargs,
-):
+) -> dict:
     """
-    Run the full iOSBuild using CMake and XCodeBuild for the CMake project
-    using the options obtained from the parser.
+    Check the required tools and the CMake project, setup the build, install
+    and log directories, obtain the toolchain file and resolve the generator.
+    If `toolchain_path` is specified, the tools have already been checked
+    (see `batch`) and the toolchain file is not acquired again.
 
     Args:
         build_prefix (str, optional): Build directory prefix. Defaults to "build".
         install_prefix (str, optional): Install directory prefix. Defaults to "install".
+        log_dir (str, optional): Directory for the log file of each step. Defaults to `logs` in the build directory.
+        toolchain_path (str, optional): Path to an existing toolchain file. Defaults to None.
+
+    Raises:
+        IOSBuildError: Raised if the build and install directories are the same.
+
+    Returns:
+        dict: The `build_dir`, `install_dir`, `log_dir`, `toolchain_path` and `generator`.
     """
-    cmake.checkCMake(**kwargs)
-    xcodebuild.checkXCodeBuild(**kwargs)
+    if not toolchain_path:
+        checkTools(**kwargs)
     checkPath(**kwargs)
 
     build_dir = setupDirectory(build_prefix, name="Build directory", **kwargs)
     install_dir = setupDirectory(install_prefix, name="Install directory", **kwargs)
     if build_dir == install_dir:
         raise IOSBuildError("Install directory cannot be the same as build directory")
+    log_dir = setupDirectory(
+        log_dir or os.path.join(build_dir, "logs"), name="Log directory", **kwargs
+    )
 
-    toolchain = getToolchain(**kwargs)
-    build(build_dir, install_dir=install_dir, toolchain_path=toolchain, **kwargs)
-
-    # TODO Add check for existing frameworks (they cause an error)
-    createFrameworks(install_dir, **kwargs)
+    toolchain = toolchain_path or getToolchain(**kwargs)
 
-    cleanUp(build_dir, install_dir, **kwargs)
+    return {
+        "build_dir": build_dir,
+        "install_dir": install_dir,
+        "log_dir": log_dir,
+        "toolchain_path": toolchain,
+        "generator": generator.resolveGenerator(**kwargs),
+    }
 
 
-def runBuild(print_level: int = 0, **kwargs):
+def iosBuild(**kwargs):
+    """
+    Run the full iOSBuild using CMake and XCodeBuild for the CMake project
+    using the options obtained from the parser. The run is recorded in the
+    build history, see `history.recordRun`.
+    """
+    tracer = getTracer(**kwargs)
+    with tracer.span("iosBuild"), history.recordRun(**kwargs) as recorder:
+        kwargs["recorder"] = recorder
+        directories = setupBuild(**kwargs)
+        kwargs["log_dir"] = directories["log_dir"]
+        kwargs["generator"] = directories["generator"]
+        kwargs["toolchain_path"] = directories["toolchain_path"]
+        build_dir = directories["build_dir"]
+        install_dir = directories["install_dir"]
+
+        build(build_dir, install_dir=install_dir, **kwargs)
+
+        # TODO Add check for existing frameworks (they cause an error)
+        configs = kwargs.get("configs", ["Release"])
+        for config in configs:
+            output_dir = configDirectory(kwargs.get("output_dir"), config, configs)
+            createFrameworks(
+                configDirectory(install_dir, config, configs),
+                **{
+                    **kwargs,
+                    "output_dir": output_dir,
+                    "recorder": recorder.bind(config),
+                },
+            )
+
+        cleanUp(build_dir, install_dir, **kwargs)
+
+
+def runBuild(print_level: int = 0, trace_file: str = None, **kwargs):
     """
     Run the full iOSBuild using CMake and XCodeBuild for the CMake project
     using the options obtained from the parser.
@@ -201,11 +597,16 @@ def runBuild(print_level: int = 0, **kwargs):
     Args:
         build_prefix (str, optional): Build directory prefix. Defaults to "build".
         install_prefix (str, optional): Install directory prefix. Defaults to "install".
+        trace_file (str, optional): Write a Chrome trace of the build to this file. Defaults to None.
     """
     printer = Printer(print_level=print_level)
+    tracer = Tracer(enabled=bool(trace_file))
 
     printer.printHeader(**kwargs)
 
-    iosBuild(printer=printer, **kwargs)
+    try:
+        iosBuild(printer=printer, tracer=tracer, **kwargs)
+    finally:
+        writeTrace(tracer, trace_file, printer=printer)
 
     printer.printFooter(**kwargs)
@@ -0,0 +1,236 @@
+import os
+import json
+import time
+import uuid
+import shutil
+import hashlib
+import threading
+
+from ios_build.printer import getPrinter
+
+CACHE_LOCK = threading.Lock()
+
+# Version of the build cache keys, incremented when the same inputs are built
+# differently, e.g. since single-config generators build with `CMAKE_BUILD_TYPE`
+KEY_VERSION = 2
+
+
+def cacheHome(*paths) -> str:
+    """
+    Path within the user cache directory for iOSBuild, `ios_build` in
+    `$XDG_CACHE_HOME` or `~/.cache`.
+
+    Returns:
+        str: Path to cache directory
+    """
+    cache_home = os.environ.get("XDG_CACHE_HOME") or os.path.join(
+        os.path.expanduser("~"), ".cache"
+    )
+    return os.path.join(cache_home, "ios_build", *paths)
+
+
+def buildKey(
+    platform: str = None,
+    source_digest: str = None,
+    toolchain_path: str = None,
+    cmake_options: dict = {},
+    platform_options: dict = {},
+    generator: str = "Xcode",
+    config: str = "Release",
+    **kwargs,
+) -> str:
+    """
+    Compute the build cache key of a platform. The key depends on all inputs of the
+    build: the source tree, the resolved CMake options, the generator, the build
+    configuration, the toolchain contents and the platform.
+
+    Args:
+        platform (str, optional): Target platform. Defaults to None.
+        source_digest (str, optional): Digest of the source tree. Defaults to None.
+        toolchain_path (str, optional): Path to toolchain file. Defaults to None.
+        cmake_options (dict, optional): CMake cache options. Defaults to {}.
+        platform_options (dict, optional): Platform specific cmake cache options. Defaults to {}.
+        generator (str, optional): CMake generator. Defaults to "Xcode".
+        config (str, optional): CMake configuration. Defaults to "Release".
+
+    Returns:
+        str: Hex digest of the build inputs
+    """
+    with open(toolchain_path, "rb") as f:
+        toolchain_digest = hashlib.sha256(f.read()).hexdigest()
+
+    inputs = {
+        "version": KEY_VERSION,
+        "platform": platform,
+        "source": source_digest,
+        "toolchain": toolchain_digest,
+        "cmake_options": cmake_options,
+        "platform_options": platform_options.get(platform, {}),
+        "generator": generator,
+        "config": config,
+    }
+    return hashlib.sha256(json.dumps(inputs, sort_keys=True).encode()).hexdigest()
+
+
+def cacheDirectory(build_cache_dir: str = None) -> str:
+    """
+    Directory of the build cache.
+
+    Args:
+        build_cache_dir (str, optional): Custom cache directory. Defaults to None.
+
+    Returns:
+        str: Path to build cache
+    """
+    if build_cache_dir:
+        return os.path.abspath(build_cache_dir)
+
+    return cacheHome("builds")
+
+
+def treeSize(path: str) -> int:
+    """
+    Total size of all files in a directory tree.
+
+    Args:
+        path (str): Root of directory tree
+
+    Returns:
+        int: Size in bytes
+    """
+    size = 0
+    for root, dirs, files in os.walk(path):
+        for file in files:
+            size += os.lstat(os.path.join(root, file)).st_size
+
+    return size
+
+
+def loadEntries(cache_dir: str) -> list[dict]:
+    """
+    Load the metadata of all entries in the build cache.
+
+    Args:
+        cache_dir (str): Path to build cache
+
+    Returns:
+        list[dict]: Entry metadata including the `key`, `size` and last use time `used`.
+    """
+    entries = []
+    if not os.path.isdir(cache_dir):
+        return entries
+
+    for key in os.listdir(cache_dir):
+        entry_dir = os.path.join(cache_dir, key)
+        try:
+            with open(os.path.join(entry_dir, "entry.json")) as f:
+                entry = json.load(f)
+            entry["key"] = key
+            entry["used"] = os.stat(entry_dir).st_mtime
+        except (OSError, ValueError):
+            continue
+        entries.append(entry)
+
+    return entries
+
+
+def evict(cache_dir: str, build_cache_size: int):
+    """
+    Remove the least recently used entries from the build cache until its
+    total size is at most `build_cache_size` MiB.
+
+    Args:
+        cache_dir (str): Path to build cache
+        build_cache_size (int): Maximum cache size in MiB
+
+    Returns:
+        list[str]: Keys of evicted entries
+    """
+    limit = build_cache_size * (1 << 20)
+    entries = sorted(loadEntries(cache_dir), key=lambda entry: entry["used"])
+    total = sum(entry["size"] for entry in entries)
+
+    evicted = []
+    for entry in entries:
+        if total <= limit:
+            break
+        shutil.rmtree(os.path.join(cache_dir, entry["key"]), ignore_errors=True)
+        total -= entry["size"]
+        evicted.append(entry["key"])
+
+    return evicted
+
+
+def restore(
+    key: str, install_platform_dir: str, build_cache_dir: str = None, **kwargs
+) -> bool:
+    """
+    Restore the installed tree of a platform from the build cache.
+
+    Args:
+        key (str): Build cache key, see `buildKey`.
+        install_platform_dir (str): Install directory of the platform.
+        build_cache_dir (str, optional): Custom cache directory. Defaults to None.
+
+    Returns:
+        bool: True if the cache contained the key.
+    """
+    entry_dir = os.path.join(cacheDirectory(build_cache_dir), key)
+    install_tree = os.path.join(entry_dir, "install")
+
+    # Entries may not be evicted by a concurrent `store` while being copied
+    with CACHE_LOCK:
+        if not os.path.isdir(install_tree):
+            return False
+
+        if os.path.isdir(install_platform_dir):
+            shutil.rmtree(install_platform_dir)
+        shutil.copytree(install_tree, install_platform_dir, symlinks=True)
+
+        # Mark as recently used
+        now = time.time()
+        os.utime(entry_dir, (now, now))
+
+    return True
+
+
+def store(
+    key: str,
+    install_platform_dir: str,
+    platform: str = None,
+    build_cache_dir: str = None,
+    build_cache_size: int = 4096,
+    **kwargs,
+):
+    """
+    Store the installed tree of a platform in the build cache, then evict the least
+    recently used entries if the cache exceeds `build_cache_size` MiB.
+
+    Args:
+        key (str): Build cache key, see `buildKey`.
+        install_platform_dir (str): Install directory of the platform.
+        platform (str, optional): Target platform. Defaults to None.
+        build_cache_dir (str, optional): Custom cache directory. Defaults to None.
+        build_cache_size (int, optional): Maximum cache size in MiB. Defaults to 4096.
+    """
+    cache_dir = cacheDirectory(build_cache_dir)
+    entry_dir = os.path.join(cache_dir, key)
+    if os.path.isdir(entry_dir) or not os.path.isdir(install_platform_dir):
+        return
+
+    # Copy to a temporary entry which is renamed once complete
+    tmp = os.path.join(cache_dir, ".tmp-{}".format(uuid.uuid4().hex))
+    shutil.copytree(install_platform_dir, os.path.join(tmp, "install"), symlinks=True)
+    with open(os.path.join(tmp, "entry.json"), "w") as f:
+        json.dump({"platform": platform, "size": treeSize(tmp)}, f)
+
+    with CACHE_LOCK:
+        try:
+            os.rename(tmp, entry_dir)
+        except OSError:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+        evicted = evict(cache_dir, build_cache_size)
+
+    printer = getPrinter(**kwargs)
+    printer.printValue("Build cache entries evicted", len(evicted), verbosity=1)
@@ -0,0 +1,123 @@
+import os
+import sys
+import json
+import socket
+import tempfile
+
+from ios_build.printer import Printer
+from ios_build.errors import IOSBuildError
+
+# Options which are paths relative to the working directory of the client
+PATH_OPTIONS = [
+    "path",
+    "build_prefix",
+    "install_prefix",
+    "output_dir",
+    "log_dir",
+    "trace_file",
+    "toolchain_cache",
+    "build_cache_dir",
+    "compiler_cache_dir",
+]
+
+# Options of the client which are not sent to the build server
+CLIENT_OPTIONS = ["server", "watch", "watch_interval", "watch_debounce", "printer"]
+
+
+def requestOptions(**kwargs) -> dict:
+    """
+    Options of a build sent to the build server. Paths are made absolute, as the
+    server has a different working directory, and temporary directories created
+    by the parser are left for the server to choose.
+
+    Returns:
+        dict: Options which may be encoded as JSON
+    """
+    options = {}
+    for key, value in kwargs.items():
+        if key in CLIENT_OPTIONS or isinstance(value, tempfile.TemporaryDirectory):
+            continue
+        if key in PATH_OPTIONS and value:
+            value = os.path.abspath(value)
+        options[key] = value
+
+    toolchain = options.get("toolchain")
+    if toolchain:
+        mirrors = [toolchain] if isinstance(toolchain, str) else toolchain
+        options["toolchain"] = [
+            mirror if "://" in mirror else os.path.abspath(mirror) for mirror in mirrors
+        ]
+
+    return options
+
+
+def sendRequest(socket_path: str, request: dict):
+    """
+    Send a request to the build server and read the events it sends in reply.
+
+    Args:
+        socket_path (str): Path to the Unix domain socket of the server
+        request (dict): Request
+
+    Raises:
+        IOSBuildError: Raised if the server is not running.
+
+    Yields:
+        dict: Each event sent by the server
+    """
+    connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        connection.connect(socket_path)
+    except OSError as error:
+        connection.close()
+        raise IOSBuildError(
+            "Cannot connect to build server at {0}: {1}".format(socket_path, error)
+        )
+
+    with connection, connection.makefile("rwb") as stream:
+        stream.write(json.dumps(request).encode() + b"\n")
+        stream.flush()
+        for line in stream:
+            yield json.loads(line)
+
+
+def runClient(server: str = None, print_level: int = 0, **kwargs) -> int:
+    """
+    Run a build on the build server listening on the socket `server`. The
+    output of the build is printed as it is received.
+
+    Args:
+        server (str, optional): Path to the Unix domain socket of the server. Defaults to None.
+        print_level (int, optional): Verbosity of the build output. Defaults to 0.
+
+    Raises:
+        IOSBuildError: Raised for options not supported by the build server.
+
+    Returns:
+        int: Exit code of the build
+    """
+    if kwargs.get("watch"):
+        raise IOSBuildError("Watch mode cannot be used with a build server")
+
+    printer = Printer(print_level=print_level)
+    request = {
+        "command": "build",
+        "options": {**requestOptions(**kwargs), "print_level": print_level},
+    }
+
+    for event in sendRequest(server, request):
+        kind = event["event"]
+        if kind == "output":
+            sys.stdout.write(event["text"])
+        elif kind == "error":
+            sys.stderr.write(event["text"])
+        elif kind == "attached":
+            printer.print("Attached to a running build of this project", verbosity=1)
+        elif kind == "queued":
+            printer.print("Build queued by server", verbosity=2)
+        elif kind == "done":
+            if event["message"]:
+                print(event["message"], file=sys.stderr)
+            return event["status"]
+
+    raise IOSBuildError("Build server closed the connection")
@@ -1,7 +1,17 @@
 import os
+import hashlib
 
 from ios_build.printer import getPrinter
+from ios_build.trace import getTracer
+from ios_build.history import getRecorder
+from ios_build.parser import MULTI_CONFIG_GENERATORS
+from ios_build.errors import IOSBuildError
 from ios_build import interface
+from ios_build import jobserver
+from ios_build import launcher
+from ios_build import seed
+
+FINGERPRINT_FILE = "ios_build_configure.sha256"
 
 
 def checkCMake(**kwargs):
@@ -26,6 +36,137 @@ def checkInput(*args):
             raise TypeError("expected str instance, NoneType found")
 
 
+def findCMakeFiles(path: str, ignore: list[str] = []) -> list[str]:
+    """
+    Find all CMake input files (`CMakeLists.txt` and `*.cmake`) in the project at `path`.
+    Directories containing a `CMakeCache.txt` file are build trees and are not searched,
+    nor are the directories in `ignore` (such as the install prefix).
+
+    Args:
+        path (str): Path to CMake project.
+        ignore (list[str], optional): Directories to skip. Defaults to [].
+
+    Returns:
+        list[str]: Sorted list of CMake file paths relative to `path`.
+    """
+    ignored = {os.path.abspath(directory) for directory in ignore if directory}
+    cmake_files = []
+    for root, dirs, files in os.walk(path):
+        if root != path and "CMakeCache.txt" in files:
+            dirs.clear()
+            continue
+        dirs[:] = [
+            d
+            for d in dirs
+            if not d.startswith(".")
+            and os.path.abspath(os.path.join(root, d)) not in ignored
+        ]
+        for file in files:
+            if file == "CMakeLists.txt" or file.endswith(".cmake"):
+                cmake_files.append(os.path.relpath(os.path.join(root, file), path))
+
+    return sorted(cmake_files)
+
+
+def configureFingerprint(
+    options: list[str],
+    path: str = None,
+    toolchain_path: str = None,
+    ignore: list[str] = [],
+) -> str:
+    """
+    Compute a fingerprint of all inputs of the CMake configure step.
+    This includes the command-line options (which contain the generator,
+    install prefix and all `-D` options), the contents of the toolchain file
+    and the contents of all CMake files in the project.
+
+    Args:
+        options (list[str]): CMake configure command-line options.
+        path (str, optional): Path to CMake project. Defaults to None.
+        toolchain_path (str, optional): Path to toolchain file. Defaults to None.
+        ignore (list[str], optional): Directories to skip when searching for CMake files. Defaults to [].
+
+    Returns:
+        str: Hex digest of configure inputs.
+    """
+    digest = hashlib.sha256()
+    for option in options:
+        digest.update(option.encode())
+        digest.update(b"\0")
+
+    if os.path.isfile(toolchain_path):
+        with open(toolchain_path, "rb") as f:
+            digest.update(f.read())
+
+    for cmake_file in findCMakeFiles(path, ignore=ignore):
+        digest.update(cmake_file.encode())
+        digest.update(b"\0")
+        with open(os.path.join(path, cmake_file), "rb") as f:
+            digest.update(f.read())
+
+    return digest.hexdigest()
+
+
+def isConfigured(platform_dir: str, fingerprint: str) -> bool:
+    """
+    Check whether `platform_dir` contains a CMake configuration created from inputs
+    matching `fingerprint`.
+
+    Args:
+        platform_dir (str): Platform specific build directory.
+        fingerprint (str): Fingerprint of the current configure inputs.
+
+    Returns:
+        bool: True if the configure step may be skipped.
+    """
+    if not os.path.isfile(os.path.join(platform_dir, "CMakeCache.txt")):
+        return False
+
+    fingerprint_file = os.path.join(platform_dir, FINGERPRINT_FILE)
+    if not os.path.isfile(fingerprint_file):
+        return False
+
+    with open(fingerprint_file) as f:
+        return f.read().strip() == fingerprint
+
+
+def logPath(step: str, platform: str = None, log_name: str = None, **kwargs) -> str:
+    """
+    Path of the log file of a CMake step for `platform`, see `interface.logPath`.
+    Steps of a single configuration specify `log_name` instead of `platform`.
+    """
+    return interface.logPath(os.path.join(log_name or platform or "", step), **kwargs)
+
+
+def configOptions(configs: list[str], generator: str = "Xcode") -> dict[str, str]:
+    """
+    CMake cache options selecting the configurations to build. Multi-config
+    generators are limited to `configs`, single-config generators build the
+    only configuration in `configs`.
+
+    Args:
+        configs (list[str]): CMake configurations
+        generator (str, optional): CMake generator. Defaults to "Xcode".
+
+    Raises:
+        IOSBuildError: Raised if a single-config generator is given several configurations.
+
+    Returns:
+        dict[str, str]: CMake cache options
+    """
+    if generator in MULTI_CONFIG_GENERATORS:
+        return {"CMAKE_CONFIGURATION_TYPES": ";".join(configs)}
+
+    if len(configs) != 1:
+        raise IOSBuildError(
+            "Generator {} builds one configuration per build directory".format(
+                generator
+            )
+        )
+
+    return {"CMAKE_BUILD_TYPE": configs[0]}
+
+
 def configure(
     path: str = None,
     platform: str = None,
@@ -35,6 +176,9 @@ def configure(
     platform_options: dict = {},
     cmake_options: dict = {},
     generator="Xcode",
+    configs: list[str] = None,
+    clean: bool = False,
+    seed_cache: bool = False,
     **kwargs,
 ):
     """
@@ -44,6 +188,10 @@ def configure(
     with the ios toolchain. CMake cache options may be specified using the
     `cmake_options` dictionary and platform specific options using a similar embedded
     dictionary in `platform_options` keyed by platform name.
+    The configure step is skipped if the `platform_dir` was already configured
+    with identical inputs, unless `clean` is specified. If `seed_cache` is
+    specified, the results of the compiler and feature checks of a previous
+    configuration of the platform are loaded as an initial cache, see `seed`.
 
     Args:
         path (str, optional): Path to a valid CMake project. Defaults to None.
@@ -54,7 +202,15 @@ def configure(
         platform_options (dict, optional): Platform specific cmake cache options. Defaults to {}.
         cmake_options (dict, optional): CMake cache options. Defaults to {}.
         generator (str, optional): CMake generator. Defaults to "Xcode".
+        configs (list[str], optional): CMake configurations to build, see `configOptions`. Defaults to Release.
+        clean (bool, optional): Always run the configure step. Defaults to False.
+        seed_cache (bool, optional): Use the results of previous checks. Defaults to False.
+
+    Returns:
+        interface.ProcessResult: Result of CMake, or None if the configure step was skipped.
     """
+    if configs is None:
+        configs = ["Release"]
     printer = getPrinter(**kwargs)
 
     platform_specific_options = {}
@@ -73,8 +229,22 @@ def configure(
     specific_options = [
         "-D{0}={1}".format(k, v) for k, v in platform_specific_options.items()
     ]
+    launcher_options = [
+        "-D{0}={1}".format(k, v)
+        for k, v in launcher.launcherOptions(
+            platform_dir,
+            platform=platform,
+            cmake_options=cmake_options,
+            platform_options=platform_options,
+            **kwargs,
+        ).items()
+    ]
     local_options = [
         "-G{}".format(generator),
+        *[
+            "-D{0}={1}".format(k, v)
+            for k, v in configOptions(configs, generator).items()
+        ],
         "-DCMAKE_TOOLCHAIN_FILE={}".format(toolchain_path),
         "-DPLATFORM={}".format(platform),
         "-DCMAKE_INSTALL_PREFIX={}".format(os.path.join(install_dir, platform)),
@@ -83,31 +253,120 @@ def configure(
         "-B",
         platform_dir,
     ]
-    if not printer.showError():
-        local_options.append("-Wno-dev")
 
-    interface.cmake(*global_options, *specific_options, *local_options, path, **kwargs)
-    printer.printStat("CMake configuration complete")
+    tracer = getTracer(**kwargs)
+    with tracer.span("configure", platform=platform):
+        options = [
+            *global_options,
+            *specific_options,
+            *launcher_options,
+            *local_options,
+        ]
+        ignore = [install_dir, kwargs.get("output_dir")]
+        fingerprint = configureFingerprint(options, path, toolchain_path, ignore=ignore)
+        fingerprint_file = os.path.join(platform_dir, FINGERPRINT_FILE)
+        if not clean and isConfigured(platform_dir, fingerprint):
+            printer.printStat("CMake configuration up to date")
+            return None
+        if os.path.isfile(fingerprint_file):
+            os.remove(fingerprint_file)
+
+        if not printer.showError():
+            local_options.append("-Wno-dev")
+
+        def runConfigure(seed_data):
+            return interface.cmake(
+                *global_options,
+                *specific_options,
+                *launcher_options,
+                *local_options,
+                *seed.seedOptions(seed_data),
+                path,
+                log_file=logPath("configure", platform, **kwargs),
+                **kwargs,
+            )
+
+        if not seed_cache:
+            result = runConfigure(None)
+        else:
+            key = seed.seedKey(
+                platform,
+                toolchain_path,
+                [*global_options, *specific_options],
+                generator=generator,
+                configs=configs,
+            )
+            seed_data = seed.findSeed(key)
+            result = runConfigure(seed_data)
+            if not seed.updateSeed(
+                key, seed_data, platform_dir, result.duration, **kwargs
+            ):
+                # Repeat the checks with the new compilers
+                os.remove(os.path.join(platform_dir, "CMakeCache.txt"))
+                result = runConfigure(None)
+                seed.updateSeed(key, None, platform_dir, result.duration, **kwargs)
 
+        with open(fingerprint_file, "w") as f:
+            f.write(fingerprint)
+        printer.printStat("CMake configuration complete")
 
-def build(platform_dir: str = None, config: str = "Release", **kwargs):
+    getRecorder(**kwargs).step(
+        "configure",
+        result.duration,
+        platform=platform,
+        config=configs[0] if len(configs) == 1 else None,
+    )
+
+    return result
+
+
+def build(
+    platform_dir: str = None,
+    config: str = "Release",
+    job_server: jobserver.JobServer = None,
+    **kwargs,
+):
     """
     CMake build step. Assumes configuration is completed runs `cmake --build {platform_dir} --config {config}`
-    where `platform_dir` is the CMake build directory.
+    where `platform_dir` is the CMake build directory. If a `job_server` is
+    specified, the build waits for a token and the native build tool is made
+    a client of the jobserver.
 
     Args:
         platform_dir (str, optional): Directory containing CMake configuration (CMakeCache.txt). Defaults to None.
         config (str, optional): CMake configuration to build. Defaults to "Release".
+        job_server (jobserver.JobServer, optional): Jobserver shared by all builds. Defaults to None.
+
+    Returns:
+        interface.ProcessResult: Result of CMake.
     """
     printer = getPrinter(**kwargs)
 
     printer.print("Running CMake Build...\n", verbosity=1)
 
-    interface.cmake("--build", platform_dir, "--config", config, **kwargs)
+    tracer = getTracer(**kwargs)
+    with tracer.span("build", platform=kwargs.get("platform"), config=config):
+        with jobserver.clientEnv(job_server) as env:
+            result = interface.cmake(
+                "--build",
+                platform_dir,
+                "--config",
+                config,
+                log_file=logPath("build", **kwargs),
+                env=env,
+                **kwargs,
+            )
     printer.printStat("CMake Build complete")
+    getRecorder(**kwargs).step(
+        "build", result.duration, platform=kwargs.get("platform"), config=config
+    )
+
+    return result
 
 
-def install(platform_dir: str = None, config: str = "Release", **kwargs):
+def install(
+    platform_dir: str = None, config: str = "Release", prefix: str = None, **kwargs
+):
     """
     Cmake install step. Assumes configuration and build are complete and runs
     `cmake --install {platform_dir} --config {config}`
@@ -116,17 +375,68 @@ def install(platform_dir: str = None, config: str = "Release", **kwargs):
     Args:
         platform_dir (str, optional): CMake build directory containing `CMakeCache.txt`. Defaults to None.
         config (str, optional): CMake configuration. Defaults to "Release".
+        prefix (str, optional): Install prefix, overriding the prefix set at configuration. Defaults to None.
+
+    Returns:
+        interface.ProcessResult: Result of CMake.
     """
     printer = getPrinter(**kwargs)
     printer.print("Commencing install...", verbosity=1)
-    interface.cmake("--install", platform_dir, "--config", config, **kwargs)
+    tracer = getTracer(**kwargs)
+    with tracer.span("install", platform=kwargs.get("platform"), config=config):
+        result = interface.cmake(
+            "--install",
+            platform_dir,
+            "--config",
+            config,
+            *(["--prefix", prefix] if prefix else []),
+            log_file=logPath("install", **kwargs),
+            **kwargs,
+        )
     printer.printStat("CMake installation complete")
+    getRecorder(**kwargs).step(
+        "install", result.duration, platform=kwargs.get("platform"), config=config
+    )
 
+    return result
 
-def runCMake(**kwargs):
+
+def runCMake(
+    configs: list[str] = None, install_prefixes: dict = None, **kwargs
+) -> dict[str, float]:
     """
     Run CMake configuration, build and install, with all options specified using `kwargs`.
+    The configure step is run once and each of `configs` is built and installed
+    in turn, they share the build tree so are not built concurrently. When more
+    than one configuration is built, the log files of each are kept separately.
+
+    Args:
+        configs (list[str], optional): CMake configurations to build. Defaults to Release.
+        install_prefixes (dict, optional): Install prefix of each configuration. Defaults to None.
+
+    Returns:
+        dict[str, float]: Duration in seconds of the `configure`, `build` and
+        `install` steps, `configure` is missing if the step was skipped.
     """
-    configure(**kwargs)
-    build(**kwargs)
-    install(**kwargs)
+    if configs is None:
+        configs = ["Release"]
+    if install_prefixes is None:
+        install_prefixes = {}
+    times = {}
+    result = configure(configs=configs, **kwargs)
+    if result:
+        times["configure"] = result.duration
+
+    times["build"] = 0
+    times["install"] = 0
+    for config in configs:
+        config_kwargs = kwargs
+        if len(configs) > 1:
+            log_name = os.path.join(kwargs.get("platform") or "", config)
+            config_kwargs = {**kwargs, "log_name": log_name}
+        times["build"] += build(config=config, **config_kwargs).duration
+        times["install"] += install(
+            config=config, prefix=install_prefixes.get(config), **config_kwargs
+        ).duration
+
+    return times
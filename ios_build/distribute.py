@@ -0,0 +1,809 @@
+import io
+import os
+import json
+import shutil
+import socket
+import hashlib
+import tarfile
+import tempfile
+import threading
+import collections
+import socketserver
+
+from ios_build import build
+from ios_build import cmake
+from ios_build import fingerprint
+from ios_build import history
+from ios_build import schedule
+from ios_build.cache import cacheHome
+from ios_build.printer import Printer, getPrinter
+from ios_build.trace import Tracer, getTracer, writeTrace
+from ios_build.errors import (
+    IOSBuildError,
+    CMakeError,
+    XCodeBuildError,
+    errorStatus,
+)
+
+# Options of a build which are sent to the workers, paths and tools are chosen by each worker
+REMOTE_OPTIONS = [
+    "cmake_options",
+    "platform_options",
+    "generator",
+    "configs",
+    "clean",
+    "seed_cache",
+    "compiler_cache",
+    "log_lines",
+    "compress_logs",
+]
+
+# Index of the source snapshot fingerprint in the build directory
+SNAPSHOT_INDEX = "snapshot-index.json"
+
+# Name of the toolchain file in a source snapshot
+SNAPSHOT_TOOLCHAIN = "ios.toolchain.cmake"
+
+# Number of source snapshots kept by a worker
+MAX_SNAPSHOTS = 4
+
+# Seconds between heartbeats sent by a worker during a build
+HEARTBEAT_INTERVAL = 10.0
+
+# Seconds without a message after which a worker is considered to have failed
+WORKER_TIMEOUT = 60.0
+
+CHUNK_SIZE = 1 << 20
+
+Snapshot = collections.namedtuple("Snapshot", ["digest", "file", "size"])
+Snapshot.__doc__ = """
+Compressed archive of the source tree and toolchain file sent to the workers.
+
+Attributes:
+    digest (str): Hex digest of the source tree and toolchain file
+    file: Temporary file containing the archive
+    size (int): Size of the archive in bytes
+"""
+
+
+def splitAddress(address: str) -> tuple[str, int]:
+    """
+    Host and port of an address of the form `HOST:PORT`.
+    """
+    host, _, port = address.rpartition(":")
+    return host, int(port)
+
+
+def sendMessage(stream, message: dict):
+    """
+    Send a message as a line of JSON.
+    """
+    stream.write(json.dumps(message).encode() + b"\n")
+    stream.flush()
+
+
+def readMessage(stream) -> dict:
+    """
+    Read a message sent using `sendMessage`.
+
+    Raises:
+        ConnectionError: Raised if the connection is closed.
+    """
+    line = stream.readline()
+    if not line:
+        raise ConnectionError("Connection closed")
+
+    return json.loads(line)
+
+
+def sendFile(stream, file, size: int):
+    """
+    Send the first `size` bytes of `file`.
+    """
+    file.seek(0)
+    while size > 0:
+        chunk = file.read(min(size, CHUNK_SIZE))
+        if not chunk:
+            raise IOError("File shorter than expected")
+        stream.write(chunk)
+        size -= len(chunk)
+    stream.flush()
+
+
+def receiveFile(stream, file, size: int):
+    """
+    Receive `size` bytes sent using `sendFile` into `file`.
+
+    Raises:
+        ConnectionError: Raised if the connection is closed before all bytes are received.
+    """
+    while size > 0:
+        chunk = stream.read(min(size, CHUNK_SIZE))
+        if not chunk:
+            raise ConnectionError("Connection closed during transfer")
+        file.write(chunk)
+        size -= len(chunk)
+    file.seek(0)
+
+
+def extractArchive(file, directory: str):
+    """
+    Extract a compressed archive received from another host into `directory`.
+    Members outside of `directory` are rejected.
+
+    Raises:
+        IOSBuildError: Raised if the archive contains unsafe members.
+    """
+    with tarfile.open(fileobj=file, mode="r:gz") as archive:
+        if hasattr(tarfile, "data_filter"):
+            try:
+                archive.extractall(directory, filter="data")
+            except tarfile.FilterError as error:
+                raise IOSBuildError("Invalid archive: {}".format(error))
+            return
+
+        for member in archive.getmembers():
+            name = os.path.normpath(member.name)
+            if os.path.isabs(name) or name.split(os.sep)[0] == "..":
+                raise IOSBuildError("Invalid archive member: {}".format(member.name))
+        archive.extractall(directory)
+
+
+def createSnapshot(
+    path: str, toolchain_path: str, ignore: list[str] = [], index_file: str = None
+) -> Snapshot:
+    """
+    Archive the source tree at `path` and the toolchain file to a temporary
+    file. Directories in `ignore` and files matching `build.IGNORE_PATTERNS`
+    are skipped. The digest identifies the snapshot so that workers only
+    receive each snapshot once, it is computed using `fingerprint.fingerprint`
+    so it does not depend on modification times.
+
+    Args:
+        path (str): Path to the CMake project
+        toolchain_path (str): Path to the toolchain file
+        ignore (list[str], optional): Directories to skip. Defaults to [].
+        index_file (str, optional): Fingerprint index file. Defaults to None.
+
+    Returns:
+        Snapshot: Digest and archive of the snapshot
+    """
+    state = fingerprint.fingerprint(
+        path, ignore=ignore, patterns=build.IGNORE_PATTERNS, index_file=index_file
+    )
+    digest = hashlib.sha256(state.digest.encode())
+    digest.update(fingerprint.fileDigest(toolchain_path).encode())
+
+    root = os.path.abspath(path)
+    files = fingerprint.scanTree(root, ignore=ignore, patterns=build.IGNORE_PATTERNS)
+    file = tempfile.TemporaryFile()
+    with tarfile.open(fileobj=file, mode="w:gz", dereference=True) as archive:
+        for relpath in sorted(files):
+            archive.add(
+                os.path.join(root, relpath),
+                arcname=os.path.join("source", relpath),
+                recursive=False,
+            )
+        archive.add(toolchain_path, arcname=SNAPSHOT_TOOLCHAIN)
+    size = file.tell()
+
+    return Snapshot(digest.hexdigest(), file, size)
+
+
+def remoteError(status: int, message: str) -> Exception:
+    """
+    Exception for the exit code and message of a failed build reported by a worker.
+    """
+    if status == 2:
+        return CMakeError(message)
+    if status == 3:
+        return XCodeBuildError(message)
+
+    return IOSBuildError(message)
+
+
+class WorkerFailure(Exception):
+    """
+    A worker failed or disconnected, as opposed to a build which failed on the worker.
+    """
+
+
+class SocketStream(io.TextIOBase):
+    """
+    Text stream which sends everything written to it as messages to the
+    coordinator, used as the output of the printer of a build on a worker.
+    """
+
+    def __init__(self, send, event: str):
+        self.send = send
+        self.event = event
+
+    def write(self, text: str) -> int:
+        if text:
+            self.send({"event": self.event, "text": text})
+        return len(text)
+
+
+class Worker:
+    """
+    Build worker which builds single platforms of a project for a coordinator,
+    see `distributedBuild`. Source snapshots are extracted once and kept in
+    `work_dir`, along with the build and install directories of each
+    snapshot, so every platform of a snapshot shares one copy of the source.
+    """
+
+    def __init__(self, jobs: int = 1, work_dir: str = None, **kwargs):
+        """
+        Args:
+            jobs (int, optional): Number of platforms to build concurrently. Defaults to 1.
+            work_dir (str, optional): Directory for snapshots and builds. Defaults to the user cache directory.
+        """
+        self.jobs = jobs
+        self.work_dir = os.path.abspath(work_dir or cacheHome("worker"))
+        self.slots = threading.Semaphore(jobs)
+        self.lock = threading.Lock()
+        self.snapshot_locks = {}
+        self.platform_locks = {}
+        self.in_use = collections.Counter()
+        self.cmake_command = kwargs.get("cmake_command", "cmake")
+        self.printer = getPrinter(**kwargs)
+
+        os.makedirs(self.work_dir, exist_ok=True)
+        cmake.checkCMake(cmake_command=self.cmake_command, printer=self.printer)
+
+    def snapshotDir(self, digest: str) -> str:
+        return os.path.join(self.work_dir, digest)
+
+    def acquireSnapshot(self, digest: str, receive) -> str:
+        """
+        Directory of the snapshot `digest`, receiving and extracting the
+        snapshot if it is not present. The snapshot is kept until
+        `releaseSnapshot` is called.
+
+        Args:
+            digest (str): Digest of the snapshot
+            receive: Function called with a file to receive the snapshot into, or with None if it is present.
+
+        Raises:
+            IOSBuildError: Raised if the digest is invalid.
+
+        Returns:
+            str: Directory of the snapshot
+        """
+        if len(digest) != 64 or not all(c in "0123456789abcdef" for c in digest):
+            raise IOSBuildError("Invalid snapshot digest: {}".format(digest))
+
+        with self.lock:
+            self.in_use[digest] += 1
+            snapshot_lock = self.snapshot_locks.setdefault(digest, threading.Lock())
+
+        try:
+            directory = self.extractSnapshot(digest, snapshot_lock, receive)
+        except BaseException:
+            self.releaseSnapshot(digest)
+            raise
+
+        self.pruneSnapshots()
+        return directory
+
+    def extractSnapshot(self, digest: str, snapshot_lock, receive) -> str:
+        directory = self.snapshotDir(digest)
+        with snapshot_lock:
+            source = os.path.join(directory, "source")
+            if os.path.isdir(source):
+                receive(None)
+                os.utime(directory)
+                return directory
+
+            with tempfile.TemporaryFile() as file:
+                receive(file)
+                extract_dir = tempfile.mkdtemp(dir=self.work_dir)
+                try:
+                    extractArchive(file, extract_dir)
+                    os.makedirs(directory, exist_ok=True)
+                    os.replace(os.path.join(extract_dir, "source"), source)
+                    os.replace(
+                        os.path.join(extract_dir, SNAPSHOT_TOOLCHAIN),
+                        os.path.join(directory, SNAPSHOT_TOOLCHAIN),
+                    )
+                finally:
+                    shutil.rmtree(extract_dir, ignore_errors=True)
+
+        return directory
+
+    def releaseSnapshot(self, digest: str):
+        with self.lock:
+            self.in_use[digest] -= 1
+            if not self.in_use[digest]:
+                del self.in_use[digest]
+
+    def pruneSnapshots(self):
+        """
+        Remove the least recently used snapshots which are not in use,
+        keeping `MAX_SNAPSHOTS` snapshots.
+        """
+        with self.lock:
+            digests = [d for d in os.listdir(self.work_dir) if len(d) == 64]
+            digests.sort(
+                key=lambda d: os.stat(self.snapshotDir(d)).st_mtime, reverse=True
+            )
+            for digest in digests[MAX_SNAPSHOTS:]:
+                if digest not in self.in_use:
+                    shutil.rmtree(self.snapshotDir(digest), ignore_errors=True)
+                    self.snapshot_locks.pop(digest, None)
+                    for key in [k for k in self.platform_locks if k[0] == digest]:
+                        del self.platform_locks[key]
+
+    def buildPlatform(self, directory: str, platform: str, options: dict, send):
+        """
+        Build `platform` from the snapshot in `directory` using `build.buildPlatform`
+        and archive its installed tree of each configuration.
+
+        Args:
+            directory (str): Directory of the snapshot
+            platform (str): Platform to build
+            options (dict): Options of the build, see `REMOTE_OPTIONS`, and the `print_level`.
+            send: Function sending a message to the coordinator.
+
+        Returns:
+            file: Temporary file containing the archive of the installed trees.
+        """
+        printer = Printer(
+            print_level=options.get("print_level", 0),
+            file=SocketStream(send, "output"),
+            error_file=SocketStream(send, "error"),
+        )
+        options = {k: v for k, v in options.items() if k in REMOTE_OPTIONS}
+        configs = options.get("configs", ["Release"])
+        install_dir = os.path.join(directory, "install")
+        kwargs = {
+            **options,
+            "path": os.path.join(directory, "source"),
+            "toolchain_path": os.path.join(directory, SNAPSHOT_TOOLCHAIN),
+            "install_dir": install_dir,
+            "log_dir": os.path.join(directory, "logs"),
+            "cmake_command": self.cmake_command,
+            "printer": printer,
+        }
+        os.makedirs(kwargs["log_dir"], exist_ok=True)
+
+        # Builds of the platform by different coordinators share the build directory
+        with self.lock:
+            key = (os.path.basename(directory), platform)
+            platform_lock = self.platform_locks.setdefault(key, threading.Lock())
+        with platform_lock:
+            build.buildPlatform(
+                platform, build_dir=os.path.join(directory, "build"), **kwargs
+            )
+
+        file = tempfile.TemporaryFile()
+        with tarfile.open(fileobj=file, mode="w:gz") as archive:
+            for config in configs:
+                prefix = os.path.join(
+                    build.configDirectory(install_dir, config, configs), platform
+                )
+                archive.add(prefix, arcname=os.path.relpath(prefix, install_dir))
+        return file
+
+
+class WorkerHandler(socketserver.StreamRequestHandler):
+    """
+    Handler of a connection to a worker. Each connection sends one request as
+    a line of JSON. Replies are lines of JSON, followed by the archive of the
+    installed trees if a build succeeds.
+    """
+
+    def setup(self):
+        super().setup()
+        self.send_lock = threading.Lock()
+
+    def send(self, message: dict):
+        with self.send_lock:
+            sendMessage(self.wfile, message)
+
+    def handle(self):
+        try:
+            request = readMessage(self.rfile)
+        except (ValueError, ConnectionError):
+            return
+
+        worker = self.server.worker
+        command = request.get("command")
+        if command == "info":
+            self.send({"event": "info", "jobs": worker.jobs, "pid": os.getpid()})
+        elif command == "shutdown":
+            self.send({"event": "shutdown"})
+            threading.Thread(target=self.server.shutdown, daemon=True).start()
+        elif command == "build":
+            try:
+                self.build(worker, request)
+            except OSError:
+                # The coordinator disconnected and will build the platform elsewhere
+                pass
+        else:
+            message = "Unknown command: {}".format(command)
+            self.send({"event": "done", "status": 1, "message": message})
+
+    def build(self, worker: Worker, request: dict):
+        platform = request["platform"]
+        digest = request["digest"]
+
+        def receive(file):
+            self.send({"event": "snapshot", "needed": file is not None})
+            if file is not None:
+                receiveFile(self.rfile, file, request["size"])
+
+        with worker.slots:
+            worker.printer.printValue("Building platform", platform)
+            stop = threading.Event()
+            heartbeat = threading.Thread(target=self.heartbeat, args=(stop,))
+            heartbeat.start()
+            try:
+                directory = worker.acquireSnapshot(digest, receive)
+                try:
+                    archive = worker.buildPlatform(
+                        directory, platform, request["options"], self.send
+                    )
+                finally:
+                    worker.releaseSnapshot(digest)
+            except Exception as error:
+                # Errors sending to the coordinator are raised again below
+                status, _ = errorStatus(error)
+                worker.printer.printValue("Platform failed", platform)
+                self.send({"event": "done", "status": status, "message": str(error)})
+                return
+            finally:
+                stop.set()
+                heartbeat.join()
+
+        with archive:
+            size = archive.seek(0, os.SEEK_END)
+            self.send({"event": "done", "status": 0, "size": size})
+            with self.send_lock:
+                sendFile(self.wfile, archive, size)
+        worker.printer.printValue("Platform complete", platform)
+
+    def heartbeat(self, stop: threading.Event):
+        while not stop.wait(HEARTBEAT_INTERVAL):
+            try:
+                self.send({"event": "heartbeat"})
+            except OSError:
+                return
+
+
+class WorkerServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+def createWorker(listen: str = "127.0.0.1:0", **kwargs) -> WorkerServer:
+    """
+    Create the server of a build worker listening on `listen`, see `Worker`.
+    The server is started using `serve_forever`.
+
+    Args:
+        listen (str, optional): Address to listen on, HOST:PORT. Defaults to a free port on localhost.
+
+    Returns:
+        WorkerServer: Server, the address it listens on is `server_address`.
+    """
+    server = WorkerServer(splitAddress(listen), WorkerHandler, bind_and_activate=False)
+    try:
+        server.server_bind()
+        server.server_activate()
+        server.worker = Worker(**kwargs)
+    except Exception:
+        server.server_close()
+        raise
+
+    return server
+
+
+def runWorker(print_level: int = 0, **kwargs):
+    """
+    Run the `worker` command using the options obtained from the parser.
+    """
+    printer = Printer(print_level=print_level)
+    with createWorker(printer=printer, **kwargs) as server:
+        printer.printValue("Worker listening", "{0}:{1}".format(*server.server_address))
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+    printer.print("Worker stopped")
+
+
+def workerRequest(address: str, request: dict):
+    """
+    Open a connection to the worker at `address` and send `request`.
+
+    Raises:
+        WorkerFailure: Raised if the worker cannot be reached.
+
+    Returns:
+        tuple: Socket and its stream
+    """
+    try:
+        connection = socket.create_connection(
+            splitAddress(address), timeout=WORKER_TIMEOUT
+        )
+    except OSError as error:
+        raise WorkerFailure("Cannot connect to worker {0}: {1}".format(address, error))
+
+    stream = connection.makefile("rwb")
+    try:
+        sendMessage(stream, request)
+    except OSError as error:
+        stream.close()
+        connection.close()
+        raise WorkerFailure("Worker {0} failed: {1}".format(address, error))
+
+    return connection, stream
+
+
+def workerInfo(address: str) -> dict:
+    """
+    Query the number of concurrent builds of the worker at `address`.
+
+    Raises:
+        WorkerFailure: Raised if the worker cannot be reached.
+    """
+    connection, stream = workerRequest(address, {"command": "info"})
+    with connection, stream:
+        try:
+            return readMessage(stream)
+        except (OSError, ValueError) as error:
+            raise WorkerFailure("Worker {0} failed: {1}".format(address, error))
+
+
+def remotePlatform(
+    address: str, platform: str, snapshot: Snapshot, install_dir: str, **kwargs
+):
+    """
+    Build `platform` on the worker at `address` and extract the installed
+    trees it sends back into `install_dir`. The output of the build on the
+    worker is written to the printer.
+
+    Args:
+        address (str): Address of the worker, HOST:PORT.
+        platform (str): Platform to build
+        snapshot (Snapshot): Source snapshot, sent if the worker does not have it.
+        install_dir (str): Install directory prefix
+
+    Raises:
+        WorkerFailure: Raised if the worker fails or disconnects.
+        Exception: Error of the build on the worker.
+    """
+    printer = getPrinter(**kwargs)
+    request = {
+        "command": "build",
+        "platform": platform,
+        "digest": snapshot.digest,
+        "size": snapshot.size,
+        "options": {
+            **{k: v for k, v in kwargs.items() if k in REMOTE_OPTIONS},
+            "print_level": printer.verbosity,
+        },
+    }
+    connection, stream = workerRequest(address, request)
+    with connection, stream:
+        try:
+            while True:
+                message = readMessage(stream)
+                event = message["event"]
+                if event == "snapshot" and message["needed"]:
+                    sendFile(stream, snapshot.file, snapshot.size)
+                elif event == "output":
+                    print(message["text"], end="", file=printer.file)
+                elif event == "error":
+                    print(message["text"], end="", file=printer.error_file)
+                elif event == "done":
+                    break
+
+            if message["status"] != 0:
+                raise remoteError(message["status"], message["message"])
+
+            with tempfile.TemporaryFile() as file:
+                receiveFile(stream, file, message["size"])
+                configs = kwargs.get("configs", ["Release"])
+                for config in configs:
+                    prefix = os.path.join(
+                        build.configDirectory(install_dir, config, configs), platform
+                    )
+                    shutil.rmtree(prefix, ignore_errors=True)
+                extractArchive(file, install_dir)
+        except (OSError, ValueError, KeyError, tarfile.TarError) as error:
+            raise WorkerFailure("Worker {0} failed: {1}".format(address, error))
+
+
+def buildRemote(
+    platforms: list[str],
+    workers: list[str],
+    snapshot: Snapshot,
+    install_dir: str,
+    **kwargs,
+) -> tuple[dict, dict]:
+    """
+    Build `platforms` on `workers`, each of which is sent as many platforms
+    at a time as it builds concurrently. If a worker fails or disconnects,
+    the platform it was building is reassigned to the remaining workers and
+    the worker is not used again. The output of each platform is printed once
+    it completes.
+
+    Args:
+        platforms (list[str]): Platforms to build
+        workers (list[str]): Addresses of the workers, HOST:PORT.
+        snapshot (Snapshot): Source snapshot, see `createSnapshot`.
+        install_dir (str): Install directory prefix
+
+    Returns:
+        tuple[dict, dict]: Worker which built each platform and exceptions of
+        the platforms which failed, keyed by platform.
+    """
+    printer = getPrinter(**kwargs)
+    tracer = getTracer(**kwargs)
+
+    queue = collections.deque(platforms)
+    condition = threading.Condition()
+    running = [0]
+    failed = set()
+    results = {}
+    errors = {}
+
+    def nextPlatform(address):
+        with condition:
+            # Wait for running platforms, which are reassigned if their worker fails
+            while not queue and running[0] and address not in failed:
+                condition.wait()
+            if not queue or address in failed:
+                return None
+            running[0] += 1
+            return queue.popleft()
+
+    def workerLoop(address):
+        while True:
+            platform = nextPlatform(address)
+            if platform is None:
+                return
+
+            job_printer = printer.buffered()
+            reassign = False
+            try:
+                with tracer.span("remotePlatform", platform=platform, worker=address):
+                    job_printer.printValue("Worker", address, verbosity=1)
+                    remotePlatform(
+                        address,
+                        platform,
+                        snapshot,
+                        install_dir,
+                        **{**kwargs, "printer": job_printer},
+                    )
+                    results[platform] = address
+            except WorkerFailure as error:
+                reassign = True
+                job_printer.printStat(str(error), tick="cross")
+            except Exception as error:
+                errors[platform] = error
+
+            with condition:
+                running[0] -= 1
+                if reassign:
+                    failed.add(address)
+                    queue.appendleft(platform)
+                condition.notify_all()
+            printer.printBuffer(job_printer)
+            if reassign:
+                printer.printValue("Platform reassigned", platform)
+
+    threads = []
+    for address in workers:
+        try:
+            jobs = workerInfo(address)["jobs"]
+        except (WorkerFailure, KeyError) as error:
+            printer.printStat("Worker unavailable: {}".format(error), tick="cross")
+            continue
+        printer.printValue("Worker", "{0} ({1} jobs)".format(address, jobs))
+        for _ in range(jobs):
+            threads.append(threading.Thread(target=workerLoop, args=(address,)))
+
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    for platform in queue:
+        errors[platform] = IOSBuildError(
+            "No workers available to build {}".format(platform)
+        )
+
+    return results, errors
+
+
+def distributedBuild(workers: list[str], platforms: list[str] = None, **kwargs):
+    """
+    Run the full iOSBuild with the platforms built on build workers, see
+    `Worker`. A snapshot of the source tree and the toolchain file is sent
+    to each worker once, the resolved options are sent with each platform.
+    Platforms are assigned longest first using the durations of previous
+    local builds, see `schedule`.
+    The installed trees are sent back by the workers and the frameworks are
+    created locally.
+
+    Args:
+        workers (list[str]): Addresses of the workers, HOST:PORT.
+        platforms (list[str], optional): List of platforms to build. Defaults to None.
+
+    Raises:
+        RuntimeError: Raised if no platforms are specified.
+    """
+    if not platforms:
+        raise RuntimeError("No platforms specified")
+
+    tracer = getTracer(**kwargs)
+    with (
+        tracer.span("distributedBuild", workers=len(workers)),
+        history.recordRun(platforms=platforms, **kwargs) as recorder,
+    ):
+        kwargs["recorder"] = recorder
+        directories = build.setupBuild(platforms=platforms, **kwargs)
+        kwargs["log_dir"] = directories["log_dir"]
+        kwargs["generator"] = directories["generator"]
+        kwargs["toolchain_path"] = directories["toolchain_path"]
+        build_dir = directories["build_dir"]
+        install_dir = directories["install_dir"]
+
+        ignore = [build_dir, install_dir, kwargs["log_dir"], kwargs.get("output_dir")]
+        with tracer.span("snapshot"):
+            snapshot = createSnapshot(
+                kwargs["path"],
+                kwargs["toolchain_path"],
+                ignore=[d for d in ignore if d],
+                index_file=os.path.join(build_dir, SNAPSHOT_INDEX),
+            )
+
+        with snapshot.file:
+            with tracer.span("buildPlatforms", platforms=len(platforms)):
+                estimates = schedule.estimateDurations(kwargs["path"], platforms)
+                _, errors = buildRemote(
+                    schedule.schedulePlatforms(platforms, estimates),
+                    workers,
+                    snapshot,
+                    install_dir,
+                    **kwargs,
+                )
+        build.raiseErrors(errors, platforms, "Platform", **kwargs)
+
+        configs = kwargs.get("configs", ["Release"])
+        for config in configs:
+            output_dir = build.configDirectory(
+                kwargs.get("output_dir"), config, configs
+            )
+            build.createFrameworks(
+                build.configDirectory(install_dir, config, configs),
+                platforms=platforms,
+                **{
+                    **kwargs,
+                    "output_dir": output_dir,
+                    "recorder": recorder.bind(config),
+                },
+            )
+
+        build.cleanUp(build_dir, install_dir, **kwargs)
+
+
+def runDistributed(print_level: int = 0, trace_file: str = None, **kwargs):
+    """
+    Run iOSBuild on build workers using the options obtained from the parser,
+    see `distributedBuild`.
+    """
+    printer = Printer(print_level=print_level)
+    tracer = Tracer(enabled=bool(trace_file))
+
+    printer.printHeader(**kwargs)
+
+    try:
+        distributedBuild(printer=printer, tracer=tracer, **kwargs)
+    finally:
+        writeTrace(tracer, trace_file, printer=printer)
+
+    printer.printFooter(**kwargs)
@@ -8,3 +8,21 @@ class XCodeBuildError(Exception): ...
 
 
 class ParserError(Exception): ...
+
+
+def errorStatus(error: Exception) -> tuple[int, str]:
+    """
+    Exit code and message reported by the command line for `error`.
+
+    Args:
+        error (Exception): Error raised by a build
+
+    Returns:
+        tuple[int, str]: Exit code and message
+    """
+    if isinstance(error, CMakeError):
+        return 2, "CMake Error\nMessage: {}".format(error)
+    if isinstance(error, XCodeBuildError):
+        return 3, "! XCodeBuild error\n! Message: {}".format(error)
+
+    return 1, "Error: {}".format(error)
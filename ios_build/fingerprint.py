@@ -0,0 +1,211 @@
+import os
+import re
+import json
+import time
+import fnmatch
+import hashlib
+import tempfile
+import collections
+import concurrent.futures
+
+from ios_build.cache import cacheHome
+
+# Files modified this close to the time the index was written may be modified
+# again without changing their size or mtime, so they are always rehashed.
+RACY_INTERVAL_NS = 2 * 10**9
+
+Fingerprint = collections.namedtuple("Fingerprint", ["digest", "changed", "files"])
+Fingerprint.__doc__ = """
+Fingerprint of a source tree.
+
+Attributes:
+    digest (str): Hex digest of all file names and contents
+    changed (list[str]): Relative paths of files added, modified or removed since the previous fingerprint
+    files (int): Number of files in the tree
+"""
+
+
+def scanTree(
+    path: str, ignore: list[str] = [], patterns: list[str] = [".*"]
+) -> dict[str, tuple]:
+    """
+    Find all files in the directory tree at `path` using `os.scandir`.
+    Directories in `ignore` (such as build and install prefixes) and files or
+    directories with names matching any of `patterns` are skipped.
+
+    Args:
+        path (str): Root of the directory tree
+        ignore (list[str], optional): Directories to skip. Defaults to [].
+        patterns (list[str], optional): Names to skip. Defaults to hidden files.
+
+    Returns:
+        dict[str, tuple]: `(size, mtime_ns, inode)` of each file keyed by relative path.
+    """
+    root = os.path.abspath(path)
+    ignored = {os.path.abspath(directory) for directory in ignore}
+    skip = re.compile("|".join(fnmatch.translate(pattern) for pattern in patterns))
+
+    files = {}
+    stack = [(root, "")]
+    while stack:
+        directory, prefix = stack.pop()
+        with os.scandir(directory) as it:
+            for entry in it:
+                if patterns and skip.match(entry.name):
+                    continue
+                relpath = prefix + entry.name
+                if entry.is_dir(follow_symlinks=False):
+                    if entry.path not in ignored:
+                        stack.append((entry.path, relpath + os.sep))
+                elif entry.is_file():
+                    stat = entry.stat()
+                    files[relpath] = (stat.st_size, stat.st_mtime_ns, stat.st_ino)
+
+    return files
+
+
+def fileDigest(path: str) -> str:
+    """
+    Compute the SHA-256 digest of a file.
+
+    Args:
+        path (str): Path to file
+
+    Returns:
+        str: Hex digest of the file contents
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+
+    return digest.hexdigest()
+
+
+def indexPath(path: str, index_file: str = None) -> str:
+    """
+    Location of the persisted fingerprint index for the tree at `path`.
+
+    Args:
+        path (str): Root of the directory tree
+        index_file (str, optional): Custom index file. Defaults to None.
+
+    Returns:
+        str: Path to index file
+    """
+    if index_file:
+        return index_file
+
+    key = hashlib.sha256(os.path.abspath(path).encode()).hexdigest()[:16]
+    return cacheHome("fingerprints", "{}.json".format(key))
+
+
+def loadIndex(index_file: str) -> dict:
+    """
+    Load a persisted fingerprint index.
+
+    Args:
+        index_file (str): Path to index file
+
+    Returns:
+        dict: Index with the time it was `written` and `files` mapping relative paths to `[size, mtime_ns, inode, digest]`.
+    """
+    try:
+        with open(index_file) as f:
+            index = json.load(f)
+        if isinstance(index.get("files"), dict) and "written" in index:
+            return index
+    except (OSError, ValueError, AttributeError):
+        pass
+
+    return {"written": 0, "files": {}}
+
+
+def saveIndex(index_file: str, index: dict):
+    """
+    Write a fingerprint index atomically.
+
+    Args:
+        index_file (str): Path to index file
+        index (dict): Index to write
+    """
+    directory = os.path.dirname(os.path.abspath(index_file))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix=".index.")
+    with os.fdopen(fd, "w") as f:
+        f.write(json.dumps(index))
+    os.replace(tmp, index_file)
+
+
+def fingerprint(
+    path: str,
+    ignore: list[str] = [],
+    patterns: list[str] = [".*"],
+    index_file: str = None,
+    jobs: int = None,
+) -> Fingerprint:
+    """
+    Fingerprint the source tree at `path`. A persisted index of
+    `(size, mtime_ns, inode) -> digest` is used so that only files which have
+    changed since the previous fingerprint are rehashed, using a pool of `jobs`
+    threads. The index is updated afterwards.
+
+    Args:
+        path (str): Root of the directory tree
+        ignore (list[str], optional): Directories to skip. Defaults to [].
+        patterns (list[str], optional): Names to skip. Defaults to hidden files.
+        index_file (str, optional): Custom index file. Defaults to None.
+        jobs (int, optional): Number of hashing threads. Defaults to None.
+
+    Returns:
+        Fingerprint: Tree digest and changed files
+    """
+    index_file = indexPath(path, index_file)
+    index = loadIndex(index_file)
+    previous = index["files"]
+    racy = index["written"] - RACY_INTERVAL_NS
+
+    start = time.time_ns()
+    files = scanTree(path, ignore=ignore, patterns=patterns)
+
+    digests = {}
+    rehash = []
+    for relpath, stat in files.items():
+        entry = previous.get(relpath)
+        if entry and tuple(entry[:3]) == stat and stat[1] < racy:
+            digests[relpath] = entry[3]
+        else:
+            rehash.append(relpath)
+
+    root = os.path.abspath(path)
+    with concurrent.futures.ThreadPoolExecutor(max_workers=jobs) as executor:
+        paths = [os.path.join(root, relpath) for relpath in rehash]
+        for relpath, digest in zip(rehash, executor.map(fileDigest, paths)):
+            digests[relpath] = digest
+
+    changed = [
+        relpath
+        for relpath in rehash
+        if relpath not in previous or previous[relpath][3] != digests[relpath]
+    ]
+    changed.extend(relpath for relpath in previous if relpath not in files)
+
+    tree_digest = hashlib.sha256()
+    for relpath in sorted(digests):
+        tree_digest.update(relpath.encode())
+        tree_digest.update(b"\0")
+        tree_digest.update(bytes.fromhex(digests[relpath]))
+
+    # The index is unchanged if no files were rehashed or removed
+    if rehash or len(files) != len(previous):
+        saveIndex(
+            index_file,
+            {
+                "written": start,
+                "files": {
+                    relpath: [*files[relpath], digests[relpath]] for relpath in files
+                },
+            },
+        )
+
+    return Fingerprint(tree_digest.hexdigest(), sorted(changed), len(files))
@@ -0,0 +1,249 @@
+import os
+import json
+import shutil
+import threading
+
+from ios_build import interface
+from ios_build.cache import cacheHome
+from ios_build.parser import GENERATORS
+from ios_build.printer import Printer, getPrinter
+from ios_build.errors import IOSBuildError
+
+# Generators in order of preference when there are no recorded times
+PREFERENCE = ["Ninja", "Ninja Multi-Config", "Unix Makefiles", "Xcode"]
+
+# Build tool required by each generator
+GENERATOR_TOOLS = {
+    "Ninja": "ninja",
+    "Ninja Multi-Config": "ninja",
+    "Unix Makefiles": "make",
+    "Xcode": "xcodebuild",
+}
+
+# Number of lines of `cmake --help` kept, the generators are listed last
+HELP_LINES = 1000
+
+# Version of the recorded times, incremented when times are no longer comparable
+# with those of previous versions, e.g. since single-config generators build
+# with `CMAKE_BUILD_TYPE`
+TIMES_VERSION = 2
+
+GENERATORS_LOCK = threading.Lock()
+
+
+def generatorsFile() -> str:
+    """
+    File recording the generators of each CMake executable and the measured
+    times of each generator, `generators.json` in the user cache directory.
+    """
+    return cacheHome("generators.json")
+
+
+def loadGenerators() -> dict:
+    """
+    Load the contents of `generatorsFile`. Times recorded by a previous
+    `TIMES_VERSION` are discarded.
+
+    Returns:
+        dict: Generators of each CMake executable (`cmake`) and times of each generator (`times`).
+    """
+    try:
+        with open(generatorsFile()) as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        data = {}
+
+    times = data.get("times", {}) if data.get("version") == TIMES_VERSION else {}
+    return {"cmake": data.get("cmake", {}), "times": times}
+
+
+def saveGenerators(data: dict):
+    """
+    Write `data` to `generatorsFile` atomically.
+
+    Args:
+        data (dict): Generators of each CMake executable and times of each generator.
+    """
+    path = generatorsFile()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = "{0}.{1}.{2}.tmp".format(path, os.getpid(), threading.get_ident())
+    with open(tmp, "w") as f:
+        json.dump({**data, "version": TIMES_VERSION}, f, indent=2)
+    os.replace(tmp, path)
+
+
+def parseGenerators(help_text: str) -> list[str]:
+    """
+    Parse the list of generators from the output of `cmake --help`. Each generator
+    is listed on a line indented by two characters (the first is `*` for the
+    default generator), long names are followed by their description on the
+    next line.
+
+    Args:
+        help_text (str): Output of `cmake --help`
+
+    Returns:
+        list[str]: Names of all generators supported by CMake.
+    """
+    lines = help_text.splitlines()
+    for i, line in enumerate(lines):
+        if line.startswith("The following generators are available"):
+            lines = lines[i + 1 :]
+            break
+    else:
+        return []
+
+    generators = []
+    for line in lines:
+        if line[:2] not in ("  ", "* ") or not line[2:3].strip():
+            continue
+        name = line[2:].partition("=")[0].strip()
+        if name:
+            generators.append(name)
+
+    return generators
+
+
+def cmakeGenerators(cmake_command: str = "cmake", **kwargs) -> list[str]:
+    """
+    Generators supported by `cmake_command`. The result is cached in
+    `generatorsFile` until the CMake executable changes.
+
+    Args:
+        cmake_command (str, optional): Custom CMake command. Defaults to "cmake".
+
+    Returns:
+        list[str]: Names of all generators supported by CMake.
+    """
+    executable = shutil.which(cmake_command)
+    if not executable:
+        raise IOSBuildError("CMake not found")
+    executable = os.path.realpath(executable)
+    stat = os.stat(executable)
+    version = [stat.st_size, stat.st_mtime_ns]
+
+    with GENERATORS_LOCK:
+        cached = loadGenerators()["cmake"].get(executable)
+    if cached and cached["version"] == version:
+        return cached["generators"]
+
+    result = interface.cmake(
+        "--help",
+        cmake_command=cmake_command,
+        log_lines=HELP_LINES,
+        printer=Printer(print_level=-1),
+    )
+    generators = parseGenerators(result.stdout.decode())
+
+    with GENERATORS_LOCK:
+        data = loadGenerators()
+        data["cmake"][executable] = {"version": version, "generators": generators}
+        saveGenerators(data)
+
+    return generators
+
+
+def availableGenerators(xcode_build_command: str = "xcodebuild", **kwargs) -> list[str]:
+    """
+    Generators supported by both iOSBuild and CMake whose build tool is installed.
+
+    Args:
+        xcode_build_command (str, optional): Custom xcodebuild command. Defaults to "xcodebuild".
+
+    Returns:
+        list[str]: Names of available generators.
+    """
+    supported = cmakeGenerators(**kwargs)
+    tools = {**GENERATOR_TOOLS, "Xcode": xcode_build_command}
+
+    return [
+        generator
+        for generator in GENERATORS
+        if generator in supported and shutil.which(tools[generator])
+    ]
+
+
+def recordTimes(generator: str, platform: str, times: dict[str, float]):
+    """
+    Record the time taken to configure and build `platform` with `generator`.
+    The mean of all recorded times is kept.
+
+    Args:
+        generator (str): CMake generator
+        platform (str): Platform built
+        times (dict[str, float]): Duration in seconds of the `configure` and `build` steps.
+    """
+    with GENERATORS_LOCK:
+        data = loadGenerators()
+        record = data["times"].setdefault(generator, {}).setdefault(platform, {})
+        runs = record.get("runs", 0)
+        for step in ["configure", "build"]:
+            record[step] = (record.get(step, 0) * runs + times[step]) / (runs + 1)
+        record["runs"] = runs + 1
+        saveGenerators(data)
+
+
+def selectGenerator(
+    available: list[str], platforms: list[str], times: dict = None
+) -> str:
+    """
+    Select the fastest of the `available` generators for `platforms`. Generators
+    are compared using the mean configure and build times recorded for all of
+    the platforms. Until every available generator has been timed for all
+    platforms, the first untimed generator in order of `PREFERENCE` is selected.
+
+    Args:
+        available (list[str]): Available generators
+        platforms (list[str]): Platforms to build
+        times (dict, optional): Recorded times of each generator. Defaults to None.
+
+    Raises:
+        IOSBuildError: Raised if no generators are available.
+
+    Returns:
+        str: Name of selected generator
+    """
+    candidates = [generator for generator in PREFERENCE if generator in available]
+    if not candidates:
+        raise IOSBuildError("No CMake generator available")
+
+    scores = {}
+    for generator in candidates:
+        records = (times or {}).get(generator, {})
+        if not all(platform in records for platform in platforms):
+            return generator
+        scores[generator] = sum(
+            records[platform]["configure"] + records[platform]["build"]
+            for platform in platforms
+        )
+
+    return min(scores, key=scores.get)
+
+
+def resolveGenerator(
+    generator: str = "Xcode", platforms: list[str] = None, **kwargs
+) -> str:
+    """
+    Resolve the `auto` generator to the fastest available generator, see
+    `selectGenerator`. Any other generator is returned unchanged.
+
+    Args:
+        generator (str, optional): CMake generator or `auto`. Defaults to "Xcode".
+        platforms (list[str], optional): Platforms to build. Defaults to None.
+
+    Returns:
+        str: Name of generator
+    """
+    if generator != "auto":
+        return generator
+
+    printer = getPrinter(**kwargs)
+    available = availableGenerators(**kwargs)
+    printer.printValue("Available generators", ", ".join(available), verbosity=1)
+
+    with GENERATORS_LOCK:
+        times = loadGenerators()["times"]
+    generator = selectGenerator(available, platforms or [], times)
+    printer.printValue("Generator", "{} (auto)".format(generator))
+
+    return generator
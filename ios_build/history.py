@@ -0,0 +1,431 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import tempfile
+import threading
+import contextlib
+
+from ios_build.cache import cacheHome
+from ios_build.printer import Printer, getPrinter
+from ios_build.errors import errorStatus
+
+# Version of the database schema, stored as `PRAGMA user_version`
+SCHEMA_VERSION = 1
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    started REAL NOT NULL,
+    duration REAL,
+    project TEXT NOT NULL,
+    platforms TEXT NOT NULL,
+    options TEXT NOT NULL,
+    status INTEGER,
+    message TEXT,
+    cache_hits INTEGER NOT NULL DEFAULT 0,
+    cache_misses INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS steps (
+    run INTEGER NOT NULL REFERENCES runs(id) ON DELETE CASCADE,
+    step TEXT NOT NULL,
+    platform TEXT,
+    config TEXT,
+    duration REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS artifacts (
+    run INTEGER NOT NULL REFERENCES runs(id) ON DELETE CASCADE,
+    kind TEXT NOT NULL,
+    library TEXT NOT NULL,
+    platform TEXT,
+    config TEXT,
+    size INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS runs_project ON runs(project, started);
+CREATE INDEX IF NOT EXISTS steps_run ON steps(run);
+CREATE INDEX IF NOT EXISTS artifacts_run ON artifacts(run);
+"""
+
+# Number of runs kept in the database, older runs are removed
+MAX_RUNS = 10000
+
+# Options which do not affect the result of a build
+RUN_OPTIONS_EXCLUDE = ["printer", "tracer", "recorder", "print_level", "trace_file"]
+
+
+def historyDatabase() -> str:
+    """
+    Database recording every build, `history.db` in the user cache directory.
+    """
+    return cacheHome("history.db")
+
+
+def connect(path: str = None) -> sqlite3.Connection:
+    """
+    Open the history database, creating the tables if necessary.
+
+    Args:
+        path (str, optional): Path to the database. Defaults to `historyDatabase()`.
+
+    Returns:
+        sqlite3.Connection: Connection to the database
+    """
+    path = path or historyDatabase()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    db = sqlite3.connect(path, timeout=30)
+    db.execute("PRAGMA foreign_keys = ON")
+    if db.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+        with db:
+            db.executescript(SCHEMA)
+            db.execute("PRAGMA user_version = {}".format(SCHEMA_VERSION))
+
+    return db
+
+
+class Recorder:
+    """
+    Class to collect the durations of the steps, the cache results and the
+    sizes of the artifacts of a build, which are saved to the history database
+    as one run, see `recordRun`.
+    """
+
+    def __init__(self, enabled: bool = True, config: str = None, records: dict = None):
+        """
+        Args:
+            enabled (bool, optional): Collect records. Defaults to True.
+            config (str, optional): Configuration of records without one. Defaults to None.
+            records (dict, optional): Records shared with another recorder, see `bind`. Defaults to None.
+        """
+        self.enabled = enabled
+        self.config = config
+        self.records = records or {"steps": [], "artifacts": [], "cache": [0, 0]}
+        self.lock = threading.Lock()
+
+    def bind(self, config: str) -> "Recorder":
+        """
+        Recorder sharing the records of this recorder, which tags records
+        with the configuration `config`.
+        """
+        recorder = Recorder(self.enabled, config=config, records=self.records)
+        recorder.lock = self.lock
+        return recorder
+
+    def step(
+        self, step: str, duration: float, platform: str = None, config: str = None
+    ):
+        """
+        Record the duration in seconds of a step of the build.
+        """
+        if self.enabled:
+            with self.lock:
+                self.records["steps"].append(
+                    (step, platform, config or self.config, duration)
+                )
+
+    def artifact(
+        self, kind: str, library: str, size: int, platform: str = None, config=None
+    ):
+        """
+        Record the size in bytes of an installed `library` or an `xcframework`.
+        """
+        if self.enabled:
+            with self.lock:
+                self.records["artifacts"].append(
+                    (kind, library, platform, config or self.config, size)
+                )
+
+    def cacheResult(self, hit: bool):
+        """
+        Record a hit or miss of the build cache.
+        """
+        if self.enabled:
+            with self.lock:
+                self.records["cache"][0 if hit else 1] += 1
+
+
+def getRecorder(**kwargs) -> Recorder:
+    return kwargs.get("recorder") or Recorder(enabled=False)
+
+
+def optionsDigest(**kwargs) -> str:
+    """
+    Digest of the options of a build, used to compare runs with identical options.
+    """
+    options = {
+        key: value
+        for key, value in kwargs.items()
+        if key not in RUN_OPTIONS_EXCLUDE
+        and not isinstance(value, tempfile.TemporaryDirectory)
+    }
+    return hashlib.sha256(
+        json.dumps(options, sort_keys=True, default=str).encode()
+    ).hexdigest()
+
+
+def saveRun(run: dict, recorder: Recorder, path: str = None) -> int:
+    """
+    Save a run and the records of `recorder` to the history database.
+
+    Args:
+        run (dict): Columns of the `runs` table
+        recorder (Recorder): Recorder of the run
+        path (str, optional): Path to the database. Defaults to `historyDatabase()`.
+
+    Returns:
+        int: Id of the run
+    """
+    hits, misses = recorder.records["cache"]
+    with contextlib.closing(connect(path)) as db, db:
+        run_id = db.execute(
+            "INSERT INTO runs (started, duration, project, platforms, options,"
+            " status, message, cache_hits, cache_misses)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                run["started"],
+                run["duration"],
+                run["project"],
+                json.dumps(run["platforms"]),
+                run["options"],
+                run["status"],
+                run["message"],
+                hits,
+                misses,
+            ),
+        ).lastrowid
+        db.executemany(
+            "INSERT INTO steps (run, step, platform, config, duration)"
+            " VALUES (?, ?, ?, ?, ?)",
+            [(run_id, *record) for record in recorder.records["steps"]],
+        )
+        db.executemany(
+            "INSERT INTO artifacts (run, kind, library, platform, config, size)"
+            " VALUES (?, ?, ?, ?, ?, ?)",
+            [(run_id, *record) for record in recorder.records["artifacts"]],
+        )
+        db.execute("DELETE FROM runs WHERE id <= ?", (run_id - MAX_RUNS,))
+
+    return run_id
+
+
+@contextlib.contextmanager
+def recordRun(
+    path: str = None, platforms: list[str] = None, history: bool = True, **kwargs
+):
+    """
+    Record a build run in the `with` block in the history database. The
+    recorder of the run is passed to the steps of the build as `recorder`.
+    Runs which raise an exception are saved with the exit status of the
+    error. Failures to save the run are reported and do not fail the build.
+
+    Args:
+        path (str, optional): Path to the CMake project. Defaults to None.
+        platforms (list[str], optional): Platforms built. Defaults to None.
+        history (bool, optional): Save the run. Defaults to True.
+
+    Yields:
+        Recorder: Recorder of the run
+    """
+    recorder = Recorder(enabled=history)
+    started = time.time()
+    run = {
+        "started": started,
+        "project": os.path.realpath(path or "."),
+        "platforms": platforms or [],
+        "options": optionsDigest(path=path, platforms=platforms, **kwargs),
+        "status": None,
+        "message": None,
+    }
+    try:
+        yield recorder
+        run["status"] = 0
+    except Exception as error:
+        run["status"], run["message"] = errorStatus(error)
+        raise
+    finally:
+        run["duration"] = time.time() - started
+        if history:
+            try:
+                saveRun(run, recorder)
+            except (OSError, sqlite3.Error) as error:
+                printer = getPrinter(**kwargs)
+                printer.printValue("Build history not saved", error, verbosity=1)
+
+
+def platformDurations(
+    path: str, platforms: list[str], runs: int, database: str = None
+) -> dict[str, list[float]]:
+    """
+    Total durations of the most recent `runs` builds of each of `platforms` of
+    the project at `path`.
+
+    Returns:
+        dict[str, list[float]]: Durations in seconds keyed by platform, platforms without any runs are missing.
+    """
+    if not os.path.isfile(database or historyDatabase()):
+        return {}
+
+    durations = {}
+    with contextlib.closing(connect(database)) as db:
+        for platform in platforms:
+            rows = db.execute(
+                "SELECT steps.duration FROM steps JOIN runs ON steps.run = runs.id"
+                " WHERE runs.project = ? AND steps.platform = ? AND steps.step = 'total'"
+                " ORDER BY runs.id DESC LIMIT ?",
+                (os.path.realpath(path), platform, runs),
+            ).fetchall()
+            if rows:
+                durations[platform] = [row[0] for row in rows]
+
+    return durations
+
+
+def percentile(values: list[float], fraction: float) -> float:
+    """
+    Percentile of `values` using linear interpolation between the closest ranks.
+    """
+    values = sorted(values)
+    position = (len(values) - 1) * fraction
+    lower = int(position)
+    upper = min(lower + 1, len(values) - 1)
+    return values[lower] + (values[upper] - values[lower]) * (position - lower)
+
+
+def queryStats(
+    project: str = None, days: float = 30, limit: int = 10, database: str = None
+) -> dict:
+    """
+    Trends of the runs of the last `days` days, of the project at `project`
+    or of all projects.
+
+    Args:
+        project (str, optional): Path to the CMake project. Defaults to None.
+        days (float, optional): Number of days to include. Defaults to 30.
+        limit (int, optional): Number of platforms and libraries to include. Defaults to 10.
+        database (str, optional): Path to the database. Defaults to `historyDatabase()`.
+
+    Returns:
+        dict: Number of `runs`, `failures` and cache `hits` and `misses`, p50 and p95 of
+        each step (`steps`), mean duration of the slowest `platforms` and the first
+        and latest size of the `libraries` whose frameworks grew the most.
+    """
+    where = "runs.started >= ?"
+    parameters = [time.time() - days * 86400]
+    if project:
+        where += " AND runs.project = ?"
+        parameters.append(os.path.realpath(project))
+
+    stats = {
+        "runs": 0,
+        "failures": 0,
+        "hits": 0,
+        "misses": 0,
+        "steps": {},
+        "platforms": [],
+        "libraries": [],
+    }
+    if not os.path.isfile(database or historyDatabase()):
+        return stats
+
+    with contextlib.closing(connect(database)) as db:
+        row = db.execute(
+            "SELECT COUNT(*), COUNT(NULLIF(status, 0)),"
+            " TOTAL(cache_hits), TOTAL(cache_misses) FROM runs WHERE " + where,
+            parameters,
+        ).fetchone()
+        stats["runs"], stats["failures"] = row[0], row[1]
+        stats["hits"], stats["misses"] = int(row[2]), int(row[3])
+
+        durations = {}
+        for step, duration in db.execute(
+            "SELECT steps.step, steps.duration FROM steps"
+            " JOIN runs ON steps.run = runs.id WHERE " + where,
+            parameters,
+        ):
+            durations.setdefault(step, []).append(duration)
+        stats["steps"] = {
+            step: (percentile(values, 0.5), percentile(values, 0.95))
+            for step, values in durations.items()
+        }
+
+        stats["platforms"] = db.execute(
+            "SELECT steps.platform, AVG(steps.duration), COUNT(*) FROM steps"
+            " JOIN runs ON steps.run = runs.id"
+            " WHERE steps.step = 'total' AND " + where + " GROUP BY steps.platform"
+            " ORDER BY AVG(steps.duration) DESC LIMIT ?",
+            [*parameters, limit],
+        ).fetchall()
+
+        sizes = {}
+        for library, size in db.execute(
+            "SELECT artifacts.library, SUM(artifacts.size) FROM artifacts"
+            " JOIN runs ON artifacts.run = runs.id"
+            " WHERE artifacts.kind = 'xcframework' AND "
+            + where
+            + " GROUP BY artifacts.run, artifacts.library ORDER BY artifacts.run",
+            parameters,
+        ):
+            sizes.setdefault(library, []).append(size)
+        libraries = [(lib, values[0], values[-1]) for lib, values in sizes.items()]
+        libraries.sort(key=lambda item: item[2] - item[1], reverse=True)
+        stats["libraries"] = libraries[:limit]
+
+    return stats
+
+
+def formatSize(size: int) -> str:
+    """
+    Format a size in bytes for printing.
+    """
+    if abs(size) < 1024:
+        return "{} B".format(size)
+    for unit in ["KB", "MB", "GB"]:
+        size /= 1024
+        if abs(size) < 1024 or unit == "GB":
+            return "{0:.1f} {1}".format(size, unit)
+
+
+def printStats(stats: dict, **kwargs):
+    """
+    Print the trends obtained using `queryStats`.
+    """
+    printer = getPrinter(**kwargs)
+    printer.printValue(
+        "Runs", "{0} ({1} failed)".format(stats["runs"], stats["failures"])
+    )
+    lookups = stats["hits"] + stats["misses"]
+    if lookups:
+        printer.printValue(
+            "Build cache",
+            "{0} hits, {1} misses".format(stats["hits"], stats["misses"]),
+        )
+
+    if stats["steps"]:
+        printer.print("\nStep durations (p50 / p95)")
+        for step, (p50, p95) in sorted(stats["steps"].items()):
+            printer.printValue(step, "{0:.1f}s / {1:.1f}s".format(p50, p95))
+
+    if stats["platforms"]:
+        printer.print("\nSlowest platforms (mean)")
+        for platform, mean, runs in stats["platforms"]:
+            printer.printValue(platform, "{0:.1f}s ({1} runs)".format(mean, runs))
+
+    if stats["libraries"]:
+        printer.print("\nXCFramework size (first -> latest)")
+        for library, first, latest in stats["libraries"]:
+            printer.printValue(
+                library,
+                "{0} -> {1} ({2:+.1f}%)".format(
+                    formatSize(first),
+                    formatSize(latest),
+                    100 * (latest - first) / first if first else 0,
+                ),
+            )
+
+
+def runStats(print_level: int = 0, **kwargs):
+    """
+    Run the `stats` command using the options obtained from the parser.
+    """
+    printer = Printer(print_level=print_level)
+    printStats(queryStats(**kwargs), printer=printer)
@@ -1,45 +1,290 @@
+import os
+import gzip
+import time
+import asyncio
+import weakref
+import threading
 import subprocess
+import collections
 
 from ios_build.printer import Printer, getPrinter
 from ios_build.errors import CMakeError, IOSBuildError, XCodeBuildError
 
+# Maximum number of processes run concurrently by each event loop, and by all
+# threads calling `callSubProcess`
+MAX_PROCESSES = os.cpu_count() or 1
+SEMAPHORES = weakref.WeakKeyDictionary()
+THREAD_SEMAPHORE = None
+THREAD_SEMAPHORE_LOCK = threading.Lock()
 
-def callSubProcess(command: list, printer: Printer):
+# Maximum length of a line of process output
+LINE_LIMIT = 1 << 20
+
+# Number of lines of each output stream kept in memory
+LOG_LINES = 100
+
+ProcessResult = collections.namedtuple(
+    "ProcessResult", ["command", "returncode", "stdout", "stderr", "duration"]
+)
+ProcessResult.__doc__ = """
+Result of a subprocess.
+
+Attributes:
+    command (list): Command which was run
+    returncode (int): Exit status of the process
+    stdout (bytes): Last lines of the output of the process
+    stderr (bytes): Last lines of the error output of the process
+    duration (float): Time from starting the process until it exited, in seconds
+"""
+
+
+def processSemaphore() -> asyncio.Semaphore:
+    """
+    Semaphore limiting the number of processes run concurrently by the running
+    event loop to `MAX_PROCESSES`.
+
+    Returns:
+        asyncio.Semaphore: Semaphore of the running event loop
+    """
+    loop = asyncio.get_running_loop()
+    if loop not in SEMAPHORES:
+        SEMAPHORES[loop] = asyncio.Semaphore(MAX_PROCESSES)
+
+    return SEMAPHORES[loop]
+
+
+def threadSemaphore() -> threading.BoundedSemaphore:
+    """
+    Semaphore limiting the number of processes run concurrently by
+    `callSubProcess` in all threads to `MAX_PROCESSES`. Each call runs its
+    own event loop, so `processSemaphore` does not limit them.
+
+    Returns:
+        threading.BoundedSemaphore: Semaphore shared by all threads
+    """
+    global THREAD_SEMAPHORE
+    with THREAD_SEMAPHORE_LOCK:
+        if THREAD_SEMAPHORE is None:
+            THREAD_SEMAPHORE = threading.BoundedSemaphore(MAX_PROCESSES)
+
+    return THREAD_SEMAPHORE
+
+
+def logPath(
+    name: str, log_dir: str = None, compress_logs: bool = False, **kwargs
+) -> str:
+    """
+    Path of the log file `name` in `log_dir`, the parent directory is created
+    if necessary.
+
+    Args:
+        name (str): Name of log relative to `log_dir`, e.g. `{platform}/build`
+        log_dir (str, optional): Directory for log files. Defaults to None.
+        compress_logs (bool, optional): Compress the log with gzip. Defaults to False.
+
+    Returns:
+        str: Path of log file, or None if `log_dir` is not specified.
+    """
+    if not log_dir:
+        return None
+
+    path = os.path.join(log_dir, name + (".log.gz" if compress_logs else ".log"))
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    return path
+
+
+def openLog(log_file: str):
+    """
+    Open `log_file` for writing in binary mode, compressed with gzip if the
+    file name ends with `.gz`.
+
+    Args:
+        log_file (str): Path of log file
+
+    Returns:
+        File object
+    """
+    if log_file.endswith(".gz"):
+        return gzip.open(log_file, "wb")
+
+    return open(log_file, "wb")
+
+
+async def readLines(
+    stream: asyncio.StreamReader, callbacks: list = [], log_lines: int = LOG_LINES
+) -> bytes:
+    """
+    Read a stream line by line until it is closed, passing each line to each
+    of the `callbacks`. Only the last `log_lines` lines are kept in memory.
+    Lines longer than the limit of the stream are read in chunks of the limit.
+
+    Args:
+        stream (asyncio.StreamReader): Stream to read
+        callbacks (list, optional): Functions called with each line. Defaults to [].
+        log_lines (int, optional): Number of lines to keep. Defaults to LOG_LINES.
+
+    Returns:
+        bytes: Last `log_lines` lines read from the stream
+    """
+    lines = collections.deque(maxlen=log_lines)
+    while True:
+        try:
+            line = await stream.readuntil(b"\n")
+        except asyncio.IncompleteReadError as error:
+            line = error.partial
+        except asyncio.LimitOverrunError as error:
+            line = await stream.read(error.consumed)
+        if not line:
+            break
+        lines.append(line)
+        for callback in callbacks:
+            callback(line)
+
+    return b"".join(lines)
+
+
+async def runProcess(
+    command: list,
+    printer: Printer,
+    log_file: str = None,
+    log_lines: int = LOG_LINES,
+    env: dict[str, str] = None,
+) -> ProcessResult:
+    """
+    Run a subprocess specified using a list of commands. Output is streamed to
+    the `printer` line by line while the process runs (stdout if the printer shows
+    output, stderr if it shows errors) and to `log_file`, if specified. Only the
+    last `log_lines` lines of each stream are kept in memory. The error output
+    of a failed process is always printed, along with the path of the log file.
+    If the calling task is cancelled or reading the output fails, the process
+    is killed.
+    The number of concurrent processes is limited by `processSemaphore`.
+
+    Args:
+        command (list): List of commands to run.
+        printer (Printer): Printer class
+        log_file (str, optional): File to which all output is written, compressed
+            if the name ends with `.gz`. Defaults to None.
+        log_lines (int, optional): Number of lines of output kept. Defaults to LOG_LINES.
+        env (dict[str, str], optional): Additional environment variables. Defaults to None.
+
+    Returns:
+        ProcessResult: Exit status, output and duration of the process.
+    """
+    output_callbacks = [printer.printOutput] if printer.showOutput() else []
+    error_callbacks = [printer.printError] if printer.showError() else []
+
+    async with processSemaphore():
+        start = time.perf_counter()
+        process = await asyncio.create_subprocess_exec(
+            *command,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            limit=LINE_LIMIT,
+            env={**os.environ, **env} if env else None,
+        )
+        log = None
+        try:
+            if log_file:
+                log = openLog(log_file)
+                output_callbacks.append(log.write)
+                error_callbacks.append(log.write)
+            stdout, stderr = await asyncio.gather(
+                readLines(process.stdout, output_callbacks, log_lines),
+                readLines(process.stderr, error_callbacks, log_lines),
+            )
+            returncode = await process.wait()
+        except BaseException:
+            if process.returncode is None:
+                process.kill()
+                await process.wait()
+            raise
+        finally:
+            if log:
+                log.close()
+
+    if returncode:
+        if not printer.showError():
+            printer.printError(stderr)
+        if log_file:
+            printer.printValue("Log file", os.path.abspath(log_file))
+
+    return ProcessResult(
+        command, returncode, stdout, stderr, time.perf_counter() - start
+    )
+
+
+def callSubProcess(command: list, printer: Printer, **kwargs) -> ProcessResult:
     """
-    Call a subprocess specified using a list of commands.
+    Call a subprocess specified using a list of commands, see `runProcess`.
+    The number of processes run concurrently by all threads is limited by
+    `threadSemaphore`.
 
     Args:
         command (list): List of commands to run formatted for `subprocess`.
         printer (Printer): Printer class
+        log_file (str, optional): File to which all output is written. Defaults to None.
+        log_lines (int, optional): Number of lines of output kept. Defaults to LOG_LINES.
+        env (dict[str, str], optional): Additional environment variables. Defaults to None.
 
     Raises:
         RuntimeError: Raised if the process returns a non-zero exit code.
+
+    Returns:
+        ProcessResult: Exit status, output and duration of the process.
     """
-    stdout = None if printer.showOutput() else subprocess.PIPE
-    stderr = None if printer.showError() else subprocess.PIPE
+    with threadSemaphore():
+        result = asyncio.run(runProcess(command, printer, **kwargs))
+    checkResult(result)
 
-    p = subprocess.run(command, stdout=stdout, stderr=stderr)
+    return result
 
-    try:
-        p.check_returncode()
-    except subprocess.CalledProcessError as e:
-        printer.printError(p.stderr)
-        raise RuntimeError(e)
+
+def checkResult(result: ProcessResult):
+    """
+    Check the exit status of a process.
+
+    Args:
+        result (ProcessResult): Result of the process
+
+    Raises:
+        RuntimeError: Raised if the process returned a non-zero exit code.
+    """
+    if result.returncode:
+        raise RuntimeError(
+            subprocess.CalledProcessError(result.returncode, result.command)
+        )
 
 
-def cmake(*args, cmake_command: str = "cmake", **kwargs):
+def cmake(
+    *args,
+    cmake_command: str = "cmake",
+    log_file: str = None,
+    log_lines: int = LOG_LINES,
+    env: dict[str, str] = None,
+    **kwargs,
+) -> ProcessResult:
     """
     Runs `cmake` using subprocess.
 
     Args:
         cmake_command (str, optional): Custom CMake command. Defaults to "cmake".
+        log_file (str, optional): File to which all output is written. Defaults to None.
+        log_lines (int, optional): Number of lines of output kept. Defaults to LOG_LINES.
+        env (dict[str, str], optional): Additional environment variables. Defaults to None.
         verbose (bool): Toggle additional output
+
+    Returns:
+        ProcessResult: Exit status, output and duration of the process.
     """
     printer = getPrinter(**kwargs)
     command = [cmake_command, *args]
     printer.print(" ".join(command), verbosity=2)
     try:
-        callSubProcess(command, printer)
+        return callSubProcess(
+            command, printer, log_file=log_file, log_lines=log_lines, env=env
+        )
     except FileNotFoundError:
         raise IOSBuildError("CMake not found")
     except RuntimeError as e:
@@ -47,19 +292,102 @@ def cmake(*args, cmake_command: str = "cmake", **kwargs):
 
 
 # TODO No error thrown when xcframwork already exists
-def xcodebuild(*args, xcode_build_command: str = "xcodebuild", **kwargs):
+def xcodebuild(
+    *args,
+    xcode_build_command: str = "xcodebuild",
+    log_file: str = None,
+    log_lines: int = LOG_LINES,
+    env: dict[str, str] = None,
+    **kwargs,
+) -> ProcessResult:
     """
     Runs `xcodebuild` using subprocess.
 
     Args:
         xcode_build_command (str, optional): Custom xcodebuild command. Defaults to "xcodebuild".
+        log_file (str, optional): File to which all output is written. Defaults to None.
+        log_lines (int, optional): Number of lines of output kept. Defaults to LOG_LINES.
+        env (dict[str, str], optional): Additional environment variables. Defaults to None.
+
+    Returns:
+        ProcessResult: Exit status, output and duration of the process.
     """
     printer = getPrinter(**kwargs)
     command = [xcode_build_command, *args]
     printer.print(" ".join(command), verbosity=2)
     try:
-        callSubProcess(command, printer)
+        return callSubProcess(
+            command, printer, log_file=log_file, log_lines=log_lines, env=env
+        )
     except FileNotFoundError:
         raise IOSBuildError("XCodeBuild not found")
     except RuntimeError as e:
         raise XCodeBuildError(e)
+
+
+async def cmakeAsync(
+    *args,
+    cmake_command: str = "cmake",
+    log_file: str = None,
+    log_lines: int = LOG_LINES,
+    env: dict[str, str] = None,
+    **kwargs,
+) -> ProcessResult:
+    """
+    Runs `cmake` as an asyncio subprocess, see `runProcess`.
+
+    Args:
+        cmake_command (str, optional): Custom CMake command. Defaults to "cmake".
+        log_file (str, optional): File to which all output is written. Defaults to None.
+        log_lines (int, optional): Number of lines of output kept. Defaults to LOG_LINES.
+        env (dict[str, str], optional): Additional environment variables. Defaults to None.
+
+    Returns:
+        ProcessResult: Exit status, output and duration of the process.
+    """
+    printer = getPrinter(**kwargs)
+    command = [cmake_command, *args]
+    printer.print(" ".join(command), verbosity=2)
+    try:
+        result = await runProcess(command, printer, log_file, log_lines, env)
+        checkResult(result)
+    except FileNotFoundError:
+        raise IOSBuildError("CMake not found")
+    except RuntimeError as e:
+        raise CMakeError(e)
+
+    return result
+
+
+async def xcodebuildAsync(
+    *args,
+    xcode_build_command: str = "xcodebuild",
+    log_file: str = None,
+    log_lines: int = LOG_LINES,
+    env: dict[str, str] = None,
+    **kwargs,
+) -> ProcessResult:
+    """
+    Runs `xcodebuild` as an asyncio subprocess, see `runProcess`.
+
+    Args:
+        xcode_build_command (str, optional): Custom xcodebuild command. Defaults to "xcodebuild".
+        log_file (str, optional): File to which all output is written. Defaults to None.
+        log_lines (int, optional): Number of lines of output kept. Defaults to LOG_LINES.
+        env (dict[str, str], optional): Additional environment variables. Defaults to None.
+
+    Returns:
+        ProcessResult: Exit status, output and duration of the process.
+    """
+    printer = getPrinter(**kwargs)
+    command = [xcode_build_command, *args]
+    printer.print(" ".join(command), verbosity=2)
+    try:
+        result = await runProcess(command, printer, log_file, log_lines, env)
+        checkResult(result)
+    except FileNotFoundError:
+        raise IOSBuildError("XCodeBuild not found")
+    except RuntimeError as e:
+        raise XCodeBuildError(e)
+
+    return result
@@ -0,0 +1,191 @@
+import os
+import array
+import fcntl
+import shutil
+import termios
+import tempfile
+import threading
+import contextlib
+
+from ios_build.printer import getPrinter
+from ios_build.trace import getTracer
+
+# Interval in seconds between samples of the number of tokens in use
+SAMPLE_INTERVAL = 0.1
+
+
+class JobServer:
+    """
+    GNU make jobserver shared by every build tool run by iOSBuild, so that the
+    total number of concurrent compiler processes stays within `max_procs`
+    however many platforms are built at once.
+
+    Tokens are single bytes in a named pipe, clients which understand the
+    jobserver protocol (GNU make >= 4.4 and Ninja >= 1.12) find the pipe
+    using the `--jobserver-auth=fifo:PATH` option in `MAKEFLAGS` and take a
+    token from it before starting each additional job. Each client also runs
+    one job without a token, so iOSBuild holds a token on behalf of each
+    client for the duration of the build, see `token`.
+    """
+
+    def __init__(self, max_procs: int, sample_interval: float = SAMPLE_INTERVAL):
+        """
+        Create the named pipe and fill it with `max_procs` tokens.
+
+        Args:
+            max_procs (int): Maximum number of concurrent processes.
+            sample_interval (float, optional): Interval in seconds between
+                utilization samples. Defaults to SAMPLE_INTERVAL.
+        """
+        self.max_procs = max_procs
+        self.sample_interval = sample_interval
+        self.directory = tempfile.mkdtemp(prefix="ios_build_jobserver_")
+        self.path = os.path.join(self.directory, "fifo")
+        os.mkfifo(self.path, 0o600)
+        # Opened for reading and writing so that the pipe is never closed
+        self.fd = os.open(self.path, os.O_RDWR)
+        os.write(self.fd, b"+" * max_procs)
+
+        self.samples = 0
+        self.total = 0
+        self.peak = 0
+        self.stopped = threading.Event()
+        self.sampler = None
+
+    def available(self) -> int:
+        """
+        Number of tokens currently in the pipe.
+        """
+        buffer = array.array("i", [0])
+        fcntl.ioctl(self.fd, termios.FIONREAD, buffer)
+        return buffer[0]
+
+    def inUse(self) -> int:
+        """
+        Number of tokens currently held by clients.
+        """
+        return self.max_procs - self.available()
+
+    @contextlib.contextmanager
+    def token(self):
+        """
+        Hold a token for the duration of a `with` block, blocking until one is available.
+        """
+        token = os.read(self.fd, 1)
+        try:
+            yield
+        finally:
+            os.write(self.fd, token)
+
+    def env(self) -> dict[str, str]:
+        """
+        Environment variables which make clients use the jobserver.
+
+        Returns:
+            dict[str, str]: `MAKEFLAGS` for the client
+        """
+        return {
+            "MAKEFLAGS": "-j{0} --jobserver-auth=fifo:{1}".format(
+                self.max_procs, self.path
+            )
+        }
+
+    def sample(self, **kwargs):
+        """
+        Record the number of tokens in use every `sample_interval` seconds until
+        the jobserver is closed. Samples are added to the trace as a counter.
+        """
+        tracer = getTracer(**kwargs)
+        while not self.stopped.wait(self.sample_interval):
+            in_use = self.inUse()
+            self.samples += 1
+            self.total += in_use
+            self.peak = max(self.peak, in_use)
+            if tracer.enabled:
+                tracer.record(
+                    {
+                        "name": "jobserver",
+                        "cat": "ios_build",
+                        "ph": "C",
+                        "ts": tracer.timestamp(),
+                        "args": {"processes": in_use},
+                    }
+                )
+
+    def start(self, **kwargs):
+        """
+        Start sampling utilization in a background thread.
+        """
+        self.sampler = threading.Thread(
+            target=self.sample, kwargs=kwargs, name="jobserver", daemon=True
+        )
+        self.sampler.start()
+
+    def utilization(self) -> float:
+        """
+        Mean fraction of tokens in use over all samples.
+        """
+        if not self.samples:
+            return 0.0
+
+        return self.total / (self.samples * self.max_procs)
+
+    def close(self):
+        """
+        Stop sampling and remove the named pipe.
+        """
+        self.stopped.set()
+        if self.sampler:
+            self.sampler.join()
+        os.close(self.fd)
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+
+@contextlib.contextmanager
+def clientEnv(job_server: JobServer = None):
+    """
+    Hold a token of `job_server` for a client for the duration of a `with` block.
+
+    Args:
+        job_server (JobServer, optional): Jobserver. Defaults to None.
+
+    Yields:
+        dict[str, str]: Environment variables for the client, or None if there is no jobserver.
+    """
+    if job_server is None:
+        yield None
+        return
+
+    with job_server.token():
+        yield job_server.env()
+
+
+@contextlib.contextmanager
+def jobServer(max_procs: int = None, **kwargs):
+    """
+    Run a `JobServer` for the duration of a `with` block and report its
+    utilization on exit. Nothing is done if `max_procs` is not specified.
+
+    Args:
+        max_procs (int, optional): Maximum number of concurrent processes. Defaults to None.
+
+    Yields:
+        JobServer: The jobserver, or None if `max_procs` is not specified.
+    """
+    if not max_procs:
+        yield None
+        return
+
+    server = JobServer(max_procs)
+    server.start(**kwargs)
+    try:
+        yield server
+    finally:
+        server.close()
+        printer = getPrinter(**kwargs)
+        printer.printValue(
+            "Jobserver",
+            "peak {0}/{1} processes, mean utilization {2:.0%}".format(
+                server.peak, max_procs, server.utilization()
+            ),
+        )
@@ -0,0 +1,267 @@
+import os
+import json
+import shutil
+
+from ios_build import interface
+from ios_build.cache import cacheHome
+from ios_build.printer import Printer, getPrinter
+from ios_build.parser import COMPILER_CACHES
+from ios_build.errors import IOSBuildError
+
+# Languages compiled using the compiler cache
+LANGUAGES = ["C", "CXX", "OBJC", "OBJCXX"]
+
+# Statistics log of ccache in each platform build directory
+STATS_FILE = "ios_build_ccache_stats.log"
+
+
+def findCompilerCache(compiler_cache: str = "auto") -> tuple[str, str]:
+    """
+    Find the executable of `compiler_cache`, or the first installed compiler
+    cache in `COMPILER_CACHES` if `auto`.
+
+    Args:
+        compiler_cache (str, optional): Name of compiler cache or `auto`. Defaults to "auto".
+
+    Raises:
+        IOSBuildError: Raised if the compiler cache is not installed.
+
+    Returns:
+        tuple[str, str]: Name and path of compiler cache
+    """
+    names = COMPILER_CACHES if compiler_cache == "auto" else [compiler_cache]
+    for name in names:
+        path = shutil.which(name)
+        if path:
+            return name, path
+
+    raise IOSBuildError("Compiler cache not found: {}".format(" or ".join(names)))
+
+
+def cacheDirectory(name: str, compiler_cache_dir: str = None, **kwargs) -> str:
+    """
+    Directory of the compiler cache, which is stable between runs. Defaults to
+    `ios_build/{name}` in `$XDG_CACHE_HOME` or `~/.cache`.
+
+    Args:
+        name (str): Name of compiler cache
+        compiler_cache_dir (str, optional): Custom cache directory. Defaults to None.
+
+    Returns:
+        str: Path to compiler cache directory
+    """
+    if compiler_cache_dir:
+        return os.path.abspath(compiler_cache_dir)
+
+    return cacheHome(name)
+
+
+def cacheEnv(name: str, **kwargs) -> dict[str, str]:
+    """
+    Environment variables which set the directory of compiler cache `name`.
+    """
+    return {"{}_DIR".format(name.upper()): cacheDirectory(name, **kwargs)}
+
+
+def launcherOptions(
+    platform_dir: str,
+    compiler_cache: str = None,
+    platform: str = None,
+    cmake_options: dict = {},
+    platform_options: dict = {},
+    **kwargs,
+) -> dict[str, str]:
+    """
+    CMake cache options which compile all languages using the compiler cache.
+    The launcher sets the cache directory and, for ccache, a statistics log in
+    `platform_dir` so that the statistics of each platform are kept separately.
+    Launchers specified by the user in `cmake_options` or `platform_options` are not replaced.
+
+    Args:
+        platform_dir (str): CMake build directory of the platform.
+        compiler_cache (str, optional): Name of compiler cache or `auto`. Defaults to None.
+        platform (str, optional): Target platform. Defaults to None.
+        cmake_options (dict, optional): CMake cache options. Defaults to {}.
+        platform_options (dict, optional): Platform specific cmake cache options. Defaults to {}.
+
+    Returns:
+        dict[str, str]: CMake cache options, empty if no compiler cache is used.
+    """
+    if not compiler_cache:
+        return {}
+
+    name, path = findCompilerCache(compiler_cache)
+    env = cacheEnv(name, **kwargs)
+    if name == "ccache":
+        env["CCACHE_STATSLOG"] = os.path.join(platform_dir, STATS_FILE)
+    launcher = [
+        shutil.which("env") or "/usr/bin/env",
+        *["{0}={1}".format(k, v) for k, v in env.items()],
+        path,
+    ]
+
+    user_options = {**cmake_options, **platform_options.get(platform, {})}
+    options = {}
+    for language in LANGUAGES:
+        key = "CMAKE_{}_COMPILER_LAUNCHER".format(language)
+        if key not in user_options:
+            options[key] = ";".join(launcher)
+
+    return options
+
+
+def runCompilerCache(*args, compiler_cache: str = "auto", **kwargs) -> bytes:
+    """
+    Run the compiler cache with the cache directory used for builds.
+
+    Returns:
+        bytes: Output of the compiler cache
+    """
+    name, path = findCompilerCache(compiler_cache)
+    try:
+        result = interface.callSubProcess(
+            [path, *args],
+            Printer(print_level=-1),
+            env=cacheEnv(name, **kwargs),
+        )
+    except RuntimeError as e:
+        raise IOSBuildError("Compiler cache failed: {}".format(e))
+
+    return result.stdout
+
+
+def statsFiles(platform_dir: str) -> list[str]:
+    """
+    Statistics logs of the ccache builds of a platform, in `platform_dir` and
+    in the build directory of each configuration built separately.
+    """
+    directories = [platform_dir]
+    if os.path.isdir(platform_dir):
+        directories += sorted(
+            entry.path for entry in os.scandir(platform_dir) if entry.is_dir()
+        )
+
+    return [
+        os.path.join(directory, STATS_FILE)
+        for directory in directories
+        if os.path.isfile(os.path.join(directory, STATS_FILE))
+    ]
+
+
+def resetStats(platform_dir: str, compiler_cache: str = None, **kwargs):
+    """
+    Reset the statistics of the compiler cache before building a platform.
+    The ccache statistics logs of the platform are removed, sccache statistics
+    are shared by all platforms and are reset in `resetAllStats`.
+
+    Args:
+        platform_dir (str): CMake build directory of the platform.
+        compiler_cache (str, optional): Name of compiler cache or `auto`. Defaults to None.
+    """
+    if not compiler_cache:
+        return
+
+    for stats_file in statsFiles(platform_dir):
+        os.remove(stats_file)
+
+
+def resetAllStats(compiler_cache: str = None, **kwargs):
+    """
+    Reset the statistics of sccache before a build.
+
+    Args:
+        compiler_cache (str, optional): Name of compiler cache or `auto`. Defaults to None.
+    """
+    if compiler_cache and findCompilerCache(compiler_cache)[0] == "sccache":
+        runCompilerCache("--zero-stats", compiler_cache=compiler_cache, **kwargs)
+
+
+def readStatsLog(stats_file: str) -> tuple[int, int]:
+    """
+    Count the cache hits and misses in a ccache statistics log.
+
+    Args:
+        stats_file (str): Path to statistics log
+
+    Returns:
+        tuple[int, int]: Number of hits and misses
+    """
+    hits = misses = 0
+    if not os.path.isfile(stats_file):
+        return hits, misses
+
+    with open(stats_file) as f:
+        for line in f:
+            counter = line.strip()
+            if counter.endswith("_hit"):
+                hits += 1
+            elif counter == "cache_miss":
+                misses += 1
+
+    return hits, misses
+
+
+def readSccacheStats(output: bytes) -> tuple[int, int]:
+    """
+    Count the cache hits and misses in the output of `sccache --show-stats --stats-format json`.
+
+    Args:
+        output (bytes): Output of sccache
+
+    Returns:
+        tuple[int, int]: Number of hits and misses
+    """
+    stats = json.loads(output)["stats"]
+
+    def total(counter):
+        return sum(stats.get(counter, {}).get("counts", {}).values())
+
+    return total("cache_hits"), total("cache_misses")
+
+
+def formatStats(hits: int, misses: int) -> str:
+    total = hits + misses
+    rate = hits / total if total else 0
+
+    return "{0} hits, {1} misses ({2:.0%})".format(hits, misses, rate)
+
+
+def printStats(
+    build_dir: str, platforms: list[str], compiler_cache: str = None, **kwargs
+):
+    """
+    Print the compiler cache statistics of each platform built, or of all
+    platforms for sccache.
+
+    Args:
+        build_dir (str): Parent directory for all build files
+        platforms (list[str]): Platforms built
+        compiler_cache (str, optional): Name of compiler cache or `auto`. Defaults to None.
+    """
+    if not compiler_cache:
+        return
+
+    printer = getPrinter(**kwargs)
+    name = findCompilerCache(compiler_cache)[0]
+    if name == "sccache":
+        output = runCompilerCache(
+            "--show-stats",
+            "--stats-format",
+            "json",
+            compiler_cache=compiler_cache,
+            **kwargs,
+        )
+        printer.printValue("Compiler cache", formatStats(*readSccacheStats(output)))
+        return
+
+    totals = [0, 0]
+    for platform in platforms:
+        hits = misses = 0
+        for stats_file in statsFiles(os.path.join(build_dir, platform)):
+            file_hits, file_misses = readStatsLog(stats_file)
+            hits, misses = hits + file_hits, misses + file_misses
+        totals = [totals[0] + hits, totals[1] + misses]
+        printer.printValue(
+            "Compiler cache ({})".format(platform), formatStats(hits, misses)
+        )
+    printer.printValue("Compiler cache", formatStats(*totals))
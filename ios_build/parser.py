@@ -6,6 +6,48 @@ import argparse
 from ios_build.errors import IOSBuildError, ParserError
 
 
+# Platforms supported by the ios toolchain
+PLATFORMS = [
+    "OS",
+    "OS64",
+    "SIMULATOR",
+    "SIMULATOR64",
+    "SIMULATORARM64",
+    "VISIONOS",
+    "SIMULATOR_VISIONOS",
+    "TVOS",
+    "SIMULATOR_TVOS",
+    "SIMULATORARM64_TVOS",
+    "WATCHOS",
+    "SIMULATOR_WATCHOS",
+    "SIMULATORARM64_WATCHOS",
+    "MAC",
+    "MAC_ARM64",
+    "MAC_UNIVERSAL",
+    "MAC_CATALYST",
+    "MAC_CATALYST_ARM64",
+    "MAC_CATALYST_UNIVERSAL",
+]
+DEFAULT_PLATFORMS = ["OS64", "SIMULATORARM64", "MAC_ARM64"]
+
+# Compiler caches supported by iOSBuild
+COMPILER_CACHES = ["ccache", "sccache"]
+
+# Default Unix domain socket of the build server
+SERVER_SOCKET = os.path.join(
+    tempfile.gettempdir(), "ios_build-{}.sock".format(os.getuid())
+)
+
+# Default port of build workers
+WORKER_PORT = 7390
+
+# CMake generators supported by iOSBuild
+GENERATORS = ["Unix Makefiles", "Ninja", "Ninja Multi-Config", "Xcode"]
+
+# Generators which build every configuration from a single configure step
+MULTI_CONFIG_GENERATORS = ["Ninja Multi-Config", "Xcode"]
+
+
 def checkValues(val: str, options: dict):
     """
     Check CMake Cache string is of the form {OPTION}={VALUE} and return
@@ -57,7 +99,13 @@ def checkValues(val: str, options: dict):
             )
         )
 
-    protected_keys = ["CMAKE_TOOLCHAIN_FILE", "PLATFORM", "CMAKE_INSTALL_PREFIX"]
+    protected_keys = [
+        "CMAKE_TOOLCHAIN_FILE",
+        "PLATFORM",
+        "CMAKE_INSTALL_PREFIX",
+        "CMAKE_BUILD_TYPE",
+        "CMAKE_CONFIGURATION_TYPES",
+    ]
 
     if k in protected_keys:
         raise IOSBuildError(
@@ -69,6 +117,81 @@ def checkValues(val: str, options: dict):
     return k, v
 
 
+def positiveInt(value: str) -> int:
+    """
+    Argument type for options which require a positive integer.
+
+    Args:
+        value (str): Input string
+
+    Raises:
+        argparse.ArgumentTypeError: Raised if value is not a positive integer
+
+    Returns:
+        int: Input value as an integer
+    """
+    try:
+        result = int(value)
+    except ValueError:
+        result = 0
+
+    if result < 1:
+        raise argparse.ArgumentTypeError(
+            "invalid positive integer value: '{}'".format(value)
+        )
+
+    return result
+
+
+def nonNegativeInt(value: str) -> int:
+    """
+    Argument type for options which require a non-negative integer.
+
+    Args:
+        value (str): Input string
+
+    Raises:
+        argparse.ArgumentTypeError: Raised if value is not a non-negative integer
+
+    Returns:
+        int: Input value as an integer
+    """
+    try:
+        result = int(value)
+    except ValueError:
+        result = -1
+
+    if result < 0:
+        raise argparse.ArgumentTypeError(
+            "invalid non-negative integer value: '{}'".format(value)
+        )
+
+    return result
+
+
+def workerAddress(value: str) -> str:
+    """
+    Argument type for the address of a build worker, `HOST:PORT` or `HOST`
+    for the default port.
+
+    Args:
+        value (str): Input string
+
+    Raises:
+        argparse.ArgumentTypeError: Raised if the port is not a positive integer
+
+    Returns:
+        str: Address in the form `HOST:PORT`
+    """
+    host, _, port = value.rpartition(":")
+    if not host:
+        return "{0}:{1}".format(value, WORKER_PORT)
+    if not port.isdigit() or int(port) < 1:
+        raise argparse.ArgumentTypeError("invalid worker address: '{}'".format(value))
+
+    return value
+
+
 def sortCMakeOptions(options: list) -> dict:
     """
     Sort CMake Cache variables into a dictionary.
@@ -133,6 +256,8 @@ def sortArgs(kwargs: argparse.Namespace) -> dict:
             if v:
                 assert arg_dict["platform_json"] is None
                 output["platform_options"] = json.loads(v)
+        elif k == "configs":
+            output["configs"] = list(dict.fromkeys(v))
         elif k == "quiet":
             if v:
                 print_level = -1
@@ -144,14 +269,13 @@ def sortArgs(kwargs: argparse.Namespace) -> dict:
     return {**output, "print_level": print_level}
 
 
-def parseArgs(args=None):
+def createParser() -> argparse.ArgumentParser:
     """
-    Main parser, parses the command-line arguments using `argparse`.
+    Create the main parser of the command-line arguments.
     The full list of arguments is found using the help option `-h`.
-    Note that any errors in argparse return a `SystemExit` signal which must be caught.
 
-    Args:
-        args (optional): Optional additional arguments (for testing purposes).
+    Returns:
+        argparse.ArgumentParser: Main parser
     """
     parser = argparse.ArgumentParser(
         prog="iOSBuild",
@@ -178,7 +302,8 @@ def parseArgs(args=None):
     parser.add_argument(
         "--toolchain",
         "-t",
-        help="URL for toolchain file for cmake",
+        help="Paths or URLs of toolchain file for cmake, multiple mirrors are downloaded concurrently and the first valid response is used",
+        nargs="+",
         default="https://github.com/leetal/ios-cmake/blob/master/ios.toolchain.cmake?raw=true",
     )
 
@@ -188,6 +313,36 @@ def parseArgs(args=None):
         default=tempfile.TemporaryDirectory(),
     )
 
+    parser.add_argument(
+        "--toolchain-cache",
+        help="Directory for the persistent toolchain cache (default=~/.cache/ios_build/toolchain)",
+    )
+
+    parser.add_argument(
+        "--toolchain-sha256",
+        help="Pinned SHA-256 checksum of the toolchain file",
+    )
+
+    parser.add_argument(
+        "--download-timeout",
+        help="Timeout in seconds for toolchain downloads (default=30)",
+        default=30,
+        type=float,
+    )
+
+    parser.add_argument(
+        "--download-retries",
+        help="Number of times to retry a failed toolchain download (default=3)",
+        default=3,
+        type=nonNegativeInt,
+    )
+
+    parser.add_argument(
+        "--offline",
+        help="Use the cached toolchain file without accessing the network",
+        action="store_true",
+    )
+
     parser.add_argument(
         "--cmake",
         "-C",
@@ -232,36 +387,146 @@ def parseArgs(args=None):
         action="store_true",
     )
 
-    platforms = [
-        "OS",
-        "OS64",
-        "SIMULATOR",
-        "SIMULATOR64",
-        "SIMULATORARM64",
-        "VISIONOS",
-        "SIMULATOR_VISIONOS",
-        "TVOS",
-        "SIMULATOR_TVOS",
-        "SIMULATORARM64_TVOS",
-        "WATCHOS",
-        "SIMULATOR_WATCHOS",
-        "SIMULATORARM64_WATCHOS",
-        "MAC",
-        "MAC_ARM64",
-        "MAC_UNIVERSAL",
-        "MAC_CATALYST",
-        "MAC_CATALYST_ARM64",
-        "MAC_CATALYST_UNIVERSAL",
-    ]
-    default_platforms = ["OS64", "SIMULATORARM64", "MAC_ARM64"]
+    parser.add_argument(
+        "--jobs",
+        "-j",
+        help="Number of platforms to build concurrently (default=1)",
+        default=1,
+        type=positiveInt,
+    )
+
+    parser.add_argument(
+        "--max-procs",
+        help="Share a GNU make jobserver of this many processes (default=number of cores) between the builds of all platforms, used by the Unix Makefiles and Ninja generators",
+        nargs="?",
+        const=os.cpu_count() or 1,
+        type=positiveInt,
+    )
+
+    parser.add_argument(
+        "--build-cache",
+        help="Restore unchanged platforms from the build cache instead of building them",
+        action="store_true",
+    )
+
+    parser.add_argument(
+        "--build-cache-dir",
+        help="Directory for the build cache (default=~/.cache/ios_build/builds)",
+    )
+
+    parser.add_argument(
+        "--build-cache-size",
+        help="Maximum size of the build cache in MiB (default=4096)",
+        default=4096,
+        type=positiveInt,
+    )
+
+    parser.add_argument(
+        "--compiler-cache",
+        help="Compile using ccache or sccache (default=auto, the first installed)",
+        nargs="?",
+        const="auto",
+        choices=["auto", *COMPILER_CACHES],
+    )
+
+    parser.add_argument(
+        "--compiler-cache-dir",
+        help="Directory for the compiler cache (default=~/.cache/ios_build/{ccache,sccache})",
+    )
+
+    parser.add_argument(
+        "--no-history",
+        help="Do not record the build in the build history (see `iOSBuild stats`)",
+        action="store_false",
+        dest="history",
+    )
+
+    parser.add_argument(
+        "--seed-cache",
+        help="Reuse the results of the compiler and feature checks of previous configurations of each platform",
+        action="store_true",
+    )
+
+    parser.add_argument(
+        "--framework-jobs",
+        help="Number of XCFrameworks to create concurrently (default=jobs)",
+        type=positiveInt,
+    )
+
+    parser.add_argument(
+        "--trace-file",
+        help="Write a timeline of the build to this file in Chrome trace format (view with Perfetto or chrome://tracing)",
+    )
+
+    parser.add_argument(
+        "--log-dir",
+        help="Directory for the full output of each build step (default=logs in the build directory)",
+    )
+
+    parser.add_argument(
+        "--compress-logs",
+        help="Compress log files with gzip",
+        action="store_true",
+    )
+
+    parser.add_argument(
+        "--log-lines",
+        help="Number of lines of output from each step kept for error reports (default=100)",
+        default=100,
+        type=positiveInt,
+    )
+
+    parser.add_argument(
+        "--server",
+        help="Send the build to a build server (see `iOSBuild serve`) listening on this socket (default={})".format(
+            SERVER_SOCKET
+        ),
+        nargs="?",
+        const=SERVER_SOCKET,
+    )
+
+    parser.add_argument(
+        "--workers",
+        help="Build the platforms on build workers (see `iOSBuild worker`) at these addresses, HOST:PORT",
+        nargs="+",
+        type=workerAddress,
+    )
+
+    parser.add_argument(
+        "--watch",
+        help="Keep running and rebuild whenever the source tree changes",
+        action="store_true",
+    )
+
+    parser.add_argument(
+        "--watch-interval",
+        help="Interval in seconds between checks for changes in watch mode (default=1)",
+        default=1.0,
+        type=float,
+    )
+
+    parser.add_argument(
+        "--watch-debounce",
+        help="Time in seconds without further changes before rebuilding in watch mode (default=0.5)",
+        default=0.5,
+        type=float,
+    )
+
     parser.add_argument(
         "--platforms",
         help="Specify a list of platforms to build for (default={0}), possible options match ".format(
-            default_platforms
+            DEFAULT_PLATFORMS
         ),
-        default=default_platforms,
+        default=DEFAULT_PLATFORMS,
+        nargs="+",
+        choices=PLATFORMS,
+    )
+
+    parser.add_argument(
+        "--configs",
+        help="CMake configurations to build, when more than one is specified each is installed in {INSTALL_PREFIX}/{CONFIG} with frameworks in {OUTPUT_DIR}/{CONFIG} (default=Release)",
+        default=["Release"],
         nargs="+",
-        choices=platforms,
     )
 
     # TODO implement parse known args and pass unknown args to CMake?
@@ -272,15 +537,13 @@ def parseArgs(args=None):
         dest="cmake_options",
     )
 
-    # TODO Add code to find available generators
-    generators = ["Unix Makefiles", "Ninja", "Ninja Multi-Config", "Xcode"]
     parser.add_argument(
         "--generator",
         "-G",
         "-g",
-        help="CMake build system generator",
-        default="Xcode",
-        choices=generators,
+        help="CMake build system generator, auto selects the fastest available generator using the times of previous builds (default=auto)",
+        default="auto",
+        choices=[*GENERATORS, "auto"],
     )
 
     json_options = parser.add_mutually_exclusive_group()
@@ -293,7 +556,71 @@ def parseArgs(args=None):
         help="Specify platform specific CMake options inline in JSON format",
     )
 
-    return parser.parse_args(args=args)
+    return parser
+
+
+def parseArgs(args=None):
+    """
+    Main parser, parses the command-line arguments using `argparse`, see
+    `createParser`. Note that any errors in argparse return a `SystemExit`
+    signal which must be caught.
+
+    Args:
+        args (optional): Optional additional arguments (for testing purposes).
+    """
+    return createParser().parse_args(args=args)
+
+
+def checkOptions(options: dict) -> dict:
+    """
+    Check the values of options which are not from the command line, e.g. those
+    of a manifest, using the types and choices of their arguments in the main
+    parser. Options are named as in the output of `parse`, options without a
+    command-line argument of the same name are not checked.
+
+    Args:
+        options (dict): Options to check
+
+    Raises:
+        IOSBuildError: Raised if a value is invalid.
+
+    Returns:
+        dict: Options with each value converted by the type of its argument.
+    """
+    actions = {action.dest: action for action in createParser()._actions}
+    checked = dict(options)
+    for key, value in options.items():
+        action = actions.get(key)
+        if action is None or key in ["cmake_options", "platform_options"]:
+            continue
+
+        if isinstance(action, (argparse._StoreTrueAction, argparse._StoreFalseAction)):
+            if not isinstance(value, bool):
+                raise IOSBuildError("{0}: expected true or false".format(key))
+            continue
+
+        if isinstance(value, list) and action.nargs not in ["+", "*"]:
+            raise IOSBuildError("{0}: expected one value".format(key))
+
+        values = []
+        for v in value if isinstance(value, list) else [value]:
+            if action.type is not None:
+                try:
+                    v = action.type(str(v))
+                except (argparse.ArgumentTypeError, ValueError):
+                    raise IOSBuildError(
+                        "{0}: invalid value: {1!r}".format(key, v)
+                    ) from None
+            if action.choices is not None and v not in action.choices:
+                raise IOSBuildError(
+                    "{0}: invalid choice: {1!r} (choose from {2})".format(
+                        key, v, ", ".join(action.choices)
+                    )
+                )
+            values.append(v)
+        checked[key] = values if isinstance(value, list) else values[0]
+
+    return checked
 
 
 # TODO Move to separate module
@@ -316,3 +643,272 @@ def parse(args=None) -> dict:
         raise ParserError()
 
     return sortArgs(parsed_args)
+
+
+def parseBatchArgs(args=None):
+    """
+    Parser of the `batch` command, which builds every project in a manifest file.
+
+    Args:
+        args (optional): Optional additional arguments (for testing purposes).
+    """
+    parser = argparse.ArgumentParser(
+        prog="iOSBuild batch",
+        description="""
+        Build several CMake projects described by a TOML manifest, in order of their dependencies.
+        """,
+    )
+
+    parser.add_argument("manifest", help="Path to manifest file")
+
+    output_options = parser.add_mutually_exclusive_group()
+    output_options.add_argument(
+        "-v", "--verbose", help="Print verbose output", action="count", default=0
+    )
+
+    output_options.add_argument(
+        "--quiet", "-q", help="Hide output", action="store_true"
+    )
+
+    parser.add_argument(
+        "--jobs",
+        "-j",
+        help="Number of projects to build concurrently (default=1)",
+        default=1,
+        type=positiveInt,
+    )
+
+    parser.add_argument(
+        "--trace-file",
+        help="Write a timeline of all builds to this file in Chrome trace format",
+    )
+
+    return parser.parse_args(args=args)
+
+
+def parseBatch(args=None) -> dict:
+    """
+    Parse the arguments of the `batch` command.
+
+    Args:
+        args (optional): Pass arguments directly to function (for testing). Defaults to None.
+
+    Raises:
+        ParserError: Raised if argparse throws an exit signal
+
+    Returns:
+        dict: Arguments sorted into a Python dictionary
+    """
+    try:
+        parsed_args = parseBatchArgs(args)
+    except SystemExit:
+        raise ParserError()
+
+    return sortArgs(parsed_args)
+
+
+def parseServeArgs(args=None):
+    """
+    Parser of the `serve` command, which runs a build server.
+
+    Args:
+        args (optional): Optional additional arguments (for testing purposes).
+    """
+    parser = argparse.ArgumentParser(
+        prog="iOSBuild serve",
+        description="""
+        Run a build server which accepts builds from `iOSBuild --server` on a Unix domain socket.
+        """,
+    )
+
+    output_options = parser.add_mutually_exclusive_group()
+    output_options.add_argument(
+        "-v", "--verbose", help="Print verbose output", action="count", default=0
+    )
+
+    output_options.add_argument(
+        "--quiet", "-q", help="Hide output", action="store_true"
+    )
+
+    parser.add_argument(
+        "--socket",
+        help="Path to the Unix domain socket (default={})".format(SERVER_SOCKET),
+        default=SERVER_SOCKET,
+        dest="socket_path",
+    )
+
+    parser.add_argument(
+        "--jobs",
+        "-j",
+        help="Number of projects to build concurrently (default=1)",
+        default=1,
+        type=positiveInt,
+    )
+
+    return parser.parse_args(args=args)
+
+
+def parseServe(args=None) -> dict:
+    """
+    Parse the arguments of the `serve` command.
+
+    Args:
+        args (optional): Pass arguments directly to function (for testing). Defaults to None.
+
+    Raises:
+        ParserError: Raised if argparse throws an exit signal
+
+    Returns:
+        dict: Arguments sorted into a Python dictionary
+    """
+    try:
+        parsed_args = parseServeArgs(args)
+    except SystemExit:
+        raise ParserError()
+
+    return sortArgs(parsed_args)
+
+
+def parseWorkerArgs(args=None):
+    """
+    Parser of the `worker` command, which runs a build worker.
+
+    Args:
+        args (optional): Optional additional arguments (for testing purposes).
+    """
+    parser = argparse.ArgumentParser(
+        prog="iOSBuild worker",
+        description="""
+        Run a build worker which builds platforms for `iOSBuild --workers` over TCP.
+        Workers are not authenticated, only listen on trusted networks.
+        """,
+    )
+
+    output_options = parser.add_mutually_exclusive_group()
+    output_options.add_argument(
+        "-v", "--verbose", help="Print verbose output", action="count", default=0
+    )
+
+    output_options.add_argument(
+        "--quiet", "-q", help="Hide output", action="store_true"
+    )
+
+    parser.add_argument(
+        "--listen",
+        help="Address to listen on, HOST:PORT (default=127.0.0.1:{})".format(
+            WORKER_PORT
+        ),
+        default="127.0.0.1:{}".format(WORKER_PORT),
+        type=workerAddress,
+    )
+
+    parser.add_argument(
+        "--jobs",
+        "-j",
+        help="Number of platforms to build concurrently (default=1)",
+        default=1,
+        type=positiveInt,
+    )
+
+    parser.add_argument(
+        "--work-dir",
+        help="Directory for source snapshots and builds (default=~/.cache/ios_build/worker)",
+    )
+
+    parser.add_argument(
+        "--cmake",
+        "-C",
+        help="Cmake command, to specify a non-standard cmake command",
+        default="cmake",
+        dest="cmake_command",
+    )
+
+    return parser.parse_args(args=args)
+
+
+def parseWorker(args=None) -> dict:
+    """
+    Parse the arguments of the `worker` command.
+
+    Args:
+        args (optional): Pass arguments directly to function (for testing). Defaults to None.
+
+    Raises:
+        ParserError: Raised if argparse throws an exit signal
+
+    Returns:
+        dict: Arguments sorted into a Python dictionary
+    """
+    try:
+        parsed_args = parseWorkerArgs(args)
+    except SystemExit:
+        raise ParserError()
+
+    return sortArgs(parsed_args)
+
+
+def parseStatsArgs(args=None):
+    """
+    Parser of the `stats` command, which prints trends from the build history.
+
+    Args:
+        args (optional): Optional additional arguments (for testing purposes).
+    """
+    parser = argparse.ArgumentParser(
+        prog="iOSBuild stats",
+        description="""
+        Print the durations of each step, the slowest platforms and the growth
+        of each XCFramework from the build history.
+        """,
+    )
+
+    output_options = parser.add_mutually_exclusive_group()
+    output_options.add_argument(
+        "-v", "--verbose", help="Print verbose output", action="count", default=0
+    )
+
+    output_options.add_argument(
+        "--quiet", "-q", help="Hide output", action="store_true"
+    )
+
+    parser.add_argument(
+        "--project",
+        help="Only include builds of the CMake project at this path",
+    )
+
+    parser.add_argument(
+        "--days",
+        help="Number of days of history to include (default=30)",
+        default=30,
+        type=positiveInt,
+    )
+
+    parser.add_argument(
+        "--limit",
+        help="Number of platforms and libraries to print (default=10)",
+        default=10,
+        type=positiveInt,
+    )
+
+    return parser.parse_args(args=args)
+
+
+def parseStats(args=None) -> dict:
+    """
+    Parse the arguments of the `stats` command.
+
+    Args:
+        args (optional): Pass arguments directly to function (for testing). Defaults to None.
+
+    Raises:
+        ParserError: Raised if argparse throws an exit signal
+
+    Returns:
+        dict: Arguments sorted into a Python dictionary
+    """
+    try:
+        parsed_args = parseStatsArgs(args)
+    except SystemExit:
+        raise ParserError()
+
+    return sortArgs(parsed_args)
@@ -1,6 +1,7 @@
-import tempfile
+import io
 import sys
 import datetime
+import tempfile
 
 
 class Printer:
@@ -8,23 +9,27 @@ class Printer:
     Class to handle all printing using a verbosity scale to determine what to print
     """
 
-    def __init__(self, print_level=0):
+    def __init__(self, print_level=0, file=None, error_file=None):
         """
         Initialise printer based on desired verbosity
 
         Args:
             verbose (int, optional): Verbosity level for printer. Defaults to None.
             quiet (bool, optional): Set output to quiet. Defaults to False.
+            file (optional): Stream to print to. Defaults to None (`sys.stdout`).
+            error_file (optional): Stream to print errors to. Defaults to None (`sys.stderr`).
 
         Raises:
             PrinterError: Raised if both quiet and verbose specified simultaneously
         """
         self.verbosity = print_level
         self.width = 34
+        self.file = file
+        self.error_file = error_file
 
     def print(self, value, verbosity=0, **kwargs):
         if self.verbosity >= verbosity:
-            print(value, **kwargs)
+            print(value, file=self.file, **kwargs)
 
     def printValue(self, text, value, verbosity=0, **kwargs):
         """
@@ -35,7 +40,7 @@ class Printer:
             verbosity (int): The level of verbosity at which the statement should be printed. Defaults to 0.
         """
         if self.verbosity >= verbosity:
-            print("{0:<32} {1}".format(text, value), **kwargs)
+            print("{0:<32} {1}".format(text, value), file=self.file, **kwargs)
 
     def tick(self, verbosity=0, **kwargs):
         """
@@ -45,7 +50,7 @@ class Printer:
             verbosity (int): The level of verbosity at which the statement should be printed. Defaults to 0.
         """
         if self.verbosity >= verbosity:
-            print("\U00002705", **kwargs)
+            print("\U00002705", file=self.file, **kwargs)
 
     def cross(self, verbosity=0, **kwargs):
         """
@@ -55,7 +60,7 @@ class Printer:
             verbosity (int): The level of verbosity at which the statement should be printed. Defaults to 0.
         """
         if self.verbosity >= verbosity:
-            print("\U0000274c", **kwargs)
+            print("\U0000274c", file=self.file, **kwargs)
 
     def printStat(self, text, tick="tick", **kwargs):
         self.printValue(text, "", end="\t", **kwargs)
@@ -81,10 +86,10 @@ class Printer:
         if self.verbosity < verbosity:
             return
         if header:
-            print("{}:".format(header))
+            print("{}:".format(header), file=self.file)
         for k, v in input_dict.items():
             if type(v) is dict:
-                print("{}:".format(k))
+                print("{}:".format(k), file=self.file)
                 self.printEmbeddedDict(v, verbosity=verbosity)
             elif type(v) is tempfile.TemporaryDirectory:
                 self.printValue(k, v.name, end="\n", verbosity=verbosity)
@@ -99,7 +104,46 @@ class Printer:
 
     def printError(self, value):
         if value:
-            sys.stderr.write(value.decode())
+            (self.error_file or sys.stderr).write(value.decode(errors="replace"))
+
+    def printOutput(self, value):
+        """
+        Print the captured output of a subprocess, invalid UTF-8 is replaced.
+
+        Args:
+            value (bytes): Output captured from the subprocess.
+        """
+        if value:
+            (self.file or sys.stdout).write(value.decode(errors="replace"))
+
+    def isBuffered(self) -> bool:
+        return isinstance(self.file, io.StringIO)
+
+    def buffered(self) -> "Printer":
+        """
+        Create a printer with the same verbosity which writes to in-memory
+        buffers instead of `sys.stdout` and `sys.stderr`. Used for jobs which run
+        concurrently so that their output can be printed in one piece once the
+        job is complete.
+
+        Returns:
+            Printer: Buffered printer
+        """
+        return Printer(
+            print_level=self.verbosity, file=io.StringIO(), error_file=io.StringIO()
+        )
+
+    def printBuffer(self, printer: "Printer"):
+        """
+        Print the contents of a buffered printer.
+
+        Args:
+            printer (Printer): Printer created using `Printer.buffered()`.
+        """
+        if printer.isBuffered():
+            print(printer.file.getvalue(), file=self.file, end="", flush=True)
+            if printer.error_file:
+                self.printError(printer.error_file.getvalue().encode())
 
     def printHeader(self, **kwargs):
         if self.verbosity < 0:
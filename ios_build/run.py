@@ -1,14 +1,33 @@
 import sys
 
-from ios_build.parser import parse
-from ios_build.build import runBuild
-
-from ios_build.errors import IOSBuildError, CMakeError, XCodeBuildError, ParserError
+from ios_build.parser import (
+    parse,
+    parseBatch,
+    parseServe,
+    parseStats,
+    parseWorker,
+)
+from ios_build.errors import (
+    IOSBuildError,
+    CMakeError,
+    XCodeBuildError,
+    ParserError,
+    errorStatus,
+)
 
 
 def runner(args=None):
     """
-    iOSBuild runner.
+    iOSBuild runner. If the first argument is `batch`, the projects in a
+    manifest are built, see `batch.batch`. If it is `serve`, a build server
+    is run, see `serve.serve`, which builds with `--server` are sent to. If
+    it is `worker`, a build worker is run, see `distribute.Worker`, which
+    platforms of builds with `--workers` are sent to. If it is `stats`, trends
+    from the build history are printed, see `history.queryStats`.
+
+    Only the parser is imported up front, so `--help` and invalid arguments
+    return without loading the build modules. Each command imports its
+    modules when it is run, and the `--server` client never loads them.
 
     Args:
         args (list, optional): Optional arguments for testing. Defaults to None.
@@ -20,8 +39,21 @@ def runner(args=None):
         print("! Invalid OS, iOSBuild only runs on macOS", file=sys.stderr)
         return 4
 
+    if args is None:
+        args = sys.argv[1:]
+    parsers = {
+        "batch": parseBatch,
+        "serve": parseServe,
+        "worker": parseWorker,
+        "stats": parseStats,
+    }
+    command = args[0] if args[:1] and args[0] in parsers else None
+
     try:
-        kwargs = parse(args=args)
+        if command:
+            kwargs = parsers[command](args=args[1:])
+        else:
+            kwargs = parse(args=args)
     except IOSBuildError as error:
         print("Invalid input: {}".format(error), file=sys.stderr)
         return 1
@@ -29,18 +61,42 @@ def runner(args=None):
         return 2
 
     try:
-        runBuild(**kwargs)
-    except IOSBuildError as error:
-        print("Error: {}".format(error), file=sys.stderr)
-        return 1
-    except CMakeError as error:
-        print("CMake Error", file=sys.stderr)
-        print("Message: {}".format(error), file=sys.stderr)
-        return 2
-    except XCodeBuildError as error:
-        print("! XCodeBuild error", file=sys.stderr)
-        print("! Message: {}".format(error), file=sys.stderr)
-        return 3
+        if command == "batch":
+            from ios_build.batch import runBatch
+
+            runBatch(**kwargs)
+        elif command == "serve":
+            from ios_build.serve import runServe
+
+            runServe(**kwargs)
+        elif command == "worker":
+            from ios_build.distribute import runWorker
+
+            runWorker(**kwargs)
+        elif command == "stats":
+            from ios_build.history import runStats
+
+            runStats(**kwargs)
+        elif kwargs.get("server"):
+            from ios_build.client import runClient
+
+            return runClient(**kwargs)
+        elif kwargs.get("workers"):
+            from ios_build.distribute import runDistributed
+
+            runDistributed(**kwargs)
+        elif kwargs.get("watch"):
+            from ios_build.watch import runWatch
+
+            runWatch(**kwargs)
+        else:
+            from ios_build.build import runBuild
+
+            runBuild(**kwargs)
+    except (IOSBuildError, CMakeError, XCodeBuildError) as error:
+        status, message = errorStatus(error)
+        print(message, file=sys.stderr)
+        return status
 
     return 0
 
@@ -0,0 +1,127 @@
+from ios_build import history
+
+# Number of recent runs of each platform used for estimates
+HISTORY_RUNS = 5
+
+# Relative cost of platforms without any recorded durations
+PLATFORM_WEIGHTS = {"UNIVERSAL": 2.0}
+
+# Seconds between the end of a platform and the start of the next for them to be on the same path
+PATH_TOLERANCE = 0.1
+
+
+def platformWeight(platform: str) -> float:
+    """
+    Relative cost of `platform`, universal platforms build each architecture.
+    """
+    for name, weight in PLATFORM_WEIGHTS.items():
+        if name in platform:
+            return weight
+
+    return 1.0
+
+
+def estimateDurations(path: str, platforms: list[str]) -> dict[str, float]:
+    """
+    Estimate the duration of each platform of the project at `path` from the
+    mean of its most recent runs in the build history, see `history`. Platforms
+    without any runs are estimated from the other platforms using `platformWeight`.
+
+    Args:
+        path (str): Path to the CMake project
+        platforms (list[str]): Platforms to build
+
+    Returns:
+        dict[str, float]: Estimated seconds keyed by platform, empty if the project has no history.
+    """
+    durations = history.platformDurations(path, platforms, HISTORY_RUNS)
+    estimates = {
+        platform: sum(totals) / len(totals) for platform, totals in durations.items()
+    }
+
+    if not estimates:
+        return {}
+
+    unit = sum(estimates[p] / platformWeight(p) for p in estimates) / len(estimates)
+    for platform in platforms:
+        estimates.setdefault(platform, unit * platformWeight(platform))
+
+    return estimates
+
+
+def schedulePlatforms(platforms: list[str], estimates: dict[str, float]) -> list[str]:
+    """
+    Order `platforms` longest first, so that the slowest platforms do not
+    start last when built concurrently. Without estimates, platforms are
+    ordered by `platformWeight`. Platforms of equal cost keep their order.
+    """
+    return sorted(
+        platforms,
+        key=lambda platform: -estimates.get(platform, platformWeight(platform)),
+    )
+
+
+def estimateCriticalPath(
+    platforms: list[str], estimates: dict[str, float], jobs: int = 1
+) -> tuple[float, list[str]]:
+    """
+    Estimate the critical path of building `platforms` in order using `jobs`
+    concurrent jobs, each platform starting on the first free job.
+
+    Args:
+        platforms (list[str]): Platforms in the order they are started
+        estimates (dict[str, float]): Estimated seconds keyed by platform
+        jobs (int, optional): Number of concurrent jobs. Defaults to 1.
+
+    Returns:
+        tuple[float, list[str]]: Duration and platforms of the job which finishes last.
+    """
+    loads = [0.0] * max(1, min(jobs, len(platforms)))
+    paths = [[] for _ in loads]
+    for platform in platforms:
+        job = loads.index(min(loads))
+        loads[job] += estimates[platform]
+        paths[job].append(platform)
+
+    job = loads.index(max(loads))
+    return loads[job], paths[job]
+
+
+def criticalPath(spans: dict[str, tuple[float, float]]) -> tuple[float, list[str]]:
+    """
+    Critical path of a build from the start and end times of each platform.
+    The path ends with the platform which finished last and follows, backwards,
+    the platforms which finished as each platform on the path started.
+
+    Args:
+        spans (dict[str, tuple[float, float]]): Start and end time of each platform.
+
+    Returns:
+        tuple[float, list[str]]: Duration and platforms of the path.
+    """
+    if not spans:
+        return 0.0, []
+
+    start = min(begin for begin, _ in spans.values())
+    platform = max(spans, key=lambda p: spans[p][1])
+    path = [platform]
+    while spans[platform][0] - start > PATH_TOLERANCE:
+        begin = spans[platform][0]
+        previous = [
+            p
+            for p, (_, end) in spans.items()
+            if p not in path and end <= begin + PATH_TOLERANCE
+        ]
+        if not previous:
+            break
+        platform = max(previous, key=lambda p: spans[p][1])
+        path.insert(0, platform)
+
+    return spans[path[-1]][1] - spans[path[0]][0], path
+
+
+def formatPath(duration: float, path: list[str]) -> str:
+    """
+    Format a critical path for printing.
+    """
+    return "{0:.1f}s ({1})".format(duration, " -> ".join(path))
@@ -1,27 +1,105 @@
 import os
+import fnmatch
+import concurrent.futures
 
 from ios_build.printer import getPrinter
 
+# Directories in an install tree which cannot contain static libraries
+PRUNED_DIRECTORIES = [
+    "include",
+    "Headers",
+    "PrivateHeaders",
+    "share",
+    "cmake",
+    "pkgconfig",
+    "*.framework",
+    "*.xcframework",
+    "*.dSYM",
+]
+
+
+def isPruned(name: str) -> bool:
+    """
+    Check whether a directory should be skipped when searching for libraries.
+
+    Args:
+        name (str): Directory name
 
-def findPlatformLibraries(directory: str) -> dict[str, str]:
+    Returns:
+        bool: True if the directory cannot contain static libraries.
     """
-    Search for static libraries within the `directory`. This function
-    uses `os.walk()` to search the `directory` for static libraries
-    (files with suffix `.a`). Any results are added to the
-    results dictionary.
+    return any(fnmatch.fnmatch(name, pattern) for pattern in PRUNED_DIRECTORIES)
+
+
+def scanLibraries(directory: str) -> tuple[dict[str, str], dict[str, list[str]]]:
+    """
+    Search for static libraries (files with suffix `.a`) within the `directory`
+    using `os.scandir()`. Directories which cannot contain libraries are skipped.
+    Symbolic links to directories are not followed. If several libraries share
+    a name, the one closest to `directory` is used, preferring an unversioned
+    file name (`name.a`) then sorting by path for libraries at the same depth,
+    and the rest are returned as duplicates.
 
     Args:
         directory (str): Directory to search
 
     Returns:
-        dict[str, str]: Full path to libraries keyed by library names.
+        tuple[dict[str, str], dict[str, list[str]]]: Full path to libraries and all paths of duplicated libraries, keyed by library names.
     """
+    found = {}
+    stack = [(directory, 0)]
+    while stack:
+        current, depth = stack.pop()
+        with os.scandir(current) as it:
+            for entry in it:
+                if entry.is_dir(follow_symlinks=False):
+                    if not isPruned(entry.name):
+                        stack.append((entry.path, depth + 1))
+                elif entry.name.endswith(".a"):
+                    name = entry.name.split(".")[0]
+                    versioned = entry.name != name + ".a"
+                    found.setdefault(name, []).append((depth, versioned, entry.path))
+
     libraries = {}
-    for root, dirs, files in os.walk(directory):
-        for file in files:
-            if file.endswith(".a"):
-                name = os.path.basename(file).split(".")[0]
-                libraries[name] = os.path.join(root, file)
+    duplicates = {}
+    for name, paths in found.items():
+        paths = [path for *_, path in sorted(paths)]
+        libraries[name] = paths[0]
+        if len(paths) > 1:
+            duplicates[name] = paths
+
+    return libraries, duplicates
+
+
+def reportDuplicates(duplicates: dict[str, list[str]], **kwargs):
+    """
+    Report libraries with duplicate names found by `scanLibraries`.
+
+    Args:
+        duplicates (dict[str, list[str]]): All paths of each duplicated library.
+    """
+    printer = getPrinter(**kwargs)
+    for name, paths in duplicates.items():
+        printer.printStat("Duplicate library name: {}".format(name), tick="cross")
+        printer.printValue("Using", paths[0], end="\n")
+        for path in paths[1:]:
+            printer.printValue("Ignoring", path, end="\n")
+
+
+def findPlatformLibraries(directory: str, **kwargs) -> dict[str, str]:
+    """
+    Search for static libraries within the `directory`, see `scanLibraries`.
+    Libraries with duplicate names are reported.
+
+    Args:
+        directory (str): Directory to search
+
+    Returns:
+        dict[str, str]: Full path to libraries keyed by library names.
+    """
+    libraries, duplicates = scanLibraries(directory)
+
+    reportDuplicates(duplicates, **kwargs)
 
     return libraries
 
@@ -48,30 +126,43 @@ def invertDict(libraries: dict) -> dict[str, dict[str, str]]:
 
 
 def findlibraries(
-    install_dir: str, platforms: list[str] = [], **kwargs
+    install_dir: str, platforms: list[str] = [], jobs: int = 1, **kwargs
 ) -> dict[str, dict[str, str]]:
     """
     Find static libraries for each platform in a directory. Assuming files for each platform
-    are contained in a subdirectory of the same name.
+    are contained in a subdirectory of the same name. Up to `jobs` platforms are
+    searched concurrently.
 
     Args:
         install_dir (str): Parent directory where libraries should be installed
         platforms (list[str], optional): List of platforms corresponding to subdirectories in the `install_dir` folder. Defaults to [].
+        jobs (int, optional): Number of platforms to search concurrently. Defaults to 1.
 
     Returns:
-        dict[str, dict[str, str]]: _description_
+        dict[str, dict[str, str]]: Full path to libraries keyed by library name and platform.
     """
-    libraries = {}
+    platform_dirs = {}
     for platform in platforms:
         platform_dir = os.path.join(install_dir, platform)
         assert os.path.isdir(platform_dir), "Directory does not exist: {}".format(
             platform_dir
         )
-        libraries[platform] = findPlatformLibraries(platform_dir)
+        platform_dirs[platform] = platform_dir
+
+    printer = getPrinter(**kwargs)
+    with concurrent.futures.ThreadPoolExecutor(max_workers=jobs) as executor:
+        scans = {
+            platform: executor.submit(scanLibraries, platform_dir)
+            for platform, platform_dir in platform_dirs.items()
+        }
+
+    libraries = {}
+    for platform, scan in scans.items():
+        libraries[platform], duplicates = scan.result()
+        reportDuplicates(duplicates, **kwargs)
 
     result = invertDict(libraries)
 
-    printer = getPrinter(**kwargs)
     printer.printEmbeddedDict(result, verbosity=1, header="Libraries")
 
     return result
@@ -0,0 +1,278 @@
+import os
+import json
+import hashlib
+import threading
+
+from ios_build.cache import cacheHome
+from ios_build.printer import getPrinter
+
+# Help strings of the cache entries created by the CMake check modules
+# (check_include_file, check_symbol_exists, check_c_source_compiles, ...)
+PROBE_HELP = ("Have ", "Test ", "CHECK_TYPE_SIZE", "Result of ")
+
+# Cache entries identifying the compilers and SDK used for the probes
+TOOL_ENTRIES = ["CMAKE_C_COMPILER", "CMAKE_CXX_COMPILER", "CMAKE_OSX_SYSROOT"]
+
+SEED_LOCK = threading.Lock()
+
+
+def readCache(cache_file: str) -> list[tuple[str, str, str, str]]:
+    """
+    Read the entries of a `CMakeCache.txt` file.
+
+    Args:
+        cache_file (str): Path to `CMakeCache.txt`
+
+    Returns:
+        list[tuple[str, str, str, str]]: Name, type, value and help string of each entry.
+    """
+    entries = []
+    help_lines = []
+    with open(cache_file) as f:
+        for line in f:
+            line = line.rstrip("\n")
+            if line.startswith("//"):
+                help_lines.append(line[2:])
+                continue
+            if not line or line.startswith("#") or "=" not in line:
+                help_lines = []
+                continue
+            key, _, value = line.partition("=")
+            name, _, entry_type = key.partition(":")
+            entries.append((name, entry_type, value, " ".join(help_lines)))
+            help_lines = []
+
+    return entries
+
+
+def probeEntries(entries: list[tuple]) -> list[tuple]:
+    """
+    Select the results of compiler and feature checks from cache `entries`.
+
+    Args:
+        entries (list[tuple]): Cache entries as returned by `readCache`.
+
+    Returns:
+        list[tuple]: Cache entries storing the result of a check.
+    """
+    return [
+        entry
+        for entry in entries
+        if entry[1] == "INTERNAL" and entry[3].startswith(PROBE_HELP)
+    ]
+
+
+def pathSignature(path: str) -> list:
+    """
+    Size and modification time of the file or directory at `path`, or None if it is missing.
+    """
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def toolSignature(entries: list[tuple]) -> dict[str, list]:
+    """
+    Size and modification time of the compilers and SDK recorded in the cache
+    `entries`, used to invalidate a seed when the tools change.
+
+    Args:
+        entries (list[tuple]): Cache entries as returned by `readCache`.
+
+    Returns:
+        dict[str, list]: Signature of each tool keyed by path, `None` if missing.
+    """
+    return {
+        value: pathSignature(value)
+        for name, _, value, _ in entries
+        if name in TOOL_ENTRIES and value
+    }
+
+
+def seedKey(
+    platform: str,
+    toolchain_path: str,
+    options: list[str],
+    generator: str = "Xcode",
+    configs: list[str] = None,
+) -> str:
+    """
+    Key of the seed of a platform, which depends on the platform, the contents
+    of the toolchain file, the CMake cache options, the generator and the
+    build configurations.
+
+    Args:
+        platform (str): Target platform
+        toolchain_path (str): Path to toolchain file
+        options (list[str]): CMake `-D` options
+        generator (str, optional): CMake generator. Defaults to "Xcode".
+        configs (list[str], optional): CMake configurations. Defaults to None.
+
+    Returns:
+        str: Hex digest
+    """
+    with open(toolchain_path, "rb") as f:
+        toolchain_digest = hashlib.sha256(f.read()).hexdigest()
+
+    inputs = {
+        "platform": platform,
+        "toolchain": toolchain_digest,
+        "options": options,
+        "generator": generator,
+        "configs": configs,
+    }
+    return hashlib.sha256(json.dumps(inputs, sort_keys=True).encode()).hexdigest()
+
+
+def seedPaths(key: str) -> tuple[str, str]:
+    """
+    Paths of the initial cache script and the metadata of a seed, in `seeds`
+    within the user cache directory.
+
+    Args:
+        key (str): Seed key
+
+    Returns:
+        tuple[str, str]: Script and metadata file
+    """
+    seed_dir = cacheHome("seeds")
+    return (
+        os.path.join(seed_dir, key + ".cmake"),
+        os.path.join(seed_dir, key + ".json"),
+    )
+
+
+def findSeed(key: str) -> dict:
+    """
+    Find a valid seed. Seeds created with different compilers or SDK are removed.
+
+    Args:
+        key (str): Seed key
+
+    Returns:
+        dict: Seed metadata including the `script` path, or None if no valid seed exists.
+    """
+    script, metadata_file = seedPaths(key)
+    with SEED_LOCK:
+        try:
+            with open(metadata_file) as f:
+                metadata = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        valid = os.path.isfile(script) and all(
+            pathSignature(path) == signature
+            for path, signature in metadata.get("tools", {}).items()
+        )
+    if not valid:
+        removeSeed(key)
+        return None
+
+    return {**metadata, "script": script}
+
+
+def removeSeed(key: str):
+    """
+    Remove the seed with `key`, if it exists.
+    """
+    with SEED_LOCK:
+        for path in seedPaths(key):
+            if os.path.isfile(path):
+                os.remove(path)
+
+
+def cmakeString(value: str) -> str:
+    """
+    Quote `value` as a CMake string.
+    """
+    escaped = value.replace("\\", "\\\\").replace('"', '\\"').replace("$", "\\$")
+    return '"{}"'.format(escaped)
+
+
+def storeSeed(key: str, platform_dir: str, duration: float) -> int:
+    """
+    Store the check results of the configuration in `platform_dir` as an
+    initial cache script to be passed to later configure steps using `-C`.
+
+    Args:
+        key (str): Seed key
+        platform_dir (str): CMake build directory
+        duration (float): Time taken by the configure step without a seed.
+
+    Returns:
+        int: Number of stored check results
+    """
+    entries = readCache(os.path.join(platform_dir, "CMakeCache.txt"))
+    probes = probeEntries(entries)
+
+    script, metadata_file = seedPaths(key)
+    os.makedirs(os.path.dirname(script), exist_ok=True)
+    lines = [
+        "set({0} {1} CACHE INTERNAL {2})\n".format(
+            name, cmakeString(value), cmakeString(help_string)
+        )
+        for name, _, value, help_string in probes
+    ]
+    metadata = {"duration": duration, "probes": len(probes)}
+    metadata["tools"] = toolSignature(entries)
+
+    with SEED_LOCK:
+        for path, contents in [
+            (script, "".join(lines)),
+            (metadata_file, json.dumps(metadata, indent=2)),
+        ]:
+            tmp = "{0}.{1}.{2}.tmp".format(path, os.getpid(), threading.get_ident())
+            with open(tmp, "w") as f:
+                f.write(contents)
+            os.replace(tmp, path)
+
+    return len(probes)
+
+
+def seedOptions(seed: dict = None) -> list[str]:
+    """
+    CMake options which load the initial cache script of `seed`, if any.
+    """
+    return ["-C", seed["script"]] if seed else []
+
+
+def updateSeed(
+    key: str, seed: dict, platform_dir: str, duration: float, **kwargs
+) -> bool:
+    """
+    Report the configure time saved using `seed`, or store a new seed if none
+    was used. If the configuration found different compilers or SDK to those
+    used to create `seed`, the seed is removed.
+
+    Args:
+        key (str): Seed key
+        seed (dict): Seed metadata as returned by `findSeed`, or None.
+        platform_dir (str): CMake build directory
+        duration (float): Time taken by the configure step.
+
+    Returns:
+        bool: False if `seed` did not match the configuration.
+    """
+    printer = getPrinter(**kwargs)
+    if seed:
+        entries = readCache(os.path.join(platform_dir, "CMakeCache.txt"))
+        if toolSignature(entries) != seed["tools"]:
+            removeSeed(key)
+            printer.print("Configuration seed removed, compilers or SDK changed")
+            return False
+
+        printer.printValue(
+            "Seeded configuration",
+            "{0} checks, {1:.2f}s saved".format(
+                seed["probes"], seed["duration"] - duration
+            ),
+        )
+        return True
+
+    probes = storeSeed(key, platform_dir, duration)
+    printer.printValue("Stored configuration seed", "{} checks".format(probes))
+
+    return True
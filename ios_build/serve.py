@@ -0,0 +1,347 @@
+import io
+import os
+import json
+import shutil
+import socket
+import hashlib
+import threading
+import contextlib
+import socketserver
+
+from ios_build import build
+from ios_build.cache import cacheHome
+from ios_build.toolchain import getToolchain
+from ios_build.printer import Printer, getPrinter
+from ios_build.trace import Tracer, writeTrace
+from ios_build.errors import IOSBuildError, errorStatus
+
+
+class Job:
+    """
+    A build run by the build server. Events of the build are kept so that
+    every client following the build receives all of them, including clients
+    which attach to the build after it has started.
+    """
+
+    def __init__(self, key: str, options: dict):
+        """
+        Args:
+            key (str): Key identifying identical builds, see `BuildServer.submit`.
+            options (dict): Options of the build
+        """
+        self.key = key
+        self.options = options
+        self.events = []
+        self.finished = False
+        self.condition = threading.Condition()
+
+    def emit(self, event: dict, finish: bool = False):
+        """
+        Send an event to all clients following the build.
+
+        Args:
+            event (dict): Event
+            finish (bool, optional): The event is the last of the build. Defaults to False.
+        """
+        with self.condition:
+            self.events.append(event)
+            self.finished = self.finished or finish
+            self.condition.notify_all()
+
+    def follow(self):
+        """
+        Events of the build from the start, blocking until the build finishes.
+
+        Yields:
+            dict: Each event
+        """
+        index = 0
+        while True:
+            with self.condition:
+                while index == len(self.events) and not self.finished:
+                    self.condition.wait()
+                events = self.events[index:]
+                index = len(self.events)
+                finished = self.finished
+            yield from events
+            if finished:
+                return
+
+
+class EventStream(io.TextIOBase):
+    """
+    Text stream which sends everything written to it as events of a job,
+    used as the output of the printer of a build.
+    """
+
+    def __init__(self, job: Job, event: str):
+        self.job = job
+        self.event = event
+
+    def write(self, text: str) -> int:
+        if text:
+            self.job.emit({"event": self.event, "text": text})
+        return len(text)
+
+
+class JobTracer(Tracer):
+    """
+    Tracer which sends the start and end of each span as progress events of a job.
+    Spans are only recorded for the trace if `enabled`.
+    """
+
+    def __init__(self, job: Job, enabled: bool = False):
+        super().__init__(enabled=enabled)
+        self.job = job
+
+    @contextlib.contextmanager
+    def span(self, name: str, category: str = "ios_build", **args):
+        progress = {k: v for k, v in args.items() if v is not None}
+        self.job.emit({"event": "begin", "name": name, "args": progress})
+        try:
+            with super().span(name, category, **args):
+                yield
+        finally:
+            self.job.emit({"event": "end", "name": name, "args": progress})
+
+
+def toolSignature(command: str) -> tuple:
+    """
+    Path and modification time of the executable of `command`, or None if it is not found.
+    """
+    executable = shutil.which(command)
+    if not executable:
+        return None
+    executable = os.path.realpath(executable)
+
+    return executable, os.stat(executable).st_mtime_ns
+
+
+class BuildServer:
+    """
+    Build server which keeps the results of the tool checks and the toolchain
+    file between builds. Identical builds requested while one is queued or
+    running are deduplicated, different builds of the same project are queued
+    and up to `jobs` projects are built concurrently.
+    """
+
+    def __init__(self, jobs: int = 1, **kwargs):
+        """
+        Args:
+            jobs (int, optional): Number of projects to build concurrently. Defaults to 1.
+        """
+        self.printer = getPrinter(**kwargs)
+        self.slots = threading.Semaphore(jobs)
+        self.lock = threading.Lock()
+        self.active = {}
+        self.projects = {}
+        self.checked = set()
+        self.toolchains = {}
+
+    def submit(self, options: dict) -> tuple[Job, bool]:
+        """
+        Start a build, or find an identical build which is queued or running.
+
+        Args:
+            options (dict): Options of the build, as sent by `client.runClient`.
+
+        Returns:
+            tuple[Job, bool]: The build and whether it was already running.
+        """
+        key = hashlib.sha256(
+            json.dumps(options, sort_keys=True, default=str).encode()
+        ).hexdigest()
+        with self.lock:
+            job = self.active.get(key)
+            if job:
+                return job, True
+            job = Job(key, options)
+            self.active[key] = job
+            self.printer.printValue("Build requested", options.get("path"))
+            project = os.path.realpath(options.get("path") or "")
+            project_lock = self.projects.setdefault(project, threading.Lock())
+
+        thread = threading.Thread(
+            target=self.run, args=(job, project_lock), name="build", daemon=True
+        )
+        thread.start()
+
+        return job, False
+
+    def run(self, job: Job, project_lock: threading.Lock):
+        """
+        Run `job` once no other build of the project is running and a slot is free.
+        """
+        job.emit({"event": "queued"})
+        with project_lock, self.slots:
+            job.emit({"event": "started"})
+            status, message = self.build(job)
+
+        with self.lock:
+            del self.active[job.key]
+        self.printer.printValue(
+            "Build {}".format("complete" if status == 0 else "failed"),
+            job.options.get("path"),
+        )
+        job.emit({"event": "done", "status": status, "message": message}, finish=True)
+
+    def warmOptions(self, options: dict, **kwargs) -> dict:
+        """
+        Check the tools and acquire the toolchain file of a build, reusing the
+        results of previous builds. Build and install directories which are
+        not specified are kept in the user cache directory so that later
+        builds of the project are incremental.
+
+        Args:
+            options (dict): Options of the build
+
+        Returns:
+            dict: Options of the build including the `toolchain_path`.
+        """
+        options = dict(options)
+        project_dir = cacheHome(
+            "serve",
+            hashlib.sha256(os.path.realpath(options["path"]).encode()).hexdigest()[:16],
+        )
+        options.setdefault("build_prefix", os.path.join(project_dir, "build"))
+        options.setdefault("install_prefix", os.path.join(project_dir, "install"))
+
+        tools = {
+            "cmake_command": options.get("cmake_command", "cmake"),
+            "xcode_build_command": options.get("xcode_build_command", "xcodebuild"),
+        }
+        signature = tuple(toolSignature(command) for command in tools.values())
+        if None in signature or signature not in self.checked:
+            build.checkTools(**tools, **kwargs)
+            self.checked.add(signature)
+
+        key = json.dumps(
+            [options.get(k) for k in ["toolchain", "toolchain_sha256", "offline"]]
+        )
+        toolchain_path = self.toolchains.get(key)
+        if not toolchain_path or not os.path.isfile(toolchain_path):
+            toolchain_path = getToolchain(**{**options, **kwargs})
+            self.toolchains[key] = toolchain_path
+
+        return {**options, "toolchain_path": toolchain_path}
+
+    def build(self, job: Job) -> tuple[int, str]:
+        """
+        Run a build using `build.iosBuild`, sending its output and progress as events.
+
+        Returns:
+            tuple[int, str]: Exit code and error message, if any.
+        """
+        options = dict(job.options)
+        printer = Printer(
+            print_level=options.pop("print_level", 0),
+            file=EventStream(job, "output"),
+            error_file=EventStream(job, "error"),
+        )
+        trace_file = options.pop("trace_file", None)
+        tracer = JobTracer(job, enabled=bool(trace_file))
+
+        try:
+            options = self.warmOptions(options, printer=printer, tracer=tracer)
+            build.iosBuild(printer=printer, tracer=tracer, **options)
+            writeTrace(tracer, trace_file, printer=printer)
+        except Exception as error:
+            return errorStatus(error)
+
+        return 0, None
+
+
+class RequestHandler(socketserver.StreamRequestHandler):
+    """
+    Handler of a connection to the build server. Each connection sends one
+    request as a line of JSON and receives events as lines of JSON.
+    """
+
+    def send(self, event: dict):
+        self.wfile.write(json.dumps(event).encode() + b"\n")
+        self.wfile.flush()
+
+    def handle(self):
+        try:
+            request = json.loads(self.rfile.readline())
+        except ValueError:
+            self.send({"event": "done", "status": 1, "message": "Invalid request"})
+            return
+
+        command = request.get("command")
+        if command == "ping":
+            self.send({"event": "pong", "pid": os.getpid()})
+        elif command == "shutdown":
+            self.send({"event": "shutdown"})
+            threading.Thread(target=self.server.shutdown, daemon=True).start()
+        elif command == "build":
+            job, attached = self.server.build_server.submit(request["options"])
+            if attached:
+                self.send({"event": "attached"})
+            try:
+                for event in job.follow():
+                    self.send(event)
+            except OSError:
+                # The client disconnected, the build continues
+                pass
+        else:
+            message = "Unknown command: {}".format(command)
+            self.send({"event": "done", "status": 1, "message": message})
+
+
+class UnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def isRunning(socket_path: str) -> bool:
+    """
+    Whether a server is accepting connections on `socket_path`.
+    """
+    connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    with connection:
+        try:
+            connection.connect(socket_path)
+        except OSError:
+            return False
+
+    return True
+
+
+def serve(socket_path: str, ready: threading.Event = None, **kwargs):
+    """
+    Run the build server on the Unix domain socket `socket_path` until it
+    receives a `shutdown` request or is interrupted.
+
+    Args:
+        socket_path (str): Path to the socket
+        ready (threading.Event, optional): Set once the server accepts connections. Defaults to None.
+
+    Raises:
+        IOSBuildError: Raised if a server is already running on the socket.
+    """
+    if os.path.exists(socket_path):
+        if isRunning(socket_path):
+            raise IOSBuildError("Build server already running: {}".format(socket_path))
+        os.remove(socket_path)
+
+    printer = getPrinter(**kwargs)
+    with UnixServer(socket_path, RequestHandler) as server:
+        server.build_server = BuildServer(**kwargs)
+        printer.printValue("Build server listening", socket_path)
+        if ready:
+            ready.set()
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            os.remove(socket_path)
+    printer.print("Build server stopped")
+
+
+def runServe(print_level: int = 0, **kwargs):
+    """
+    Run the `serve` command using the options obtained from the parser.
+    """
+    printer = Printer(print_level=print_level)
+    serve(printer=printer, **kwargs)
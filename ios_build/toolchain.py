@@ -1,12 +1,32 @@
+from __future__ import annotations
+
 import os
-import requests
+import json
+import time
+import hashlib
 import tempfile
+import threading
+import concurrent.futures
 
+from typing import TYPE_CHECKING
 from urllib.parse import urlparse
 
+from ios_build.cache import cacheHome
+from ios_build.fingerprint import fileDigest
 from ios_build.printer import getPrinter
+from ios_build.trace import getTracer
 from ios_build.errors import IOSBuildError
 
+if TYPE_CHECKING:
+    # requests is only imported when a toolchain is downloaded
+    import requests
+
+POOL_SIZE = 8
+TRANSIENT_STATUS = (429, 500, 502, 503, 504)
+
+SESSION = None
+SESSION_LOCK = threading.Lock()
+
 
 def isURL(inputPath: str) -> bool:
     """
@@ -26,38 +46,533 @@ def isURL(inputPath: str) -> bool:
     return False
 
 
-def download(url: str, output_file: str):
+def removeFile(path: str):
+    """
+    Remove a file if it exists.
+
+    Args:
+        path (str): Path to file
+    """
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def atomicWrite(output_file: str, data: bytes):
+    """
+    Write data to a file atomically. The data is written to a temporary file unique
+    to this process in the same directory, which then replaces `output_file`.
+
+    Args:
+        output_file (str): File to write
+        data (bytes): File contents
+    """
+    directory = os.path.dirname(os.path.abspath(output_file))
+    fd, tmp = tempfile.mkstemp(
+        dir=directory, prefix=".{}.".format(os.path.basename(output_file))
+    )
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, output_file)
+    except BaseException:
+        os.remove(tmp)
+        raise
+
+
+def contentLength(r: requests.Response, offset: int = 0) -> int:
+    """
+    Determine the total size of a (possibly partial) download from the response headers.
+
+    Args:
+        r (requests.Response): HTTP response
+        offset (int, optional): Start of a partial response. Defaults to 0.
+
+    Returns:
+        int: Total size in bytes, or None if unknown.
+    """
+    if r.status_code == 206:
+        content_range = r.headers.get("Content-Range", "")
+        total = content_range.rpartition("/")[2]
+        return int(total) if total.isdigit() else None
+
+    length = r.headers.get("Content-Length")
+    if length is None or not length.isdigit():
+        return None
+
+    return offset + int(length)
+
+
+def getSession() -> requests.Session:
+    """
+    Shared HTTP session with a connection pool, so that concurrent and repeated
+    downloads reuse connections.
+
+    Returns:
+        requests.Session: HTTP session
+    """
+    global SESSION
+    with SESSION_LOCK:
+        if SESSION is None:
+            import requests
+
+            adapter = requests.adapters.HTTPAdapter(
+                pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE
+            )
+            SESSION = requests.Session()
+            SESSION.mount("http://", adapter)
+            SESSION.mount("https://", adapter)
+
+    return SESSION
+
+
+def checkCancelled(url: str, cancel: threading.Event = None):
     """
-    Download URL to output file
+    Raise an error if the download of `url` has been cancelled.
+
+    Args:
+        url (str): URL being downloaded
+        cancel (threading.Event, optional): Event set to cancel the download. Defaults to None.
+
+    Raises:
+        IOSBuildError: Raised if `cancel` is set.
+    """
+    if cancel is not None and cancel.is_set():
+        raise IOSBuildError("Download cancelled: {}".format(url))
+
+
+def downloadStream(
+    url: str,
+    f,
+    headers: dict = None,
+    timeout: float = 30,
+    retries: int = 3,
+    chunk_size: int = 1 << 16,
+    backoff: float = 0.5,
+    cancel: threading.Event = None,
+) -> requests.Response:
+    """
+    Stream the response from a URL into an open file, resuming after dropped
+    connections, see `download`. Transient errors are retried with an exponential
+    backoff, starting at `backoff` seconds, unless the failed attempt made progress.
+
+    Args:
+        url (str): URL to get data from
+        f: Binary file object to write to
+        headers (dict, optional): Additional request headers. Defaults to None.
+        timeout (float, optional): Connection and read timeout in seconds. Defaults to 30.
+        retries (int, optional): Number of times to resume a failed download. Defaults to 3.
+        chunk_size (int, optional): Size of chunks written to file. Defaults to 64 KiB.
+        backoff (float, optional): Initial delay between retries in seconds. Defaults to 0.5.
+        cancel (threading.Event, optional): Event set to cancel the download. Defaults to None.
+
+    Raises:
+        IOSBuildError: If the download fails
+
+    Returns:
+        requests.Response: The final HTTP response
+    """
+    import requests
+
+    size = None
+    etag = None
+    received = 0
+    failures = 0
+    for attempt in range(retries + 1):
+        if attempt and not received:
+            if cancel is not None:
+                cancel.wait(backoff * 2**failures)
+            else:
+                time.sleep(backoff * 2**failures)
+            failures += 1
+        elif attempt:
+            failures = 0
+        checkCancelled(url, cancel)
+
+        received = 0
+        offset = f.tell()
+        request_headers = dict(headers or {})
+        if offset:
+            request_headers["Range"] = "bytes={}-".format(offset)
+            if etag:
+                request_headers["If-Range"] = etag
+
+        try:
+            r = getSession().get(
+                url, headers=request_headers, stream=True, timeout=timeout
+            )  # create HTTP response object
+        except requests.exceptions.Timeout:
+            error = IOSBuildError("Timed out downloading file: {}".format(url))
+            continue
+        except requests.exceptions.ConnectionError:
+            error = IOSBuildError("Unable to establish internet connection")
+            continue
+
+        with r:
+            if r.status_code == 304:
+                return r
+            if r.status_code in TRANSIENT_STATUS:
+                error = IOSBuildError(
+                    "Unable to download file: {0} (HTTP {1})".format(url, r.status_code)
+                )
+                continue
+            if r.status_code == 200 and offset:
+                # Range not supported, restart from the beginning
+                f.seek(0)
+                f.truncate()
+                offset = 0
+            elif r.status_code not in (200, 206):
+                raise IOSBuildError("Unable to download file: {}".format(url))
+
+            size = contentLength(r, offset)
+            etag = r.headers.get("ETag")
+
+            try:
+                for chunk in r.iter_content(chunk_size=chunk_size):
+                    checkCancelled(url, cancel)
+                    f.write(chunk)
+                    received += len(chunk)
+            except requests.exceptions.Timeout:
+                error = IOSBuildError("Timed out downloading file: {}".format(url))
+                continue
+            except (
+                requests.exceptions.ConnectionError,
+                requests.exceptions.ChunkedEncodingError,
+            ):
+                error = IOSBuildError(
+                    "Connection lost downloading file: {}".format(url)
+                )
+                continue
+
+        if size is None or f.tell() == size:
+            return r
+
+        error = IOSBuildError(
+            "Incomplete download of {0}: expected {1} bytes, received {2}".format(
+                url, size, f.tell()
+            )
+        )
+
+    raise error
+
+
+def download(
+    url: str,
+    output_file: str,
+    headers: dict = None,
+    sha256: str = None,
+    timeout: float = 30,
+    retries: int = 3,
+    chunk_size: int = 1 << 16,
+    backoff: float = 0.5,
+    cancel: threading.Event = None,
+) -> requests.Response:
+    """
+    Download URL to output file. The response is streamed in chunks to a temporary
+    file unique to this process, which replaces `output_file` once the download is
+    complete and verified, so `output_file` is never left partially written.
+    If the connection is dropped, the download is resumed using an HTTP `Range`
+    request, up to `retries` times. If the server responds with `304 Not Modified`
+    to a conditional request using `headers`, the output file is not written.
 
     Args:
         url (str): URL to get data from
         output_file (str): File to save response to
+        headers (dict, optional): Additional request headers. Defaults to None.
+        sha256 (str, optional): Expected SHA-256 digest of the file. Defaults to None.
+        timeout (float, optional): Connection and read timeout in seconds. Defaults to 30.
+        retries (int, optional): Number of times to resume a failed download. Defaults to 3.
+        chunk_size (int, optional): Size of chunks written to file. Defaults to 64 KiB.
+        backoff (float, optional): Initial delay between retries in seconds. Defaults to 0.5.
+        cancel (threading.Event, optional): Event set to cancel the download. Defaults to None.
+
+    Raises:
+        IOSBuildError: If requests encounters an error or the file is invalid
+
+    Returns:
+        requests.Response: The HTTP response
+    """
+    directory = os.path.dirname(os.path.abspath(output_file))
+    fd, tmp = tempfile.mkstemp(
+        dir=directory, prefix=".{}.".format(os.path.basename(output_file))
+    )
+    try:
+        with os.fdopen(fd, "wb") as f:
+            r = downloadStream(
+                url, f, headers, timeout, retries, chunk_size, backoff, cancel
+            )
+
+        if r.status_code == 304:
+            return r
+
+        checkDigest(tmp, sha256)
+        os.replace(tmp, output_file)
+    finally:
+        if os.path.isfile(tmp):
+            os.remove(tmp)
+
+    return r
+
+
+def cacheDirectory(toolchain_cache: str = None) -> str:
+    """
+    Directory of the persistent toolchain cache. Defaults to `ios_build/toolchain`
+    in `$XDG_CACHE_HOME` or `~/.cache`.
+
+    Args:
+        toolchain_cache (str, optional): Custom cache directory. Defaults to None.
+
+    Returns:
+        str: Path to the toolchain cache directory
+    """
+    if toolchain_cache:
+        return os.path.abspath(toolchain_cache)
+
+    return cacheHome("toolchain")
+
+
+def cachePath(url: str, toolchain_cache: str = None) -> str:
+    """
+    Path of the cached toolchain file for `url`. The path depends only on the
+    URL so that it is stable between runs.
+
+    Args:
+        url (str): Toolchain URL
+        toolchain_cache (str, optional): Custom cache directory. Defaults to None.
+
+    Returns:
+        str: Path to cached toolchain file
+    """
+    key = hashlib.sha256(url.encode()).hexdigest()[:16]
+    return os.path.join(cacheDirectory(toolchain_cache), key, "ios.toolchain.cmake")
+
+
+def loadMetadata(path: str) -> dict:
+    """
+    Load the metadata (URL, ETag, Last-Modified, SHA-256) of a cached toolchain file.
+
+    Args:
+        path (str): Path to cached toolchain file
+
+    Returns:
+        dict: Cache metadata, empty if not found or invalid
+    """
+    try:
+        with open(path + ".json") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def checkDigest(path: str, toolchain_sha256: str = None):
+    """
+    Check the SHA-256 digest of a toolchain file matches the pinned value.
+
+    Args:
+        path (str): Path to toolchain file
+        toolchain_sha256 (str, optional): Expected digest. Defaults to None.
+
+    Raises:
+        IOSBuildError: Raised if the digest does not match.
+    """
+    if not toolchain_sha256:
+        return
+
+    digest = fileDigest(path)
+    if digest != toolchain_sha256.lower():
+        raise IOSBuildError(
+            "Checksum mismatch for {0}: expected {1}, found {2}".format(
+                path, toolchain_sha256, digest
+            )
+        )
+
+
+def raceMirrors(
+    urls: list[str],
+    output_file: str,
+    headers: dict = {},
+    **kwargs,
+) -> tuple[str, requests.Response]:
+    """
+    Download the same file from several mirrors concurrently. The first mirror to
+    return a valid response wins and the remaining downloads are cancelled.
+    Only the winning download is written to `output_file`.
+
+    Args:
+        urls (list[str]): Mirror URLs
+        output_file (str): File to save response to
+        headers (dict, optional): Additional request headers keyed by URL. Defaults to {}.
+
+    Raises:
+        IOSBuildError: Raised if every mirror fails.
+
+    Returns:
+        tuple[str, requests.Response]: The winning URL and its response.
+    """
+    if len(urls) == 1:
+        url = urls[0]
+        return url, download(url, output_file, headers=headers.get(url), **kwargs)
+
+    cancel = threading.Event()
+    directory = os.path.dirname(os.path.abspath(output_file))
+
+    def fetch(url, candidate):
+        return download(
+            url, candidate, headers=headers.get(url), cancel=cancel, **kwargs
+        )
+
+    errors = []
+    winner = None
+    executor = concurrent.futures.ThreadPoolExecutor(max_workers=len(urls))
+    futures = {}
+    for url in urls:
+        fd, candidate = tempfile.mkstemp(dir=directory, prefix=".mirror.")
+        os.close(fd)
+        futures[executor.submit(fetch, url, candidate)] = (url, candidate)
+
+    try:
+        for future in concurrent.futures.as_completed(futures):
+            url, candidate = futures[future]
+            try:
+                r = future.result()
+            except IOSBuildError as error:
+                errors.append("{0}: {1}".format(url, error))
+                continue
+
+            winner = url, r
+            if r.status_code != 304:
+                os.replace(candidate, output_file)
+            break
+    finally:
+        # Do not wait for the losing mirrors, they stop once cancelled
+        cancel.set()
+        executor.shutdown(wait=False)
+        for future, (url, candidate) in futures.items():
+            future.add_done_callback(lambda _, path=candidate: removeFile(path))
+
+    if winner is None:
+        raise IOSBuildError(
+            "Unable to download file from any mirror: {}".format("; ".join(errors))
+        )
+
+    return winner
+
+
+def cachedToolchain(
+    urls: list[str],
+    toolchain_cache: str = None,
+    toolchain_sha256: str = None,
+    offline: bool = False,
+    download_timeout: float = 30,
+    download_retries: int = 3,
+    **kwargs,
+) -> str:
+    """
+    Retrieve a toolchain file from the persistent cache, downloading it if necessary.
+    The toolchain is downloaded from all mirrors in `urls` concurrently and the first
+    valid response is used. The cache is keyed by the first URL.
+    An existing cached file is revalidated using `ETag` and `Last-Modified`, unless it
+    matches the pinned `toolchain_sha256`, or `offline` is specified. If no mirror
+    can be reached, an existing cached file is used.
+
+    Args:
+        urls (list[str]): Toolchain mirror URLs
+        toolchain_cache (str, optional): Custom cache directory. Defaults to None.
+        toolchain_sha256 (str, optional): Pinned SHA-256 digest of the toolchain. Defaults to None.
+        offline (bool, optional): Only use the cache. Defaults to False.
+        download_timeout (float, optional): Download timeout in seconds. Defaults to 30.
+        download_retries (int, optional): Number of times to retry a failed download. Defaults to 3.
 
     Raises:
-        IOSBuildError: If requests encounters an error
+        IOSBuildError: Raised if the toolchain cannot be retrieved or is invalid.
+
+    Returns:
+        str: Path to cached toolchain file
     """
+    printer = getPrinter(**kwargs)
+
+    path = cachePath(urls[0], toolchain_cache)
+    cached = os.path.isfile(path)
+    metadata = loadMetadata(path) if cached else {}
+
+    if cached and (offline or toolchain_sha256):
+        try:
+            checkDigest(path, toolchain_sha256)
+            printer.printStat("Using cached toolchain", verbosity=1)
+            return path
+        except IOSBuildError:
+            if offline:
+                raise
+
+    if offline:
+        raise IOSBuildError(
+            "Toolchain not cached, unable to download offline: {}".format(urls[0])
+        )
+
+    # Conditional requests are only valid for the mirror which supplied the cache
+    headers = {}
+    if cached and metadata.get("url") in urls:
+        url = metadata["url"]
+        headers[url] = {}
+        if metadata.get("etag"):
+            headers[url]["If-None-Match"] = metadata["etag"]
+        if metadata.get("last_modified"):
+            headers[url]["If-Modified-Since"] = metadata["last_modified"]
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    start = time.perf_counter()
     try:
-        r = requests.get(url)  # create HTTP response object
-    except requests.exceptions.ConnectionError:
-        raise IOSBuildError("Unable to establish internet connection")
+        url, r = raceMirrors(
+            urls,
+            path,
+            headers=headers,
+            sha256=toolchain_sha256,
+            timeout=download_timeout,
+            retries=download_retries,
+        )
+    except IOSBuildError:
+        if not cached:
+            raise
+        printer.printStat("Unable to revalidate toolchain, using cache", tick=False)
+        checkDigest(path, toolchain_sha256)
+        return path
 
-    if r.status_code != 200:
-        raise IOSBuildError("Unable to download file: {}".format(url))
+    printer.printValue(
+        "Toolchain mirror",
+        "{0} ({1:.2f} s)".format(url, time.perf_counter() - start),
+        verbosity=0 if len(urls) > 1 else 1,
+    )
 
-    with open(output_file, "wb") as f:
-        f.write(r.content)
+    if r.status_code == 304:
+        printer.printStat("Toolchain cache up to date", verbosity=1)
+        checkDigest(path, toolchain_sha256)
+        return path
 
+    metadata = {
+        "url": url,
+        "etag": r.headers.get("ETag"),
+        "last_modified": r.headers.get("Last-Modified"),
+        "sha256": fileDigest(path),
+    }
+    atomicWrite(path + ".json", json.dumps(metadata).encode())
+    printer.printStat("Toolchain downloaded", verbosity=1)
 
-def getToolchain(toolchain: str = None, **kwargs) -> str:
+    return path
+
+
+def getToolchain(toolchain: list[str] = None, **kwargs) -> str:
     """
     Retrieve the toolchain file for building CMake projects for Apple
     operating systems. The default version is specified in the parser.
     The remaining program is based on this version by Leetal.
+    The toolchain may be given as a list of mirrors (paths or URLs), an existing
+    local file is used in preference to downloading. Toolchain files specified by
+    URL are stored in a persistent cache, see `cachedToolchain`.
 
     Args:
         printer (Printer): Printer class
-        toolchain (str, optional): Path or URL to toolchain file. Defaults to None.
+        toolchain (list[str], optional): Paths or URLs of toolchain file. Defaults to None.
 
     Raises:
         ValueError: Raised if no toolchain file is specified.
@@ -68,25 +583,30 @@ def getToolchain(toolchain: str = None, **kwargs) -> str:
     if not toolchain:
         raise ValueError("Toolchain file not found")
 
-    output = ""
-    printer = getPrinter(**kwargs)
-
-    printer.printValue("Acquiring toolchain file", toolchain, verbosity=1)
+    tracer = getTracer(**kwargs)
+    with tracer.span("getToolchain"):
+        mirrors = [toolchain] if isinstance(toolchain, str) else list(toolchain)
 
-    if isURL(toolchain):
-        tmp = os.path.join(tempfile.gettempdir(), "ios.toolchain.cmake")
+        output = ""
+        printer = getPrinter(**kwargs)
 
-        download(toolchain, tmp)
+        printer.printValue("Acquiring toolchain file", " ".join(mirrors), verbosity=1)
 
-        output = tmp
+        urls = [mirror for mirror in mirrors if isURL(mirror)]
+        paths = [mirror for mirror in mirrors if os.path.isfile(mirror)]
 
-    elif os.path.isfile(toolchain):
-        output = toolchain
-    else:
-        printer.printStat("Toolchain not found", tick="cross")
-        raise IOSBuildError("Unable to find toolchain: {}".format(toolchain))
+        if paths:
+            output = paths[0]
+            checkDigest(output, kwargs.get("toolchain_sha256"))
+        elif urls:
+            output = cachedToolchain(urls, **kwargs)
+        else:
+            printer.printStat("Toolchain not found", tick="cross")
+            raise IOSBuildError(
+                "Unable to find toolchain: {}".format(" ".join(mirrors))
+            )
 
-    printer.printStat("Toolchain found")
-    printer.printValue("Toolchain file", output, verbosity=1)
+        printer.printStat("Toolchain found")
+        printer.printValue("Toolchain file", output, verbosity=1)
 
     return output
@@ -0,0 +1,134 @@
+import os
+import json
+import time
+import threading
+import contextlib
+
+from ios_build.printer import getPrinter
+
+
+class Tracer:
+    """
+    Class to record the duration of each phase of a build as spans, which are
+    written in the Chrome trace event format so that a whole run can be inspected
+    on one timeline using `chrome://tracing` or Perfetto.
+    """
+
+    def __init__(self, enabled=True):
+        """
+        Initialise tracer, the timeline starts when the tracer is created.
+
+        Args:
+            enabled (bool, optional): Record spans. Defaults to True.
+        """
+        self.enabled = enabled
+        self.start = time.perf_counter()
+        self.events = []
+        self.threads = {}
+        self.lock = threading.Lock()
+
+    def timestamp(self) -> float:
+        """
+        Time since the tracer was created in microseconds.
+        """
+        return (time.perf_counter() - self.start) * 1e6
+
+    @contextlib.contextmanager
+    def span(self, name: str, category: str = "ios_build", **args):
+        """
+        Record the time spent in a `with` block as a span. Spans are tagged with
+        `args`, such as the platform or library, and nest within any span open on
+        the same thread. Spans which raise an exception are tagged with the error.
+
+        Args:
+            name (str): Name of span
+            category (str, optional): Category of span. Defaults to "ios_build".
+        """
+        if not self.enabled:
+            yield
+            return
+
+        args = {k: v for k, v in args.items() if v is not None}
+        start = self.timestamp()
+        try:
+            yield
+        except BaseException as error:
+            args["error"] = type(error).__name__
+            raise
+        finally:
+            self.record(
+                {
+                    "name": name,
+                    "cat": category,
+                    "ph": "X",
+                    "ts": start,
+                    "dur": self.timestamp() - start,
+                    "args": args,
+                }
+            )
+
+    def record(self, event: dict):
+        """
+        Add an event to the trace, tagged with the current process and thread.
+
+        Args:
+            event (dict): Trace event
+        """
+        thread = threading.current_thread()
+        with self.lock:
+            if thread.ident not in self.threads:
+                self.threads[thread.ident] = thread.name
+            self.events.append({**event, "pid": os.getpid(), "tid": thread.ident})
+
+    def trace(self) -> dict:
+        """
+        Recorded spans in Chrome trace event format, including the name of each thread.
+
+        Returns:
+            dict: Trace object
+        """
+        with self.lock:
+            metadata = [
+                {
+                    "name": "thread_name",
+                    "ph": "M",
+                    "pid": os.getpid(),
+                    "tid": tid,
+                    "args": {"name": name},
+                }
+                for tid, name in self.threads.items()
+            ]
+            events = sorted(self.events, key=lambda event: event["ts"])
+
+        return {"traceEvents": metadata + events, "displayTimeUnit": "ms"}
+
+    def write(self, trace_file: str):
+        """
+        Write the trace to a JSON file.
+
+        Args:
+            trace_file (str): Path to output file
+        """
+        with open(trace_file, "w") as f:
+            json.dump(self.trace(), f)
+
+
+def getTracer(**kwargs) -> Tracer:
+    return kwargs.get("tracer") or Tracer(enabled=False)
+
+
+def writeTrace(tracer: Tracer, trace_file: str = None, **kwargs):
+    """
+    Write the trace recorded by `tracer` to `trace_file`, if specified.
+
+    Args:
+        tracer (Tracer): Tracer used for the build
+        trace_file (str, optional): Path to output file. Defaults to None.
+    """
+    if not trace_file:
+        return
+
+    tracer.write(trace_file)
+
+    printer = getPrinter(**kwargs)
+    printer.printValue("Trace file", os.path.abspath(trace_file))
@@ -0,0 +1,249 @@
+import os
+import hashlib
+import threading
+
+from ios_build import build
+from ios_build import history
+from ios_build import search
+from ios_build import fingerprint
+from ios_build.printer import Printer, getPrinter
+from ios_build.trace import Tracer, getTracer, writeTrace
+from ios_build.errors import IOSBuildError, CMakeError, XCodeBuildError
+
+# Fingerprint index of the watched source tree, kept in the build directory
+WATCH_INDEX = "ios_build_watch.json"
+
+
+def libraryDigests(libraries: dict[str, dict[str, str]]) -> dict[str, str]:
+    """
+    Compute a digest of the installed files of each library, used to determine
+    which frameworks need to be recreated after a rebuild.
+
+    Args:
+        libraries (dict[str, dict[str, str]]): Libraries as returned by `search.findlibraries`.
+
+    Returns:
+        dict[str, str]: Hex digest of each library keyed by library name.
+    """
+    digests = {}
+    for lib, files in libraries.items():
+        digest = hashlib.sha256()
+        for platform in sorted(files):
+            digest.update(platform.encode())
+            digest.update(b"\0")
+            digest.update(bytes.fromhex(fingerprint.fileDigest(files[platform])))
+        digests[lib] = digest.hexdigest()
+
+    return digests
+
+
+def updateFrameworks(
+    install_dir: str,
+    digests: dict[str, str],
+    output_dir: str = None,
+    jobs: int = 1,
+    **kwargs,
+) -> dict[str, str]:
+    """
+    Recreate the frameworks of all libraries which changed since `digests` were
+    computed, or whose framework is missing from `output_dir`.
+
+    Args:
+        install_dir (str): Parent directory containing static libraries for all platforms.
+        digests (dict[str, str]): Library digests of the previous update.
+        output_dir (str, optional): Directory in which to create the frameworks. Defaults to None.
+        jobs (int, optional): Number of concurrent jobs. Defaults to 1.
+
+    Returns:
+        dict[str, str]: Library digests after the update.
+    """
+    printer = getPrinter(**kwargs)
+
+    libraries = search.findlibraries(install_dir, jobs=jobs, **kwargs)
+    current = libraryDigests(libraries)
+    changed = {
+        lib: files
+        for lib, files in libraries.items()
+        if current[lib] != digests.get(lib)
+        or not os.path.isdir(os.path.join(output_dir, "{}.xcframework".format(lib)))
+    }
+
+    if not changed:
+        printer.printStat("XC Frameworks up to date")
+        return current
+
+    try:
+        build.createFrameworks(
+            install_dir, output_dir=output_dir, jobs=jobs, libraries=changed, **kwargs
+        )
+    except Exception:
+        # Failed frameworks are recreated by the next update
+        current = {lib: d for lib, d in current.items() if lib not in changed}
+        raise
+
+    return current
+
+
+def waitForChanges(
+    path: str,
+    state: fingerprint.Fingerprint,
+    ignore: list[str] = [],
+    index_file: str = None,
+    watch_interval: float = 1.0,
+    watch_debounce: float = 0.5,
+    stop: threading.Event = None,
+    **kwargs,
+) -> fingerprint.Fingerprint:
+    """
+    Poll the source tree at `path` every `watch_interval` seconds until it no longer
+    matches `state`. Once a change is detected, the tree is polled every
+    `watch_debounce` seconds until it is unchanged between two polls, so that a
+    burst of changes (e.g. a checkout or a save of several files) causes a single
+    rebuild.
+
+    Args:
+        path (str): Path to CMake project.
+        state (fingerprint.Fingerprint): Fingerprint of the previous build.
+        ignore (list[str], optional): Directories to skip. Defaults to [].
+        index_file (str, optional): Fingerprint index file. Defaults to None.
+        watch_interval (float, optional): Polling interval in seconds. Defaults to 1.0.
+        watch_debounce (float, optional): Quiet period in seconds. Defaults to 0.5.
+        stop (threading.Event, optional): Event used to stop watching. Defaults to None.
+
+    Returns:
+        fingerprint.Fingerprint: Fingerprint of the changed tree with all files
+        changed since `state`, or None if `stop` was set.
+    """
+    stop = stop or threading.Event()
+
+    def scan():
+        return fingerprint.fingerprint(
+            path,
+            ignore=ignore,
+            patterns=build.IGNORE_PATTERNS,
+            index_file=index_file,
+        )
+
+    current = state
+    while current.digest == state.digest:
+        if stop.wait(watch_interval):
+            return None
+        current = scan()
+
+    changed = set(current.changed)
+    while True:
+        if stop.wait(watch_debounce):
+            return None
+        latest = scan()
+        changed.update(latest.changed)
+        if latest.digest == current.digest:
+            break
+        current = latest
+
+    return current._replace(changed=sorted(changed))
+
+
+def watchBuild(max_builds: int = None, stop: threading.Event = None, **kwargs) -> int:
+    """
+    Build the CMake project, then watch the source tree and rebuild whenever
+    it changes. Tool checks and toolchain acquisition only run once. Each
+    rebuild reuses the existing build directories, so unchanged platforms skip
+    the configure step and CMake only rebuilds the targets affected by the
+    change. Only the frameworks of libraries whose installed files changed
+    are recreated. Each build is recorded in the build history. Errors during
+    a rebuild are reported and watching continues. The `clean` option only
+    applies to the first build.
+
+    Args:
+        max_builds (int, optional): Stop after this many builds. Defaults to None.
+        stop (threading.Event, optional): Event used to stop watching. Defaults to None.
+
+    Returns:
+        int: Number of builds run.
+    """
+    printer = getPrinter(**kwargs)
+    tracer = getTracer(**kwargs)
+
+    setup = build.setupBuild(**kwargs)
+    build_dir = setup["build_dir"]
+    install_dir = setup["install_dir"]
+    kwargs["toolchain_path"] = setup["toolchain_path"]
+    kwargs["log_dir"] = setup["log_dir"]
+    kwargs["generator"] = setup["generator"]
+
+    ignore = [build_dir, install_dir, kwargs["log_dir"], kwargs.get("output_dir")]
+    ignore = [d for d in ignore if d]
+    index_file = os.path.join(build_dir, WATCH_INDEX)
+    state = fingerprint.fingerprint(
+        kwargs["path"],
+        ignore=ignore,
+        patterns=build.IGNORE_PATTERNS,
+        index_file=index_file,
+    )
+
+    digests = {}
+    builds = 0
+    while True:
+        builds += 1
+        try:
+            with (
+                tracer.span("watchBuild", build=builds),
+                history.recordRun(**kwargs) as recorder,
+            ):
+                build.build(
+                    build_dir, install_dir=install_dir, recorder=recorder, **kwargs
+                )
+                configs = kwargs.get("configs", ["Release"])
+                for config in configs:
+                    digests[config] = updateFrameworks(
+                        build.configDirectory(install_dir, config, configs),
+                        digests.get(config, {}),
+                        **{
+                            **kwargs,
+                            "output_dir": build.configDirectory(
+                                kwargs.get("output_dir"), config, configs
+                            ),
+                            "recorder": recorder.bind(config),
+                        },
+                    )
+            printer.printStat("Build {} complete".format(builds))
+        except (IOSBuildError, CMakeError, XCodeBuildError) as error:
+            printer.printStat("Build {} failed".format(builds), tick="cross")
+            printer.printValue("Error", error)
+
+        if max_builds and builds >= max_builds:
+            return builds
+
+        printer.printValue("Watching for changes", kwargs["path"])
+        state = waitForChanges(
+            state=state, ignore=ignore, index_file=index_file, stop=stop, **kwargs
+        )
+        if state is None:
+            return builds
+
+        # Rebuilds are incremental
+        kwargs["clean"] = False
+
+        printer.printValue("Files changed", len(state.changed))
+        for relpath in state.changed:
+            printer.print(relpath, verbosity=1)
+
+
+def runWatch(print_level: int = 0, trace_file: str = None, **kwargs):
+    """
+    Run iOSBuild in watch mode until interrupted, see `watchBuild`.
+    The trace of all builds is written to `trace_file` on exit.
+    """
+    printer = Printer(print_level=print_level)
+    tracer = Tracer(enabled=bool(trace_file))
+
+    printer.printHeader(**kwargs)
+
+    try:
+        watchBuild(printer=printer, tracer=tracer, **kwargs)
+    except KeyboardInterrupt:
+        printer.print("Stopped watching")
+    finally:
+        writeTrace(tracer, trace_file, printer=printer)
+
+    printer.printFooter(**kwargs)
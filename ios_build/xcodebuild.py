@@ -39,4 +39,5 @@ def createXCFramework(
         commands.append(library)
     commands.append("-output")
     commands.append(output_file)
-    interface.xcodebuild(*commands, **kwargs)
+    log_file = interface.logPath(os.path.join("xcframework", lib), **kwargs)
+    interface.xcodebuild(*commands, log_file=log_file, **kwargs)
@@ -1,17 +1,134 @@
+import time
 import pytest
+import hashlib
+import threading
+import http.server
 
 from ios_build.toolchain import getToolchain
 
 
+@pytest.fixture(scope="session")
+def cache_dir(tmp_path_factory):
+    return tmp_path_factory.mktemp("cache")
+
+
+@pytest.fixture(autouse=True)
+def cache_home(monkeypatch, cache_dir):
+    """
+    Keep the caches used by tests out of the user cache directory.
+    """
+    monkeypatch.setenv("XDG_CACHE_HOME", str(cache_dir))
+
+
 @pytest.fixture
 def toolchain_file():
     """
-    Return the filepath to the ios toolchain file
+    Return the filepath to the ios toolchain file, failed downloads are not retried
 
     Returns:
         str: Toolchain filepath
     """
     url = "https://github.com/leetal/ios-cmake/blob/master/ios.toolchain.cmake?raw=true"
-    file = getToolchain(toolchain=url)
+    file = getToolchain(toolchain=url, download_retries=0)
 
     return file
+
+
+class FileHandler(http.server.BaseHTTPRequestHandler):
+    """
+    Request handler serving the files of a `FileServer` with ETag and Range support.
+    """
+
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        server = self.server
+        server.requests.append((self.path, dict(self.headers)))
+        time.sleep(server.delays.get(self.path, 0))
+        if server.failures.get(self.path):
+            server.failures[self.path] -= 1
+            self.send_error(503)
+            return
+
+        content = server.files.get(self.path)
+        if content is None:
+            self.send_error(404)
+            return
+
+        etag = '"{}"'.format(hashlib.sha256(content).hexdigest()[:16])
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        start = 0
+        range_header = self.headers.get("Range")
+        if range_header and server.ranges:
+            start = int(range_header.split("=")[1].split("-")[0])
+            self.send_response(206)
+            self.send_header(
+                "Content-Range",
+                "bytes {0}-{1}/{2}".format(start, len(content) - 1, len(content)),
+            )
+        else:
+            self.send_response(200)
+        self.send_header("ETag", etag)
+        self.send_header("Content-Length", str(len(content) - start))
+        self.end_headers()
+
+        body = content[start:]
+        if server.drops:
+            # Simulate a dropped connection part way through the response
+            server.drops -= 1
+            self.wfile.write(body[: len(body) // 2])
+            self.wfile.flush()
+            self.close_connection = True
+            return
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FileServer(http.server.ThreadingHTTPServer):
+    """
+    Local HTTP server standing in for a remote toolchain host.
+    Files are served from the `files` dictionary keyed by URL path.
+    Responses are delayed by `delays` seconds and fail with 503 the number of
+    times given in `failures`, both keyed by path. The next `drops` responses
+    are cut off half way through and `Range` requests are only honoured if
+    `ranges` is set.
+    """
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), FileHandler)
+        self.files = {}
+        self.requests = []
+        self.delays = {}
+        self.failures = {}
+        self.drops = 0
+        self.ranges = True
+
+    def url(self, path: str) -> str:
+        return "http://127.0.0.1:{0}{1}".format(self.server_address[1], path)
+
+
+@pytest.fixture
+def http_server():
+    """
+    Run a local HTTP server for the duration of a test.
+
+    Returns:
+        FileServer: Running HTTP server
+    """
+    server = FileServer()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    yield server
+
+    server.shutdown()
+    server.server_close()
+    thread.join()
@@ -0,0 +1,184 @@
+import os
+import pytest
+
+from ios_build import batch
+from ios_build.printer import Printer
+from ios_build.errors import IOSBuildError
+from .test_watch import TOOLS, createProject, readLog
+
+
+@pytest.fixture(autouse=True)
+def cache_home(tmp_path, monkeypatch):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+
+
+def writeManifest(tmp_path, projects: str) -> str:
+    with open(os.path.join(tmp_path, "ios.toolchain.cmake"), "w") as f:
+        f.write("# toolchain\n")
+
+    manifest = os.path.join(tmp_path, "manifest.toml")
+    with open(manifest, "w") as f:
+        f.write(
+            "[defaults]\n"
+            'toolchain = "ios.toolchain.cmake"\n'
+            'platforms = ["OS64", "SIMULATORARM64"]\n'
+            'generator = "Xcode"\n'
+            'cmake_command = "{0}"\n'
+            'xcode_build_command = "{1}"\n\n'.format(
+                os.path.join(TOOLS, "cmake"), os.path.join(TOOLS, "xcodebuild")
+            )
+        )
+        f.write(projects)
+
+    return manifest
+
+
+PROJECTS = """
+[projects.zlib]
+path = "zlib"
+
+[projects.png]
+path = "png"
+depends = ["zlib"]
+cmake_options = { PNG_SHARED = false }
+
+[projects.other]
+path = "other"
+"""
+
+
+def testLoadManifest(tmp_path):
+    manifest = writeManifest(tmp_path, PROJECTS)
+    projects = batch.loadManifest(manifest)
+
+    assert list(projects) == ["zlib", "png", "other"]
+    png = projects["png"]
+    assert png["path"] == os.path.join(tmp_path, "png")
+    assert png["install_prefix"] == os.path.join(tmp_path, "install", "png")
+    assert png["output_dir"] == os.path.join(tmp_path, "output", "png")
+    assert png["toolchain"] == [os.path.join(tmp_path, "ios.toolchain.cmake")]
+    assert png["platforms"] == ["OS64", "SIMULATORARM64"]
+    assert png["cmake_options"] == {"PNG_SHARED": "OFF"}
+    assert png["depends"] == ["zlib"]
+    assert png["jobs"] == 1
+
+    platform_options = batch.prefixPath("png", projects)
+    assert platform_options["OS64"] == {
+        "CMAKE_PREFIX_PATH": os.path.join(tmp_path, "install", "zlib", "OS64")
+    }
+    assert batch.prefixPath("zlib", projects) == {}
+
+
+@pytest.mark.parametrize(
+    "projects, message",
+    [
+        ("", "No projects in manifest"),
+        ("[projects.a]\n", "No path specified for project a"),
+        ('[projects.a]\npath = "a"\nunknown = 1\n', "Unknown option for project a"),
+        ('[projects.a]\npath = "a"\nprint_level = 1\n', "Unknown option"),
+        (
+            '[projects.a]\npath = "a"\ndepends = ["b"]\n',
+            "Unknown dependency of project a: b",
+        ),
+        (
+            '[projects.a]\npath = "a"\ndepends = ["b"]\n'
+            '[projects.b]\npath = "b"\ndepends = ["a"]\n',
+            "Dependency cycle: a -> b -> a",
+        ),
+        (
+            '[projects.a]\npath = "a"\nplatforms = ["OS64"]\n'
+            '[projects.b]\npath = "b"\ndepends = ["a"]\n',
+            "Project b depends on a which is not built for SIMULATORARM64",
+        ),
+        (
+            '[projects.a]\npath = "a"\ncmake_options = { PLATFORM = "OS" }\n',
+            "CMake option PLATFORM is used by iOSBuild",
+        ),
+        (
+            '[projects.a]\npath = "a"\nplatforms = ["OS65"]\n',
+            "Invalid option for project a: platforms: invalid choice: 'OS65'",
+        ),
+        (
+            '[projects.a]\npath = "a"\njobs = 0\n',
+            "Invalid option for project a: jobs: invalid value: 0",
+        ),
+        ('[projects.a]\npath = "a"\ngenerator = "Make"\n', "invalid choice: 'Make'"),
+        ('[projects.a]\npath = "a"\nclean = "yes"\n', "clean: expected true or"),
+        ('[projects.a]\npath = "a"\njobs = [2]\n', "jobs: expected one value"),
+        ("[projects.a\n", "Invalid manifest"),
+    ],
+)
+def testManifestErrors(tmp_path, projects, message):
+    manifest = writeManifest(tmp_path, projects)
+    with pytest.raises(IOSBuildError, match=message):
+        batch.loadManifest(manifest)
+
+
+def testDependencyOrder():
+    dependencies = {"c": ["b"], "b": ["a"], "a": [], "d": []}
+    assert batch.dependencyOrder(dependencies) == ["a", "b", "c", "d"]
+
+
+@pytest.mark.parametrize("print_level", range(-1, 3))
+@pytest.mark.parametrize("jobs", [1, 2])
+def testBatch(tmp_path, monkeypatch, capsys, print_level, jobs):
+    log_file = os.path.join(tmp_path, "cmake.log")
+    monkeypatch.setenv("IOS_BUILD_FAKE_LOG", log_file)
+    for name in ["zlib", "png", "other"]:
+        createProject(os.path.join(tmp_path, name))
+    manifest = writeManifest(tmp_path, PROJECTS)
+
+    batch.batch(manifest, jobs=jobs, printer=Printer(print_level=print_level))
+
+    for name in ["zlib", "png", "other"]:
+        frameworks = sorted(os.listdir(os.path.join(tmp_path, "output", name)))
+        assert frameworks == ["libalpha.xcframework", "libbeta.xcframework"]
+
+    # The tools are checked once for all projects
+    calls = readLog(log_file)
+    assert calls.count(["cmake", "--version"]) == 1
+    assert calls.count(["xcodebuild", "-version"]) == 1
+
+    # Dependencies are installed before their dependents are configured
+    zlib_build = os.path.join(tmp_path, "build", "zlib")
+    png_build = os.path.join(tmp_path, "build", "png")
+    installs = [
+        i
+        for i, args in enumerate(calls)
+        if args[1] == "--install" and args[2].startswith(zlib_build)
+    ]
+    configures = [
+        i
+        for i, args in enumerate(calls)
+        if "-S" in args and args[args.index("-B") + 1].startswith(png_build)
+    ]
+    assert max(installs) < min(configures)
+
+    with open(os.path.join(png_build, "OS64", "CMakeCache.txt")) as f:
+        cache = f.read()
+    prefix = os.path.join(tmp_path, "install", "zlib", "OS64")
+    assert "CMAKE_PREFIX_PATH:STRING={}\n".format(prefix) in cache
+
+    captured = capsys.readouterr()
+    if print_level >= 0:
+        assert "3 built, 0 failed, 0 skipped" in captured.out
+
+
+@pytest.mark.parametrize("print_level", range(-1, 3))
+def testBatchFailure(tmp_path, capsys, print_level):
+    os.makedirs(os.path.join(tmp_path, "zlib"))
+    for name in ["png", "other"]:
+        createProject(os.path.join(tmp_path, name))
+    manifest = writeManifest(tmp_path, PROJECTS)
+
+    # Projects depending on a failed project are skipped
+    with pytest.raises(IOSBuildError, match="no such file"):
+        batch.batch(manifest, printer=Printer(print_level=print_level))
+
+    assert not os.path.isdir(os.path.join(tmp_path, "output", "png"))
+    assert os.path.isdir(os.path.join(tmp_path, "output", "other"))
+
+    captured = capsys.readouterr()
+    if print_level >= 0:
+        assert "1 built, 1 failed, 1 skipped" in captured.out
+        assert "Project skipped: png" in captured.out
@@ -1,9 +1,13 @@
 import pytest
 import os
+import time
 import tempfile
+import threading
 
 from .test_search import createEmptyFile
 from ios_build import build
+from ios_build import cmake
+from ios_build import search
 from ios_build.printer import Printer
 from ios_build.parser import parse
 from ios_build.errors import IOSBuildError, XCodeBuildError, CMakeError
@@ -79,6 +83,56 @@ def testCreateFrameworks(tmp_path, print_level, capfd):
     assert "error: unable to create a Mach-O from the binary at" in captured.err
 
 
+@pytest.mark.parametrize("print_level", range(-1, 3))
+@pytest.mark.parametrize("framework_jobs", [None, 1, 3])
+def testCreateFrameworksJobs(tmp_path, capfd, monkeypatch, print_level, framework_jobs):
+    attempted = []
+
+    def createXCFramework(output_dir, lib, files, **kwargs):
+        time.sleep(0.01 * (5 - int(lib[-1])))
+        attempted.append(lib)
+        if lib in ("lib1", "lib3"):
+            raise XCodeBuildError("Failed {}".format(lib))
+
+    monkeypatch.setattr(build.xcodebuild, "createXCFramework", createXCFramework)
+
+    printer = Printer(print_level=print_level)
+    platforms = ["macOS", "iOS"]
+    libs = ["lib{}".format(i) for i in range(5)]
+    for platform in platforms:
+        for lib in libs:
+            createEmptyFile(tmp_path, platform, "{}.a".format(lib))
+
+    with pytest.raises(XCodeBuildError, match="Failed lib"):
+        build.createFrameworks(
+            tmp_path,
+            output_dir=tmp_path,
+            printer=printer,
+            platforms=platforms,
+            jobs=2,
+            framework_jobs=framework_jobs,
+        )
+    assert sorted(attempted) == libs
+
+    captured = capfd.readouterr()
+    if print_level < 0:
+        assert captured.out == ""
+        return
+
+    created = [
+        line.split()[-1]
+        for line in captured.out.split("\n")
+        if line.startswith("Created XC Framework")
+    ]
+    order = list(search.findlibraries(tmp_path, platforms=platforms))
+    expected = [lib for lib in order if lib not in ("lib1", "lib3")]
+    assert created == [
+        "{}.xcframwork".format(os.path.join(tmp_path, lib)) for lib in expected
+    ]
+    assert "XC Framework failed: lib1" in captured.out
+    assert "XC Framework failed: lib3" in captured.out
+
+
 def testCleanUp(tmp_path):
     assert os.path.isdir(tmp_path)
 
@@ -134,6 +188,104 @@ def testBuildFn(tmp_path, capfd, print_level):
     assert "does not appear to contain CMakeLists.txt" in captured.err
 
 
+def printItem(item, **kwargs):
+    printer = kwargs["printer"]
+    time.sleep(0.01 * item)
+    printer.print("Item {}".format(item))
+    if item % 2:
+        raise CMakeError("Odd item {}".format(item))
+
+    return item * 2
+
+
+@pytest.mark.parametrize("print_level", range(-1, 3))
+@pytest.mark.parametrize("jobs", [1, 2, 4])
+def testRunJobs(capsys, print_level, jobs):
+    printer = Printer(print_level=print_level)
+    items = [4, 3, 2, 1, 0]
+
+    results, errors = build.runJobs(
+        printItem, items, jobs=jobs, keep_going=True, printer=printer
+    )
+    assert results == {4: 8, 2: 4, 0: 0}
+    assert set(errors) == {3, 1}
+
+    captured = capsys.readouterr()
+    if print_level >= 0:
+        lines = captured.out.split("\n")
+        assert sorted(lines[:-1]) == ["Item {}".format(i) for i in range(5)]
+    else:
+        assert captured.out == ""
+
+    with pytest.raises(CMakeError, match="Odd item 3"):
+        build.raiseErrors(errors, items, "Item", printer=printer)
+
+    captured = capsys.readouterr()
+    if print_level >= 0:
+        assert "Item failed: 3" in captured.out
+        assert "Item failed: 1" in captured.out
+
+    build.raiseErrors({}, items, "Item", printer=printer)
+
+
+def testRunJobsFailFast():
+    # Items run in order stop at the first failure
+    printer = Printer(print_level=-1)
+    results, errors = build.runJobs(printItem, [4, 3, 2, 1], printer=printer)
+    assert results == {4: 8}
+    assert set(errors) == {3}
+
+
+def testBuildFailFast(tmp_path, monkeypatch):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+    toolchain = os.path.join(tmp_path, "ios.toolchain.cmake")
+    with open(toolchain, "w") as f:
+        f.write("# toolchain\n")
+
+    built = []
+
+    def runCMake(platform, **kwargs):
+        built.append(platform)
+        raise CMakeError("Build failed for {}".format(platform))
+
+    monkeypatch.setattr(cmake, "runCMake", runCMake)
+
+    # Platforms built in order stop at the first failed platform
+    with pytest.raises(CMakeError, match="OS64"):
+        build.build(
+            str(tmp_path / "build"),
+            platforms=["OS64", "SIMULATORARM64", "MAC_ARM64"],
+            path=str(tmp_path),
+            toolchain_path=toolchain,
+            install_dir=str(tmp_path / "install"),
+            printer=Printer(print_level=-1),
+        )
+    assert built == ["OS64"]
+
+
+@pytest.mark.parametrize("print_level", range(-1, 3))
+def testBuildFnJobs(tmp_path, capfd, print_level):
+    path = str(tmp_path)
+    printer = Printer(print_level=print_level)
+
+    platforms = ["One", "Two"]
+    with pytest.raises(CMakeError):
+        build.build(
+            path,
+            platforms=platforms,
+            jobs=2,
+            path=path,
+            printer=printer,
+            toolchain_path=path,
+            install_dir=path,
+        )
+
+    captured = capfd.readouterr()
+    if print_level >= 0:
+        assert "Platform failed: One" in captured.out
+        assert "Platform failed: Two" in captured.out
+
+
 @pytest.mark.parametrize("print_level", range(-1, 3))
 def testBuildFails(capfd, print_level):
     kwargs = {}
@@ -239,3 +391,112 @@ def testBuildWithOptions(tmp_path, print_level):
     build.runBuild(**kwargs)
 
     checkBuild(build_path, install_path, tmp_path, **kwargs)
+
+
+@pytest.mark.parametrize("print_level", range(-1, 3))
+def testBuildLogs(tmp_path, monkeypatch, capfd, print_level):
+    from .test_trace import buildOptions
+
+    options = buildOptions(tmp_path, trace_file=None)
+    printer = Printer(print_level=print_level)
+    build.iosBuild(printer=printer, compress_logs=False, **options)
+
+    # The output of each step is logged in the build directory
+    log_dir = os.path.join(tmp_path, "build", "logs")
+    for platform in options["platforms"]:
+        logs = sorted(os.listdir(os.path.join(log_dir, platform)))
+        assert logs == ["build.log", "configure.log", "install.log"]
+    logs = sorted(os.listdir(os.path.join(log_dir, "xcframework")))
+    assert logs == ["libalpha.log", "libbeta.log"]
+
+    # The log file of a failed step is reported
+    fail_file = os.path.join(tmp_path, "fail")
+    open(fail_file, "w").close()
+    monkeypatch.setenv("IOS_BUILD_FAKE_FAIL", fail_file)
+    capfd.readouterr()
+    log_dir = os.path.join(tmp_path, "logs")
+    with pytest.raises(CMakeError):
+        build.iosBuild(
+            printer=printer, log_dir=log_dir, compress_logs=True, jobs=2, **options
+        )
+
+    log_file = os.path.join(log_dir, "OS64", "build.log.gz")
+    assert os.path.isfile(log_file)
+    captured = capfd.readouterr()
+    if print_level >= 0:
+        assert log_file in captured.out
+
+
+@pytest.mark.parametrize("print_level", range(-1, 3))
+@pytest.mark.parametrize("generator", ["Xcode", "Ninja"])
+def testBuildConfigs(tmp_path, monkeypatch, print_level, generator):
+    from .test_trace import buildOptions
+    from .test_watch import readLog
+
+    log_file = os.path.join(tmp_path, "cmake.log")
+    monkeypatch.setenv("IOS_BUILD_FAKE_LOG", log_file)
+    configs = ["Debug", "Release"]
+    options = buildOptions(tmp_path, trace_file=None)
+    build.iosBuild(
+        printer=Printer(print_level=print_level),
+        generator=generator,
+        configs=configs,
+        jobs=2,
+        **options,
+    )
+
+    # Multi-config generators configure each platform once
+    configures = [args for args in readLog(log_file) if "-S" in args]
+    if generator == "Xcode":
+        assert len(configures) == len(options["platforms"])
+    else:
+        assert len(configures) == len(options["platforms"]) * len(configs)
+
+    # Each configuration has its own install prefix, frameworks and logs
+    for config in configs:
+        for platform in options["platforms"]:
+            library = os.path.join(
+                tmp_path, "install", config, platform, "lib", "libalpha.a"
+            )
+            with open(library) as f:
+                assert "{0} {1}".format(platform, config) in f.read()
+            logs = os.path.join(tmp_path, "build", "logs", platform, config)
+            assert "build.log" in os.listdir(logs)
+        frameworks = sorted(os.listdir(os.path.join(options["output_dir"], config)))
+        assert frameworks == ["libalpha.xcframework", "libbeta.xcframework"]
+
+
+def testConfigJobs(tmp_path, monkeypatch):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+    toolchain = os.path.join(tmp_path, "ios.toolchain.cmake")
+    with open(toolchain, "w") as f:
+        f.write("# toolchain\n")
+
+    lock = threading.Lock()
+    running = [0]
+    peak = [0]
+
+    def runCMake(**kwargs):
+        with lock:
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+        time.sleep(0.1)
+        with lock:
+            running[0] -= 1
+        return {"build": 0.1}
+
+    monkeypatch.setattr(cmake, "runCMake", runCMake)
+
+    # Configurations of concurrent platforms share the jobs
+    build.build(
+        str(tmp_path / "build"),
+        platforms=["OS64", "SIMULATORARM64"],
+        jobs=2,
+        configs=["Debug", "Release"],
+        generator="Ninja",
+        path=str(tmp_path),
+        toolchain_path=toolchain,
+        install_dir=str(tmp_path / "install"),
+        printer=Printer(print_level=-1),
+    )
+    assert peak[0] == 2
@@ -0,0 +1,219 @@
+import os
+import time
+import shutil
+import pytest
+import threading
+
+from ios_build import build
+from ios_build import cache
+from ios_build.printer import Printer
+from .test_search import createEmptyFile
+
+
+def writeFile(contents, *path) -> str:
+    filepath = createEmptyFile(*path)
+    with open(filepath, "w") as f:
+        f.write(contents)
+
+    return filepath
+
+
+def testCacheHome(tmp_path, monkeypatch):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+    assert cache.cacheHome() == os.path.join(tmp_path, "ios_build")
+    assert cache.cacheHome("builds") == os.path.join(tmp_path, "ios_build", "builds")
+    assert cache.cacheDirectory() == os.path.join(tmp_path, "ios_build", "builds")
+    assert cache.cacheDirectory("other") == os.path.abspath("other")
+
+
+def testBuildKey(tmp_path):
+    toolchain = writeFile("toolchain", tmp_path, "ios.toolchain.cmake")
+    kwargs = {
+        "platform": "OS64",
+        "source_digest": "source",
+        "toolchain_path": toolchain,
+        "cmake_options": {"FOO": "ON"},
+        "platform_options": {"MAC_ARM64": {"BAR": "ON"}},
+        "generator": "Xcode",
+        "config": "Release",
+    }
+    key = cache.buildKey(**kwargs)
+    assert key == cache.buildKey(**kwargs, printer=Printer())
+
+    changes = [
+        ("platform", "SIMULATORARM64"),
+        ("source_digest", "new source"),
+        ("cmake_options", {"FOO": "OFF"}),
+        ("platform_options", {"OS64": {"BAR": "ON"}}),
+        ("generator", "Ninja"),
+        ("config", "Debug"),
+    ]
+    keys = {key}
+    for k, v in changes:
+        keys.add(cache.buildKey(**{**kwargs, k: v}))
+    assert len(keys) == len(changes) + 1
+
+    writeFile("new toolchain", toolchain)
+    assert cache.buildKey(**kwargs) not in keys
+
+
+def testBuildKeyVersion(tmp_path, monkeypatch):
+    toolchain = writeFile("toolchain", tmp_path, "ios.toolchain.cmake")
+    key = cache.buildKey(platform="OS64", toolchain_path=toolchain)
+
+    # Entries of a previous version are not restored
+    monkeypatch.setattr(cache, "KEY_VERSION", cache.KEY_VERSION - 1)
+    assert cache.buildKey(platform="OS64", toolchain_path=toolchain) != key
+
+
+@pytest.mark.parametrize("print_level", range(-1, 3))
+def testStoreRestore(tmp_path, print_level):
+    printer = Printer(print_level=print_level)
+    cache_dir = os.path.join(tmp_path, "cache")
+    install = os.path.join(tmp_path, "install", "OS64")
+    kwargs = {"build_cache_dir": cache_dir, "printer": printer}
+
+    assert not cache.restore("key1", install, **kwargs)
+
+    # Nothing to store
+    cache.store("key1", install, **kwargs)
+    assert cache.loadEntries(cache_dir) == []
+
+    writeFile("a" * 1000, install, "lib", "libexample.a")
+    writeFile("header", install, "include", "library.h")
+    cache.store("key1", install, platform="OS64", **kwargs)
+
+    entries = cache.loadEntries(cache_dir)
+    assert len(entries) == 1
+    assert entries[0]["key"] == "key1"
+    assert entries[0]["platform"] == "OS64"
+    assert entries[0]["size"] == cache.treeSize(install)
+
+    writeFile("stale", install, "lib", "libstale.a")
+    assert cache.restore("key1", install, **kwargs)
+    assert sorted(os.listdir(os.path.join(install, "lib"))) == ["libexample.a"]
+    with open(os.path.join(install, "include", "library.h")) as f:
+        assert f.read() == "header"
+
+    assert os.listdir(cache_dir) == ["key1"]
+
+
+def testEvict(tmp_path):
+    cache_dir = os.path.join(tmp_path, "cache")
+    install = os.path.join(tmp_path, "install")
+    writeFile("a" * 400000, install, "libexample.a")
+    kwargs = {"build_cache_dir": cache_dir, "build_cache_size": 1}
+
+    for key in ["key1", "key2"]:
+        cache.store(key, install, **kwargs)
+        past = time.time() - 100 + len(key)
+        os.utime(os.path.join(cache_dir, key), (past, past))
+        time.sleep(0.01)
+
+    # Using key1 makes key2 the least recently used
+    assert cache.restore("key1", os.path.join(tmp_path, "restored"), **kwargs)
+    cache.store("key3", install, **kwargs)
+
+    assert sorted(os.listdir(cache_dir)) == ["key1", "key3"]
+    assert cache.evict(cache_dir, 1) == []
+    assert cache.evict(cache_dir, 0) == ["key1", "key3"]
+    assert os.listdir(cache_dir) == []
+
+
+def testRestoreDuringEvict(tmp_path, monkeypatch):
+    cache_dir = os.path.join(tmp_path, "cache")
+    install = os.path.join(tmp_path, "install")
+    restored = os.path.join(tmp_path, "restored")
+    writeFile("a" * 800000, install, "libexample.a")
+    kwargs = {"build_cache_dir": cache_dir, "build_cache_size": 1}
+    cache.store("key1", install, **kwargs)
+
+    # Pause while restoring key1
+    copying = threading.Event()
+    resume = threading.Event()
+    copytree = shutil.copytree
+
+    def pausedCopytree(src, dst, **copy_kwargs):
+        if src == os.path.join(cache_dir, "key1", "install"):
+            copying.set()
+            resume.wait(timeout=10)
+        return copytree(src, dst, **copy_kwargs)
+
+    monkeypatch.setattr(shutil, "copytree", pausedCopytree)
+    restore = threading.Thread(
+        target=cache.restore, args=("key1", restored), kwargs=kwargs
+    )
+    restore.start()
+    assert copying.wait(timeout=10)
+
+    # Storing key2 evicts key1, but only once it has been restored
+    store = threading.Thread(target=cache.store, args=("key2", install), kwargs=kwargs)
+    store.start()
+    time.sleep(0.2)
+    assert store.is_alive()
+    assert os.path.isdir(os.path.join(cache_dir, "key1"))
+
+    resume.set()
+    restore.join(timeout=10)
+    store.join(timeout=10)
+    with open(os.path.join(restored, "libexample.a")) as f:
+        assert f.read() == "a" * 800000
+    assert len(cache.loadEntries(cache_dir)) == 1
+
+
+@pytest.mark.parametrize("print_level", range(-1, 3))
+@pytest.mark.parametrize("jobs", [1, 2])
+def testBuildCache(tmp_path, capsys, monkeypatch, print_level, jobs):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+    built = []
+
+    def runCMake(platform=None, install_dir=None, **kwargs):
+        built.append(platform)
+        writeFile(platform, install_dir, platform, "libexample.a")
+        return {"build": 0}
+
+    monkeypatch.setattr(build.cmake, "runCMake", runCMake)
+
+    path = os.path.join(tmp_path, "project")
+    writeFile("project()", path, "CMakeLists.txt")
+    toolchain = writeFile("toolchain", tmp_path, "ios.toolchain.cmake")
+    install_dir = os.path.join(tmp_path, "install")
+    platforms = ["OS64", "MAC_ARM64"]
+    kwargs = {
+        "platforms": platforms,
+        "path": path,
+        "toolchain_path": toolchain,
+        "install_dir": install_dir,
+        "build_cache": True,
+        "build_cache_dir": os.path.join(tmp_path, "cache"),
+        "printer": Printer(print_level=print_level),
+        "jobs": jobs,
+    }
+    build_dir = os.path.join(tmp_path, "build")
+
+    build.build(build_dir, **kwargs)
+    assert sorted(built) == sorted(platforms)
+    captured = capsys.readouterr()
+    if print_level >= 0:
+        assert "0 hits, 2 misses" in captured.out
+
+    built.clear()
+    build.build(build_dir, **kwargs)
+    assert built == []
+    for platform in platforms:
+        with open(os.path.join(install_dir, platform, "libexample.a")) as f:
+            assert f.read() == platform
+    captured = capsys.readouterr()
+    if print_level >= 0:
+        assert "2 hits, 0 misses" in captured.out
+
+    writeFile("int x;", path, "library.c")
+    build.build(build_dir, **kwargs)
+    assert sorted(built) == sorted(platforms)
+
+    built.clear()
+    build.build(build_dir, **{**kwargs, "platforms": ["OS64", "TVOS"]})
+    assert built == ["TVOS"]
+    captured = capsys.readouterr()
+    if print_level >= 0:
+        assert "1 hits, 1 misses" in captured.out
@@ -6,6 +6,7 @@ from ios_build import cmake
 from ios_build.interface import callSubProcess
 from ios_build.printer import Printer
 from ios_build.errors import IOSBuildError, CMakeError
+from .test_search import createEmptyFile
 
 
 def testCheck():
@@ -166,3 +167,127 @@ def testInstall(tmp_path, print_level, capfd):
     captured = capfd.readouterr()
     assert "CMake Error: Not a file:" in captured.err
     assert "cmake_install.cmake" in captured.err
+
+
+def testFindCMakeFiles(tmp_path):
+    assert cmake.findCMakeFiles(tmp_path) == []
+
+    createEmptyFile(tmp_path, "CMakeLists.txt")
+    createEmptyFile(tmp_path, "src", "CMakeLists.txt")
+    createEmptyFile(tmp_path, "cmake", "module.cmake")
+    createEmptyFile(tmp_path, "src", "library.c")
+    createEmptyFile(tmp_path, ".git", "config.cmake")
+    createEmptyFile(tmp_path, "build", "CMakeCache.txt")
+    createEmptyFile(tmp_path, "build", "CMakeFiles", "generated.cmake")
+
+    assert cmake.findCMakeFiles(str(tmp_path)) == [
+        "CMakeLists.txt",
+        os.path.join("cmake", "module.cmake"),
+        os.path.join("src", "CMakeLists.txt"),
+    ]
+
+    # Installed package configuration files are not inputs
+    install_dir = os.path.join(tmp_path, "install")
+    createEmptyFile(install_dir, "OS64", "lib", "cmake", "foo", "fooConfig.cmake")
+    assert len(cmake.findCMakeFiles(str(tmp_path), ignore=[install_dir])) == 3
+    assert len(cmake.findCMakeFiles(str(tmp_path))) == 4
+
+
+def testConfigureFingerprint(tmp_path):
+    path = os.path.join(tmp_path, "project")
+    createEmptyFile(path, "CMakeLists.txt")
+    toolchain = os.path.join(tmp_path, "ios.toolchain.cmake")
+    with open(toolchain, "w") as f:
+        f.write("toolchain")
+
+    options = ["-GXcode", "-DPLATFORM=OS64"]
+    fingerprint = cmake.configureFingerprint(options, path, toolchain)
+    assert fingerprint == cmake.configureFingerprint(list(options), path, toolchain)
+
+    fingerprints = {fingerprint}
+    fingerprints.add(
+        cmake.configureFingerprint(["-GNinja", *options[1:]], path, toolchain)
+    )
+    fingerprints.add(
+        cmake.configureFingerprint([*options, "-DFOO=ON"], path, toolchain)
+    )
+
+    with open(toolchain, "w") as f:
+        f.write("new toolchain")
+    fingerprints.add(cmake.configureFingerprint(options, path, toolchain))
+
+    with open(os.path.join(path, "CMakeLists.txt"), "w") as f:
+        f.write("project(Example)")
+    fingerprints.add(cmake.configureFingerprint(options, path, toolchain))
+
+    createEmptyFile(path, "src", "CMakeLists.txt")
+    fingerprints.add(cmake.configureFingerprint(options, path, toolchain))
+
+    assert len(fingerprints) == 6
+
+    # Source files and build trees do not affect the fingerprint
+    createEmptyFile(path, "src", "library.c")
+    createEmptyFile(path, "build", "CMakeCache.txt")
+    createEmptyFile(path, "build", "CMakeFiles", "generated.cmake")
+    assert cmake.configureFingerprint(options, path, toolchain) in fingerprints
+
+
+@pytest.mark.parametrize("print_level", range(-1, 3))
+def testConfigureSkipped(tmp_path, capfd, print_level):
+    printer = Printer(print_level=print_level)
+    path = os.path.join(tmp_path, "project")
+    createEmptyFile(path, "CMakeLists.txt")
+    toolchain = createEmptyFile(tmp_path, "ios.toolchain.cmake")
+    platform_dir = os.path.join(tmp_path, "build", "OS64")
+    kwargs = {
+        "path": path,
+        "platform": "OS64",
+        "toolchain_path": toolchain,
+        "install_dir": os.path.join(tmp_path, "install"),
+        "platform_dir": platform_dir,
+        "cmake_command": "fake_cmake_command",
+        "printer": printer,
+    }
+
+    # No existing configuration so cmake is run
+    with pytest.raises(IOSBuildError, match="CMake not found"):
+        cmake.configure(**kwargs)
+
+    # Simulate a completed configuration
+    createEmptyFile(platform_dir, "CMakeCache.txt")
+    kwargs["cmake_command"] = "true"
+    cmake.configure(**kwargs)
+    fingerprint_file = os.path.join(platform_dir, cmake.FINGERPRINT_FILE)
+    assert os.path.isfile(fingerprint_file)
+    capfd.readouterr()
+
+    kwargs["cmake_command"] = "fake_cmake_command"
+    cmake.configure(**kwargs)
+    captured = capfd.readouterr()
+    if print_level >= 0:
+        assert "CMake configuration up to date" in captured.out
+
+    with pytest.raises(IOSBuildError, match="CMake not found"):
+        cmake.configure(clean=True, **kwargs)
+    # Failed configuration removes the fingerprint
+    assert not os.path.isfile(fingerprint_file)
+
+    kwargs["cmake_command"] = "true"
+    cmake.configure(**kwargs)
+    kwargs["cmake_command"] = "fake_cmake_command"
+    cmake.configure(**kwargs)
+
+    # Changed inputs
+    with pytest.raises(IOSBuildError, match="CMake not found"):
+        cmake.configure(cmake_options={"FOO": "ON"}, **kwargs)
+
+
+def testConfigOptions():
+    configs = ["Debug", "Release"]
+    assert cmake.configOptions(configs, "Xcode") == {
+        "CMAKE_CONFIGURATION_TYPES": "Debug;Release"
+    }
+    assert cmake.configOptions(["Debug"], "Ninja") == {"CMAKE_BUILD_TYPE": "Debug"}
+
+    with pytest.raises(IOSBuildError, match="one configuration per build directory"):
+        cmake.configOptions(configs, "Unix Makefiles")
@@ -0,0 +1,224 @@
+import os
+import socket
+import pytest
+import threading
+import socketserver
+
+from ios_build import distribute
+from ios_build.printer import Printer
+from ios_build.errors import IOSBuildError, CMakeError
+from .test_watch import TOOLS, createProject, readLog
+
+PLATFORMS = ["OS64", "SIMULATORARM64", "MAC_ARM64"]
+
+
+@pytest.fixture(autouse=True)
+def cache_home(tmp_path, monkeypatch):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+
+
+@pytest.fixture
+def startWorker(tmp_path):
+    servers = []
+
+    def start(jobs=1):
+        server = distribute.createWorker(
+            jobs=jobs,
+            work_dir=os.path.join(tmp_path, "worker{}".format(len(servers))),
+            cmake_command=os.path.join(TOOLS, "cmake"),
+            printer=Printer(print_level=-1),
+        )
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return "{0}:{1}".format(*server.server_address)
+
+    yield start
+
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+class FailingHandler(socketserver.StreamRequestHandler):
+    """
+    Worker which accepts builds and disconnects without building them.
+    """
+
+    def handle(self):
+        request = distribute.readMessage(self.rfile)
+        if request["command"] == "info":
+            distribute.sendMessage(self.wfile, {"event": "info", "jobs": 1})
+
+
+@pytest.fixture
+def failingWorker():
+    server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), FailingHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    yield "{0}:{1}".format(*server.server_address)
+
+    server.shutdown()
+    server.server_close()
+
+
+def unusedAddress() -> str:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return "{0}:{1}".format(*s.getsockname())
+
+
+def buildOptions(tmp_path, printer, **kwargs) -> dict:
+    path = os.path.join(tmp_path, "project")
+    if not os.path.isdir(path):
+        createProject(path)
+    toolchain = os.path.join(tmp_path, "ios.toolchain.cmake")
+    with open(toolchain, "w") as f:
+        f.write("# toolchain\n")
+
+    return {
+        "path": path,
+        "build_prefix": os.path.join(tmp_path, "build"),
+        "install_prefix": os.path.join(tmp_path, "install"),
+        "output_dir": os.path.join(tmp_path, "output"),
+        "toolchain": toolchain,
+        "platforms": PLATFORMS,
+        "generator": "Xcode",
+        "cmake_command": os.path.join(TOOLS, "cmake"),
+        "xcode_build_command": os.path.join(TOOLS, "xcodebuild"),
+        "printer": printer,
+        **kwargs,
+    }
+
+
+def snapshots(tmp_path, worker: int) -> list[str]:
+    work_dir = os.path.join(tmp_path, "worker{}".format(worker))
+    return [d for d in os.listdir(work_dir) if len(d) == 64]
+
+
+def testSnapshot(tmp_path):
+    path = os.path.join(tmp_path, "project")
+    createProject(path)
+    os.makedirs(os.path.join(path, "build"))
+    with open(os.path.join(path, "build", "ignored.txt"), "w") as f:
+        f.write("ignored\n")
+    toolchain = os.path.join(tmp_path, "ios.toolchain.cmake")
+    with open(toolchain, "w") as f:
+        f.write("# toolchain\n")
+
+    ignore = [os.path.join(path, "build")]
+    snapshot = distribute.createSnapshot(path, toolchain, ignore=ignore)
+    with snapshot.file:
+        extract_dir = os.path.join(tmp_path, "extract")
+        snapshot.file.seek(0)
+        distribute.extractArchive(snapshot.file, extract_dir)
+    assert sorted(os.listdir(extract_dir)) == ["ios.toolchain.cmake", "source"]
+    assert sorted(os.listdir(os.path.join(extract_dir, "source"))) == [
+        "CMakeLists.txt",
+        "alpha.c",
+        "beta",
+    ]
+
+    # The digest only depends on the contents
+    os.utime(os.path.join(path, "alpha.c"), (0, 0))
+    assert distribute.createSnapshot(path, toolchain, ignore=ignore).digest == (
+        snapshot.digest
+    )
+    with open(toolchain, "a") as f:
+        f.write("# changed\n")
+    assert distribute.createSnapshot(path, toolchain, ignore=ignore).digest != (
+        snapshot.digest
+    )
+
+
+@pytest.mark.parametrize("print_level", range(-1, 3))
+def testDistributedBuild(tmp_path, monkeypatch, capsys, startWorker, print_level):
+    log_file = os.path.join(tmp_path, "cmake.log")
+    monkeypatch.setenv("IOS_BUILD_FAKE_LOG", log_file)
+    monkeypatch.setenv("IOS_BUILD_FAKE_LATENCY_BUILD", "0.2")
+    workers = [startWorker(), startWorker()]
+
+    options = buildOptions(tmp_path, Printer(print_level=print_level))
+    distribute.distributedBuild(workers, **options)
+
+    frameworks = sorted(os.listdir(os.path.join(tmp_path, "output")))
+    assert frameworks == ["libalpha.xcframework", "libbeta.xcframework"]
+    for platform in PLATFORMS:
+        library = os.path.join(tmp_path, "install", platform, "lib", "libalpha.a")
+        with open(library) as f:
+            assert f.read().startswith("alpha\n{} Release".format(platform))
+
+    # Both workers build from their own copy of the snapshot
+    assert len(snapshots(tmp_path, 0)) == 1
+    assert len(snapshots(tmp_path, 1)) == 1
+    configures = [args for args in readLog(log_file) if "-S" in args]
+    assert len(configures) == 3
+    for args in configures:
+        assert args[args.index("-S") + 1].startswith(str(tmp_path / "worker"))
+
+    captured = capsys.readouterr()
+    if print_level >= 0:
+        assert "Created XC Framework" in captured.out
+        for platform in PLATFORMS:
+            assert platform in captured.out
+    else:
+        assert captured.out == ""
+
+
+def testSnapshotReuse(tmp_path, monkeypatch, startWorker):
+    log_file = os.path.join(tmp_path, "cmake.log")
+    monkeypatch.setenv("IOS_BUILD_FAKE_LOG", log_file)
+    workers = [startWorker(jobs=2)]
+    options = buildOptions(tmp_path, Printer(print_level=-1))
+
+    distribute.distributedBuild(workers, **options)
+    options["output_dir"] = os.path.join(tmp_path, "output2")
+    distribute.distributedBuild(workers, **options)
+
+    # The second build is incremental on the worker
+    assert len(snapshots(tmp_path, 0)) == 1
+    assert len([args for args in readLog(log_file) if "-S" in args]) == 3
+
+    with open(os.path.join(options["path"], "alpha.c"), "a") as f:
+        f.write("int gamma() { return 3; }\n")
+    options["output_dir"] = os.path.join(tmp_path, "output3")
+    distribute.distributedBuild(workers, **options)
+    assert len(snapshots(tmp_path, 0)) == 2
+
+
+@pytest.mark.parametrize("print_level", range(-1, 3))
+def testWorkerFailure(tmp_path, capsys, startWorker, failingWorker, print_level):
+    workers = [unusedAddress(), failingWorker, startWorker()]
+    options = buildOptions(tmp_path, Printer(print_level=print_level))
+
+    # Platforms sent to the failed worker are built by the remaining worker
+    distribute.distributedBuild(workers, **options)
+
+    frameworks = sorted(os.listdir(os.path.join(tmp_path, "output")))
+    assert frameworks == ["libalpha.xcframework", "libbeta.xcframework"]
+    for platform in PLATFORMS:
+        assert os.path.isdir(os.path.join(tmp_path, "install", platform))
+
+    captured = capsys.readouterr()
+    if print_level >= 0:
+        assert "Worker unavailable" in captured.out
+        assert "Platform reassigned" in captured.out
+
+
+def testNoWorkers(tmp_path, failingWorker):
+    options = buildOptions(tmp_path, Printer(print_level=-1))
+    with pytest.raises(IOSBuildError, match="No workers available to build OS64"):
+        distribute.distributedBuild([failingWorker], **options)
+
+
+def testRemoteError(tmp_path, monkeypatch, startWorker):
+    fail_file = os.path.join(tmp_path, "fail")
+    with open(fail_file, "w") as f:
+        f.write("fail\n")
+    monkeypatch.setenv("IOS_BUILD_FAKE_FAIL", fail_file)
+    workers = [startWorker(jobs=3)]
+    options = buildOptions(tmp_path, Printer(print_level=-1))
+
+    # Build errors are not reassigned
+    with pytest.raises(CMakeError):
+        distribute.distributedBuild(workers, **options)
+    assert not os.path.isdir(os.path.join(tmp_path, "output"))
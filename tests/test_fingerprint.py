@@ -0,0 +1,139 @@
+import os
+import time
+import pytest
+
+from ios_build import fingerprint
+from .test_cache import writeFile
+
+
+def testScanTree(tmp_path):
+    assert fingerprint.scanTree(tmp_path) == {}
+
+    writeFile("project()", tmp_path, "CMakeLists.txt")
+    writeFile("int x;", tmp_path, "src", "library.c")
+    writeFile("", tmp_path, ".git", "HEAD")
+    writeFile("", tmp_path, "build", "CMakeCache.txt")
+    writeFile("", tmp_path, "lib.xcframework", "Info.plist")
+
+    files = fingerprint.scanTree(tmp_path)
+    assert sorted(files) == [
+        "CMakeLists.txt",
+        os.path.join("build", "CMakeCache.txt"),
+        os.path.join("lib.xcframework", "Info.plist"),
+        os.path.join("src", "library.c"),
+    ]
+
+    stat = os.stat(os.path.join(tmp_path, "CMakeLists.txt"))
+    assert files["CMakeLists.txt"] == (stat.st_size, stat.st_mtime_ns, stat.st_ino)
+
+    files = fingerprint.scanTree(
+        tmp_path,
+        ignore=[os.path.join(tmp_path, "build")],
+        patterns=[".*", "*.xcframework"],
+    )
+    assert sorted(files) == ["CMakeLists.txt", os.path.join("src", "library.c")]
+
+
+def testFingerprint(tmp_path, monkeypatch):
+    path = os.path.join(tmp_path, "project")
+    index_file = os.path.join(tmp_path, "index.json")
+    os.makedirs(path)
+
+    empty = fingerprint.fingerprint(path, index_file=index_file)
+    assert empty.changed == []
+    assert empty.files == 0
+
+    writeFile("project()", path, "CMakeLists.txt")
+    writeFile("int x;", path, "src", "library.c")
+    result = fingerprint.fingerprint(path, index_file=index_file)
+    assert result.digest != empty.digest
+    assert result.changed == ["CMakeLists.txt", os.path.join("src", "library.c")]
+    assert result.files == 2
+
+    # Unchanged files are not rehashed
+    monkeypatch.setattr(fingerprint, "RACY_INTERVAL_NS", -(10**12))
+    hashed = []
+
+    def fileDigest(file_path):
+        hashed.append(os.path.relpath(file_path, path))
+        return original(file_path)
+
+    original = fingerprint.fileDigest
+    monkeypatch.setattr(fingerprint, "fileDigest", fileDigest)
+
+    assert fingerprint.fingerprint(path, index_file=index_file) == (
+        result.digest,
+        [],
+        2,
+    )
+    assert hashed == []
+
+    writeFile("int y;", path, "src", "library.c")
+    modified = fingerprint.fingerprint(path, index_file=index_file)
+    assert modified.digest != result.digest
+    assert modified.changed == [os.path.join("src", "library.c")]
+    assert hashed == [os.path.join("src", "library.c")]
+
+    # Touched but identical files are rehashed but not changed
+    hashed.clear()
+    os.utime(os.path.join(path, "CMakeLists.txt"))
+    assert fingerprint.fingerprint(path, index_file=index_file).changed == []
+    assert hashed == ["CMakeLists.txt"]
+
+    os.remove(os.path.join(path, "CMakeLists.txt"))
+    removed = fingerprint.fingerprint(path, index_file=index_file)
+    assert removed.changed == ["CMakeLists.txt"]
+    assert removed.files == 1
+
+    # Same contents give the same digest without an index
+    writeFile("project()", path, "CMakeLists.txt")
+    writeFile("int x;", path, "src", "library.c")
+    other_index = os.path.join(tmp_path, "other.json")
+    assert fingerprint.fingerprint(path, index_file=other_index).digest == (
+        result.digest
+    )
+
+
+def testRacyFiles(tmp_path):
+    index_file = os.path.join(tmp_path, "index.json")
+    filepath = writeFile("aaaa", tmp_path, "project", "file.c")
+    path = os.path.dirname(filepath)
+    first = fingerprint.fingerprint(path, index_file=index_file)
+
+    # Modify without changing size or mtime
+    stat = os.stat(filepath)
+    writeFile("bbbb", filepath)
+    os.utime(filepath, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+
+    second = fingerprint.fingerprint(path, index_file=index_file)
+    assert second.changed == ["file.c"]
+    assert second.digest != first.digest
+
+
+def testIndex(tmp_path, monkeypatch):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+    index_file = fingerprint.indexPath("project")
+    assert index_file.startswith(os.path.join(tmp_path, "ios_build", "fingerprints"))
+    assert index_file == fingerprint.indexPath(os.path.abspath("project"))
+    assert fingerprint.indexPath("project", "index.json") == "index.json"
+
+    assert fingerprint.loadIndex(index_file) == {"written": 0, "files": {}}
+    writeFile("invalid", index_file)
+    assert fingerprint.loadIndex(index_file) == {"written": 0, "files": {}}
+
+    index = {"written": time.time_ns(), "files": {"a.c": [1, 2, 3, "00"]}}
+    fingerprint.saveIndex(index_file, index)
+    assert fingerprint.loadIndex(index_file) == index
+
+
+@pytest.mark.parametrize("jobs", [1, 4])
+def testFingerprintJobs(tmp_path, jobs):
+    path = os.path.join(tmp_path, "project")
+    for i in range(50):
+        writeFile(str(i), path, "dir{}".format(i % 5), "file{}.c".format(i))
+
+    result = fingerprint.fingerprint(
+        path, index_file=os.path.join(tmp_path, "index.json"), jobs=jobs
+    )
+    assert result.files == 50
+    assert len(result.changed) == 50
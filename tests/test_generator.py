@@ -0,0 +1,201 @@
+import os
+import sys
+import json
+import pytest
+
+from ios_build import build
+from ios_build import generator
+from ios_build.printer import Printer
+from ios_build.errors import IOSBuildError
+from .test_trace import buildOptions
+from .test_watch import TOOLS, readLog
+
+CMAKE = os.path.join(TOOLS, "cmake")
+XCODEBUILD = os.path.join(TOOLS, "xcodebuild")
+
+HELP = """Usage
+
+  cmake [options] <path-to-source>
+
+Options
+  -G <generator-name>          = Specify a build system generator.
+
+Generators
+
+The following generators are available on this platform (* marks default):
+  Green Hills MULTI            = Generates Green Hills MULTI files
+                                 (experimental, work-in-progress).
+* Unix Makefiles               = Generates standard UNIX makefiles.
+  Ninja                        = Generates build.ninja files.
+  Eclipse CDT4 - Unix Makefiles= Generates Eclipse CDT 4.0 project files.
+  Sublime Text 2 - Unix Makefiles
+                               = Generates Sublime Text 2 project files.
+"""
+
+
+@pytest.fixture(autouse=True)
+def generators_home(tmp_path, monkeypatch):
+    """
+    Start each test without recorded generators or times.
+    """
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+
+
+def createTools(path, *tools):
+    """
+    Create a directory containing stand-ins for `tools` to be used as `PATH`.
+    """
+    os.makedirs(path)
+    os.symlink(sys.executable, os.path.join(path, "python3"))
+    for tool in tools:
+        tool_file = os.path.join(path, tool)
+        with open(tool_file, "w") as f:
+            f.write("#!/bin/sh\n")
+        os.chmod(tool_file, 0o755)
+
+    return str(path)
+
+
+def testParseGenerators():
+    assert generator.parseGenerators(HELP) == [
+        "Green Hills MULTI",
+        "Unix Makefiles",
+        "Ninja",
+        "Eclipse CDT4 - Unix Makefiles",
+        "Sublime Text 2 - Unix Makefiles",
+    ]
+    assert generator.parseGenerators("Usage\n") == []
+
+
+def testCMakeGenerators(tmp_path, monkeypatch):
+    log_file = os.path.join(tmp_path, "log.jsonl")
+    monkeypatch.setenv("IOS_BUILD_FAKE_LOG", log_file)
+
+    generators = generator.cmakeGenerators(cmake_command=CMAKE)
+    assert generators == [
+        "Unix Makefiles",
+        "Ninja",
+        "Ninja Multi-Config",
+        "Xcode",
+        "Sublime Text 2 - Unix Makefiles",
+    ]
+
+    # The result is cached
+    assert generator.cmakeGenerators(cmake_command=CMAKE) == generators
+    assert readLog(log_file) == [["cmake", "--help"]]
+    with open(generator.generatorsFile()) as f:
+        cached = json.load(f)["cmake"]
+    assert [entry["generators"] for entry in cached.values()] == [generators]
+
+    with pytest.raises(IOSBuildError, match="CMake not found"):
+        generator.cmakeGenerators(cmake_command="missing_cmake")
+
+
+def testAvailableGenerators(tmp_path, monkeypatch):
+    monkeypatch.setenv("PATH", createTools(tmp_path / "bin", "ninja"))
+
+    available = generator.availableGenerators(
+        cmake_command=CMAKE, xcode_build_command=XCODEBUILD
+    )
+    assert available == ["Ninja", "Ninja Multi-Config", "Xcode"]
+
+    available = generator.availableGenerators(
+        cmake_command=CMAKE, xcode_build_command="missing"
+    )
+    assert available == ["Ninja", "Ninja Multi-Config"]
+
+
+def testSelectGenerator():
+    available = ["Unix Makefiles", "Ninja", "Xcode"]
+    platforms = ["OS64", "SIMULATORARM64"]
+
+    def record(configure, build):
+        return {"configure": configure, "build": build, "runs": 1}
+
+    # Each generator is timed once in order of preference
+    assert generator.selectGenerator(available, platforms) == "Ninja"
+    times = {"Xcode": {p: record(1, 1) for p in platforms}}
+    assert generator.selectGenerator(available, platforms, times) == "Ninja"
+    times["Ninja"] = {"OS64": record(2, 2)}
+    assert generator.selectGenerator(available, platforms, times) == "Ninja"
+    times["Ninja"]["SIMULATORARM64"] = record(2, 2)
+    assert generator.selectGenerator(available, platforms, times) == "Unix Makefiles"
+
+    # The fastest timed generator is selected
+    times["Unix Makefiles"] = {p: record(3, 3) for p in platforms}
+    assert generator.selectGenerator(available, platforms, times) == "Xcode"
+    times["Ninja"]["OS64"] = record(0.1, 0.2)
+    times["Ninja"]["SIMULATORARM64"] = record(0.1, 0.2)
+    assert generator.selectGenerator(available, platforms, times) == "Ninja"
+
+    assert generator.selectGenerator(["Xcode"], platforms, times) == "Xcode"
+    with pytest.raises(IOSBuildError, match="No CMake generator available"):
+        generator.selectGenerator([], platforms)
+
+
+def testRecordTimes():
+    generator.recordTimes("Ninja", "OS64", {"configure": 1, "build": 4})
+    generator.recordTimes("Ninja", "OS64", {"configure": 3, "build": 2})
+
+    times = generator.loadGenerators()["times"]
+    assert times == {"Ninja": {"OS64": {"configure": 2, "build": 3, "runs": 2}}}
+
+    # Times of a previous version are discarded
+    with open(generator.generatorsFile()) as f:
+        data = json.load(f)
+    with open(generator.generatorsFile(), "w") as f:
+        json.dump({**data, "version": generator.TIMES_VERSION - 1}, f)
+    assert generator.loadGenerators()["times"] == {}
+
+
+@pytest.mark.parametrize("print_level", range(-1, 3))
+def testResolveGenerator(tmp_path, monkeypatch, capsys, print_level):
+    monkeypatch.setenv("PATH", createTools(tmp_path / "bin", "make"))
+    printer = Printer(print_level=print_level)
+    options = {
+        "platforms": ["OS64"],
+        "cmake_command": CMAKE,
+        "xcode_build_command": XCODEBUILD,
+        "printer": printer,
+    }
+
+    assert generator.resolveGenerator("Ninja", **options) == "Ninja"
+    assert capsys.readouterr().out == ""
+
+    assert generator.resolveGenerator("auto", **options) == "Unix Makefiles"
+    captured = capsys.readouterr()
+    if print_level >= 0:
+        assert "Unix Makefiles (auto)" in captured.out
+    else:
+        assert captured.out == ""
+
+
+def testBuildAutoGenerator(tmp_path, monkeypatch):
+    log_file = os.path.join(tmp_path, "log.jsonl")
+    monkeypatch.setenv("IOS_BUILD_FAKE_LOG", log_file)
+    monkeypatch.setenv("PATH", createTools(tmp_path / "bin", "ninja"))
+    options = buildOptions(tmp_path, generator="auto", trace_file=None)
+
+    build.iosBuild(printer=Printer(print_level=-1), **options)
+    configure = [call for call in readLog(log_file) if "-S" in call]
+    assert len(configure) == 2
+    assert all("-GNinja" in call for call in configure)
+
+    # Times of complete builds are recorded for each platform
+    times = generator.loadGenerators()["times"]
+    assert set(times) == {"Ninja"}
+    assert set(times["Ninja"]) == set(options["platforms"])
+
+    # The next untimed generator is selected, then the fastest
+    assert generator.resolveGenerator(**options) == "Ninja Multi-Config"
+    for name in ["Ninja Multi-Config", "Xcode"]:
+        times[name] = {
+            platform: {
+                "configure": 0,
+                "build": 100 if "Ninja" in name else 0,
+                "runs": 1,
+            }
+            for platform in options["platforms"]
+        }
+    generator.saveGenerators({**generator.loadGenerators(), "times": times})
+    assert generator.resolveGenerator(**options) == "Xcode"
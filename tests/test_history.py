@@ -0,0 +1,172 @@
+import os
+import time
+import pytest
+import sqlite3
+import contextlib
+
+from ios_build import build, history
+from ios_build.printer import Printer
+from ios_build.errors import IOSBuildError
+from .test_trace import buildOptions
+
+
+@pytest.fixture(autouse=True)
+def cache_home(tmp_path, monkeypatch):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+
+
+def query(sql: str, *parameters) -> list:
+    with contextlib.closing(history.connect()) as db:
+        return db.execute(sql, parameters).fetchall()
+
+
+def testRecordRun(tmp_path):
+    path = str(tmp_path)
+    with history.recordRun(path=path, platforms=["OS64"]) as recorder:
+        recorder.step("build", 2.0, platform="OS64", config="Release")
+        recorder.bind("Debug").artifact("library", "libalpha", 100, platform="OS64")
+        recorder.cacheResult(True)
+        recorder.cacheResult(False)
+
+    runs = query(
+        "SELECT project, platforms, status, cache_hits, cache_misses FROM runs"
+    )
+    assert runs == [(os.path.realpath(path), '["OS64"]', 0, 1, 1)]
+    assert query("SELECT step, platform, config, duration FROM steps") == [
+        ("build", "OS64", "Release", 2.0)
+    ]
+    assert query("SELECT kind, library, platform, config, size FROM artifacts") == [
+        ("library", "libalpha", "OS64", "Debug", 100)
+    ]
+
+    # Failed runs are recorded with the exit status of the error
+    with pytest.raises(IOSBuildError):
+        with history.recordRun(path=path):
+            raise IOSBuildError("Invalid project")
+    assert query("SELECT status, message FROM runs WHERE id = 2") == [
+        (1, "Error: Invalid project")
+    ]
+
+    with history.recordRun(path=path, history=False) as recorder:
+        recorder.step("build", 1.0)
+    assert query("SELECT COUNT(*) FROM runs") == [(2,)]
+
+    # Identical options have the same digest
+    options = query("SELECT options FROM runs")
+    assert options[0] != options[1]
+    assert history.optionsDigest(path=path, printer=Printer()) == (
+        history.optionsDigest(path=path)
+    )
+
+
+def testRecordRunFailure(tmp_path, monkeypatch, capsys):
+    cache_file = os.path.join(tmp_path, "file")
+    with open(cache_file, "w") as f:
+        f.write("not a directory\n")
+    monkeypatch.setenv("XDG_CACHE_HOME", cache_file)
+
+    # The build does not fail if the history cannot be saved
+    with history.recordRun(path=str(tmp_path), printer=Printer(print_level=1)):
+        pass
+    assert "Build history not saved" in capsys.readouterr().out
+
+
+@pytest.mark.parametrize("print_level", range(-1, 3))
+def testBuildHistory(tmp_path, print_level):
+    options = buildOptions(tmp_path, configs=["Debug", "Release"], jobs=2)
+    build.iosBuild(printer=Printer(print_level=print_level), **options)
+
+    assert query("SELECT status, platforms FROM runs") == [
+        (0, '["OS64", "SIMULATORARM64"]')
+    ]
+    steps = query("SELECT step, platform, config FROM steps ORDER BY rowid")
+    for platform in options["platforms"]:
+        assert ("configure", platform, None) in steps
+        assert ("total", platform, None) in steps
+        for config in options["configs"]:
+            assert ("build", platform, config) in steps
+            assert ("install", platform, config) in steps
+    assert ("frameworks", None, "Debug") in steps
+
+    artifacts = query("SELECT kind, library, platform, config, size FROM artifacts")
+    libraries = [a for a in artifacts if a[0] == "library"]
+    frameworks = [a for a in artifacts if a[0] == "xcframework"]
+    assert len(libraries) == 8
+    assert sorted(a[1:4] for a in frameworks) == [
+        ("libalpha", None, "Debug"),
+        ("libalpha", None, "Release"),
+        ("libbeta", None, "Debug"),
+        ("libbeta", None, "Release"),
+    ]
+    assert all(a[4] > 0 for a in artifacts)
+
+    build.iosBuild(history=False, **{**options, "output_dir": str(tmp_path / "o")})
+    assert query("SELECT COUNT(*) FROM runs") == [(1,)]
+
+
+def testPercentile():
+    assert history.percentile([1.0], 0.95) == 1.0
+    assert history.percentile([4.0, 1.0, 3.0, 2.0], 0.5) == 2.5
+    assert history.percentile(list(range(101)), 0.95) == 95
+
+
+def seedHistory(path: str):
+    for i, size in enumerate([1000, 1500, 3000]):
+        with history.recordRun(path=path) as recorder:
+            recorder.step("build", 10.0 + i, platform="OS64")
+            recorder.step("total", 12.0 + i, platform="OS64")
+            recorder.step("total", 30.0, platform="MAC_UNIVERSAL")
+            recorder.artifact("xcframework", "libalpha", size)
+            recorder.artifact("xcframework", "libbeta", 500)
+            recorder.cacheResult(i > 0)
+
+    with pytest.raises(IOSBuildError):
+        with history.recordRun(path=path):
+            raise IOSBuildError("Failed")
+
+
+def testQueryStats(tmp_path):
+    assert history.queryStats()["runs"] == 0
+
+    path = str(tmp_path)
+    seedHistory(path)
+    stats = history.queryStats(project=path)
+
+    assert stats["runs"] == 4
+    assert stats["failures"] == 1
+    assert (stats["hits"], stats["misses"]) == (2, 1)
+    assert stats["steps"]["build"] == (11.0, pytest.approx(11.9))
+    assert [row[0] for row in stats["platforms"]] == ["MAC_UNIVERSAL", "OS64"]
+    assert stats["platforms"][1] == ("OS64", 13.0, 3)
+    assert stats["libraries"] == [("libalpha", 1000, 3000), ("libbeta", 500, 500)]
+
+    assert history.queryStats(project=str(tmp_path / "other"))["runs"] == 0
+    assert len(history.queryStats(limit=1)["platforms"]) == 1
+
+    # Old runs are excluded
+    with contextlib.closing(history.connect()) as db, db:
+        db.execute("UPDATE runs SET started = ?", (time.time() - 40 * 86400,))
+    assert history.queryStats(days=30)["runs"] == 0
+
+
+@pytest.mark.parametrize("print_level", range(-1, 3))
+def testRunStats(tmp_path, capsys, print_level):
+    seedHistory(str(tmp_path))
+    history.runStats(print_level=print_level, project=str(tmp_path))
+
+    captured = capsys.readouterr()
+    if print_level >= 0:
+        assert "4 (1 failed)" in captured.out
+        assert "2 hits, 1 misses" in captured.out
+        assert "MAC_UNIVERSAL" in captured.out
+        assert "1000 B -> 2.9 KB (+200.0%)" in captured.out
+    else:
+        assert captured.out == ""
+
+
+def testSchema(tmp_path):
+    database = str(tmp_path / "history.db")
+    history.connect(database).close()
+    with contextlib.closing(sqlite3.connect(database)) as db:
+        version = db.execute("PRAGMA user_version").fetchone()[0]
+    assert version == history.SCHEMA_VERSION
@@ -1,6 +1,13 @@
+import os
+import sys
+import gzip
+import time
 import pytest
+import asyncio
+import concurrent.futures
 
 from ios_build import interface
+from ios_build.printer import Printer
 from ios_build.errors import CMakeError, XCodeBuildError
 
 
@@ -14,3 +21,232 @@ def testCMake():
 def testXCodeBuild():
     with pytest.raises(XCodeBuildError, match="returned non-zero exit status 66."):
         interface.xcodebuild()
+
+
+def testBufferedError(tmp_path, capfd):
+    printer = Printer(print_level=2)
+    buffered = printer.buffered()
+
+    with pytest.raises(CMakeError):
+        interface.cmake("--build", str(tmp_path), cmake_command=CMAKE, printer=buffered)
+
+    # The error is printed with the rest of the job output
+    captured = capfd.readouterr()
+    assert captured.err == ""
+
+    printer.printBuffer(buffered)
+    captured = capfd.readouterr()
+    assert "--build" in captured.out
+    assert captured.err == "Error: could not load cache\n"
+
+
+CMAKE = os.path.join(os.path.dirname(__file__), "tools", "cmake")
+
+
+@pytest.mark.parametrize("print_level", range(-1, 3))
+def testCallSubProcess(capfd, print_level):
+    printer = Printer(print_level=print_level)
+    command = [
+        sys.executable,
+        "-c",
+        "import sys; print('out'); print('err', file=sys.stderr)",
+    ]
+
+    result = interface.callSubProcess(command, printer)
+    assert result.command == command
+    assert result.returncode == 0
+    assert result.stdout == b"out\n"
+    assert result.stderr == b"err\n"
+    assert result.duration > 0
+
+    captured = capfd.readouterr()
+    assert captured.out == ("out\n" if print_level > 0 else "")
+    assert captured.err == ("err\n" if print_level > 1 else "")
+
+    # The error output of a failed process is always printed
+    command[-1] += "; sys.exit(3)"
+    with pytest.raises(RuntimeError, match="returned non-zero exit status 3."):
+        interface.callSubProcess(command, printer)
+    assert capfd.readouterr().err.endswith("err\n")
+
+
+def testStreaming():
+    printer = Printer(print_level=1)
+    lines = []
+    printer.printOutput = lines.append
+    command = [
+        sys.executable,
+        "-c",
+        "import time\nfor i in range(3):\n print(i, flush=True); time.sleep(0.1)",
+    ]
+
+    async def run():
+        task = asyncio.create_task(interface.runProcess(command, printer))
+        # Each line is received while the process runs
+        while not lines:
+            await asyncio.sleep(0.01)
+        assert not task.done()
+        return await task
+
+    result = asyncio.run(run())
+    assert lines == [b"0\n", b"1\n", b"2\n"]
+    assert result.stdout == b"0\n1\n2\n"
+
+
+def testCancel(tmp_path):
+    pid_file = os.path.join(tmp_path, "pid")
+    command = [
+        sys.executable,
+        "-c",
+        "import os, time\n"
+        "open({!r}, 'w').write(str(os.getpid()))\n"
+        "time.sleep(60)".format(pid_file),
+    ]
+
+    async def run():
+        task = asyncio.create_task(interface.runProcess(command, Printer()))
+        while not os.path.isfile(pid_file) or not os.path.getsize(pid_file):
+            await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    start = time.perf_counter()
+    asyncio.run(run())
+    assert time.perf_counter() - start < 30
+
+    # The process is killed
+    with open(pid_file) as f:
+        pid = int(f.read())
+    with pytest.raises(ProcessLookupError):
+        os.kill(pid, 0)
+
+
+def testLongLine():
+    # Lines longer than the stream limit are read in chunks
+    size = 2 * interface.LINE_LIMIT
+    command = [sys.executable, "-c", "print('x' * {0}); print('y')".format(size)]
+    result = asyncio.run(interface.runProcess(command, Printer()))
+    assert result.returncode == 0
+    assert result.stdout == b"x" * size + b"\ny\n"
+
+
+def testProcessError(monkeypatch):
+    processes = []
+    create_subprocess_exec = asyncio.create_subprocess_exec
+
+    async def createProcess(*args, **kwargs):
+        processes.append(await create_subprocess_exec(*args, **kwargs))
+        return processes[-1]
+
+    monkeypatch.setattr(asyncio, "create_subprocess_exec", createProcess)
+    printer = Printer(print_level=1)
+
+    def printOutput(value):
+        raise ValueError("Invalid output")
+
+    printer.printOutput = printOutput
+    command = [
+        sys.executable,
+        "-c",
+        "import time\nprint(0, flush=True)\ntime.sleep(60)",
+    ]
+
+    # The process is killed if reading its output fails
+    start = time.perf_counter()
+    with pytest.raises(ValueError, match="Invalid output"):
+        asyncio.run(interface.runProcess(command, printer))
+    assert time.perf_counter() - start < 30
+    assert processes[0].returncode is not None
+
+
+@pytest.mark.parametrize("print_level", range(-1, 3))
+def testAsync(tmp_path, monkeypatch, print_level):
+    monkeypatch.setenv("IOS_BUILD_FAKE_LATENCY", "0.2")
+    monkeypatch.setattr(interface, "MAX_PROCESSES", 2)
+    printer = Printer(print_level=print_level)
+
+    async def run():
+        return await asyncio.gather(
+            *[
+                interface.cmakeAsync("--version", cmake_command=CMAKE, printer=printer)
+                for _ in range(4)
+            ]
+        )
+
+    # At most two processes run concurrently
+    start = time.perf_counter()
+    results = asyncio.run(run())
+    assert time.perf_counter() - start >= 0.4
+    assert all(result.returncode == 0 for result in results)
+    assert all(result.duration >= 0.2 for result in results)
+
+    with pytest.raises(CMakeError, match="returned non-zero exit status 1."):
+        asyncio.run(
+            interface.cmakeAsync(
+                "--build", str(tmp_path), cmake_command=CMAKE, printer=printer
+            )
+        )
+    with pytest.raises(interface.IOSBuildError, match="CMake not found"):
+        asyncio.run(interface.cmakeAsync(cmake_command="missing", printer=printer))
+    with pytest.raises(interface.IOSBuildError, match="XCodeBuild not found"):
+        asyncio.run(
+            interface.xcodebuildAsync(xcode_build_command="missing", printer=printer)
+        )
+
+
+def testThreadLimit(monkeypatch):
+    monkeypatch.setenv("IOS_BUILD_FAKE_LATENCY", "0.2")
+    monkeypatch.setattr(interface, "MAX_PROCESSES", 2)
+    monkeypatch.setattr(interface, "THREAD_SEMAPHORE", None)
+    printer = Printer(print_level=-1)
+
+    def run():
+        return interface.cmake("--version", cmake_command=CMAKE, printer=printer)
+
+    # At most two processes run concurrently across threads
+    start = time.perf_counter()
+    with concurrent.futures.ThreadPoolExecutor(max_workers=4) as executor:
+        results = list(executor.map(lambda _: run(), range(4)))
+    assert time.perf_counter() - start >= 0.4
+    assert all(result.returncode == 0 for result in results)
+
+
+@pytest.mark.parametrize("print_level", range(-1, 3))
+@pytest.mark.parametrize("compress_logs", [False, True])
+def testLogFile(tmp_path, capfd, print_level, compress_logs):
+    printer = Printer(print_level=print_level)
+    log_file = interface.logPath(
+        os.path.join("OS64", "build"), log_dir=tmp_path, compress_logs=compress_logs
+    )
+    assert log_file.endswith(".log.gz" if compress_logs else ".log")
+    assert interface.logPath("build") is None
+
+    command = [
+        sys.executable,
+        "-c",
+        "import sys\n"
+        "for i in range(1000): print(i)\n"
+        "print('failed', file=sys.stderr)\n"
+        "sys.exit(2)",
+    ]
+    with pytest.raises(RuntimeError, match="returned non-zero exit status 2."):
+        interface.callSubProcess(command, printer, log_file=log_file, log_lines=10)
+
+    # The full output is logged
+    with gzip.open(log_file) if compress_logs else open(log_file, "rb") as f:
+        lines = f.read().decode().splitlines()
+    assert lines[:1000] == [str(i) for i in range(1000)]
+    assert lines[1000:] == ["failed"]
+
+    captured = capfd.readouterr()
+    assert "failed" in captured.err
+    if print_level >= 0:
+        assert "Log file" in captured.out
+        assert log_file in captured.out
+
+    # Only the last lines are kept in memory
+    printer = Printer(print_level=-1)
+    command = [sys.executable, "-c", "for i in range(1000): print(i)"]
+    result = interface.callSubProcess(command, printer, log_lines=10)
+    assert result.stdout.decode().split() == [str(i) for i in range(990, 1000)]
@@ -0,0 +1,127 @@
+import os
+import sys
+import json
+import time
+import pytest
+import subprocess
+
+from ios_build import build
+from ios_build import jobserver
+from ios_build.trace import Tracer
+from ios_build.printer import Printer
+from .test_trace import buildOptions
+
+
+def testJobServer():
+    server = jobserver.JobServer(3)
+    assert server.available() == 3
+    assert server.inUse() == 0
+
+    with server.token():
+        assert server.inUse() == 1
+        with server.token():
+            assert server.inUse() == 2
+    assert server.inUse() == 0
+
+    # Clients take tokens from the named pipe
+    env = server.env()
+    assert env["MAKEFLAGS"] == "-j3 --jobserver-auth=fifo:{}".format(server.path)
+    client = (
+        "import os, re\n"
+        "path = re.search('fifo:(.*)', os.environ['MAKEFLAGS']).group(1)\n"
+        "fd = os.open(path, os.O_RDWR)\n"
+        "print(os.read(fd, 2).decode())"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", client],
+        env={**os.environ, **env},
+        capture_output=True,
+        check=True,
+    )
+    assert result.stdout == b"++\n"
+    assert server.available() == 1
+
+    server.close()
+    assert not os.path.exists(server.path)
+
+
+def testClientEnv():
+    with jobserver.clientEnv() as env:
+        assert env is None
+
+    server = jobserver.JobServer(1)
+    with jobserver.clientEnv(server) as env:
+        assert "MAKEFLAGS" in env
+        assert server.available() == 0
+    assert server.available() == 1
+    server.close()
+
+
+@pytest.mark.parametrize("print_level", range(-1, 3))
+def testJobServerReport(capsys, print_level):
+    printer = Printer(print_level=print_level)
+    with jobserver.jobServer(printer=printer) as server:
+        assert server is None
+    assert capsys.readouterr().out == ""
+
+    tracer = Tracer()
+    with jobserver.jobServer(2, printer=printer, tracer=tracer) as server:
+        server.sample_interval = 0.01
+        with server.token():
+            time.sleep(0.2)
+
+    assert server.peak == 1
+    assert 0 < server.utilization() <= 0.5
+    counters = [e for e in tracer.trace()["traceEvents"] if e["ph"] == "C"]
+    assert counters
+    assert all(e["args"]["processes"] <= 1 for e in counters)
+
+    captured = capsys.readouterr()
+    if print_level >= 0:
+        assert "peak 1/2 processes" in captured.out
+    else:
+        assert captured.out == ""
+
+
+def maxConcurrency(intervals: list[tuple[float, float]]) -> int:
+    events = sorted(
+        [(start, 1) for start, _ in intervals] + [(end, -1) for _, end in intervals]
+    )
+    current = peak = 0
+    for _, change in events:
+        current += change
+        peak = max(peak, current)
+
+    return peak
+
+
+def testBuildJobServer(tmp_path, monkeypatch):
+    times_file = os.path.join(tmp_path, "times.jsonl")
+    monkeypatch.setenv("IOS_BUILD_FAKE_TIMES", times_file)
+    monkeypatch.setenv("IOS_BUILD_FAKE_LATENCY_BUILD", "0.3")
+    options = buildOptions(
+        tmp_path,
+        platforms=["OS64", "SIMULATORARM64", "MAC_ARM64"],
+        jobs=3,
+        max_procs=2,
+        trace_file=None,
+    )
+    build.iosBuild(printer=Printer(print_level=-1), **options)
+
+    with open(times_file) as f:
+        builds = [r for r in map(json.loads, f) if r["step"] == "build"]
+    assert len(builds) == 3
+    assert all("--jobserver-auth=fifo:" in r["makeflags"] for r in builds)
+
+    # Builds and the additional jobs of each build share two tokens
+    intervals = [(r["start"], r["end"]) for r in builds]
+    intervals += [tuple(r["token"]) for r in builds if "token" in r]
+    assert maxConcurrency(intervals) <= 2
+
+    # Without a jobserver no flags are passed
+    os.remove(times_file)
+    options = {**options, "output_dir": os.path.join(tmp_path, "output2")}
+    build.iosBuild(printer=Printer(print_level=-1), **{**options, "max_procs": None})
+    with open(times_file) as f:
+        builds = [r for r in map(json.loads, f) if r["step"] == "build"]
+    assert all(r["makeflags"] is None for r in builds)
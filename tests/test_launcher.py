@@ -0,0 +1,137 @@
+import os
+import json
+import pytest
+
+from ios_build import build
+from ios_build import launcher
+from ios_build.printer import Printer
+from ios_build.errors import IOSBuildError
+from .test_trace import buildOptions
+from .test_watch import TOOLS
+
+
+@pytest.fixture(autouse=True)
+def compiler_cache_home(tmp_path, monkeypatch):
+    """
+    Start each test with an empty compiler cache.
+    """
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+
+
+def installTools(tmp_path, monkeypatch, *tools):
+    """
+    Add stand-ins for `tools` to the `PATH`.
+    """
+    bin_dir = tmp_path / "bin"
+    os.makedirs(bin_dir)
+    for tool in tools:
+        os.symlink(os.path.join(TOOLS, tool), bin_dir / tool)
+    monkeypatch.setenv(
+        "PATH", "{0}{1}{2}".format(bin_dir, os.pathsep, os.environ["PATH"])
+    )
+
+    return bin_dir
+
+
+def testFindCompilerCache(tmp_path, monkeypatch):
+    bin_dir = installTools(tmp_path, monkeypatch, "sccache")
+
+    assert launcher.findCompilerCache() == ("sccache", str(bin_dir / "sccache"))
+    with pytest.raises(IOSBuildError, match="Compiler cache not found: ccache"):
+        launcher.findCompilerCache("ccache")
+
+    os.symlink(os.path.join(TOOLS, "ccache"), bin_dir / "ccache")
+    assert launcher.findCompilerCache() == ("ccache", str(bin_dir / "ccache"))
+    assert launcher.findCompilerCache("sccache")[0] == "sccache"
+
+
+def testLauncherOptions(tmp_path, monkeypatch):
+    bin_dir = installTools(tmp_path, monkeypatch, "ccache")
+    platform_dir = str(tmp_path / "build" / "OS64")
+
+    assert launcher.launcherOptions(platform_dir) == {}
+
+    options = launcher.launcherOptions(platform_dir, compiler_cache="auto")
+    assert list(options) == [
+        "CMAKE_C_COMPILER_LAUNCHER",
+        "CMAKE_CXX_COMPILER_LAUNCHER",
+        "CMAKE_OBJC_COMPILER_LAUNCHER",
+        "CMAKE_OBJCXX_COMPILER_LAUNCHER",
+    ]
+    command = options["CMAKE_C_COMPILER_LAUNCHER"].split(";")
+    assert command[1:] == [
+        "CCACHE_DIR={}".format(tmp_path / "cache" / "ios_build" / "ccache"),
+        "CCACHE_STATSLOG={}".format(os.path.join(platform_dir, launcher.STATS_FILE)),
+        str(bin_dir / "ccache"),
+    ]
+
+    # Launchers specified by the user are kept
+    options = launcher.launcherOptions(
+        platform_dir,
+        compiler_cache="ccache",
+        compiler_cache_dir="compiler_cache",
+        platform="OS64",
+        cmake_options={"CMAKE_C_COMPILER_LAUNCHER": "distcc"},
+        platform_options={"OS64": {"CMAKE_CXX_COMPILER_LAUNCHER": "distcc"}},
+    )
+    assert list(options) == [
+        "CMAKE_OBJC_COMPILER_LAUNCHER",
+        "CMAKE_OBJCXX_COMPILER_LAUNCHER",
+    ]
+    command = options["CMAKE_OBJC_COMPILER_LAUNCHER"].split(";")
+    assert command[1] == "CCACHE_DIR={}".format(os.path.abspath("compiler_cache"))
+
+
+def testReadStats(tmp_path):
+    stats_file = tmp_path / "stats.log"
+    assert launcher.readStatsLog(stats_file) == (0, 0)
+
+    with open(stats_file, "w") as f:
+        f.write("# 2024-01-01T00:00:00\ndirect_cache_hit\n")
+        f.write("# 2024-01-01T00:00:01\npreprocessed_cache_hit\n")
+        f.write("# 2024-01-01T00:00:02\ncache_miss\n")
+    assert launcher.readStatsLog(stats_file) == (2, 1)
+
+    output = {
+        "stats": {
+            "cache_hits": {"counts": {"C/C++": 3, "ObjC": 1}},
+            "cache_misses": {"counts": {"C/C++": 4}},
+        }
+    }
+    assert launcher.readSccacheStats(json.dumps(output).encode()) == (4, 4)
+    assert launcher.formatStats(4, 4) == "4 hits, 4 misses (50%)"
+    assert launcher.formatStats(0, 0) == "0 hits, 0 misses (0%)"
+
+
+@pytest.mark.parametrize("print_level", range(-1, 3))
+@pytest.mark.parametrize("compiler_cache", ["ccache", "sccache"])
+def testBuildCompilerCache(tmp_path, monkeypatch, capsys, print_level, compiler_cache):
+    installTools(tmp_path, monkeypatch, compiler_cache)
+    options = buildOptions(
+        tmp_path, compiler_cache=compiler_cache, trace_file=None, jobs=2
+    )
+    printer = Printer(print_level=print_level)
+
+    def run(name):
+        build.iosBuild(
+            printer=printer,
+            **{
+                **options,
+                "build_prefix": str(tmp_path / name / "build"),
+                "output_dir": str(tmp_path / name / "output"),
+            },
+        )
+        return capsys.readouterr().out
+
+    # Fresh build directories reuse the objects of previous builds
+    first = run("first")
+    second = run("second")
+    if print_level < 0:
+        assert first == second == ""
+        return
+
+    if compiler_cache == "ccache":
+        for platform in options["platforms"]:
+            assert "Compiler cache ({})".format(platform) in first
+    assert "0 hits, 4 misses (0%)" in first
+    assert "4 hits, 0 misses (100%)" in second
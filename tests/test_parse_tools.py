@@ -34,6 +34,10 @@ fail_cases = [
         ["CMAKE_INSTALL_PREFIX=dir"],
         "CMake option CMAKE_INSTALL_PREFIX is used by iOSBuild and cannot be specified",
     ),
+    (
+        ["CMAKE_BUILD_TYPE=Debug"],
+        "CMake option CMAKE_BUILD_TYPE is used by iOSBuild and cannot be specified",
+    ),
     (["OPTION1=value1", "OPTION1=value2"], "Option OPTION1 already specified"),
 ]
 
@@ -2,8 +2,15 @@ import os
 import pytest
 import json
 
-from ios_build.parser import parse
-from ios_build.errors import ParserError
+from ios_build.parser import (
+    SERVER_SOCKET,
+    checkOptions,
+    parse,
+    parseServe,
+    parseStats,
+    parseWorker,
+)
+from ios_build.errors import IOSBuildError, ParserError
 
 
 def testDefaults(capsys):
@@ -22,12 +29,37 @@ def testDefaults(capsys):
         "clean": False,
         "toolchain": "https://github.com/leetal/ios-cmake/blob/master/ios.toolchain.cmake?raw=true",
         "toolchain_dest": "toolchain",
+        "toolchain_cache": None,
+        "toolchain_sha256": None,
+        "offline": False,
+        "download_timeout": 30,
+        "download_retries": 3,
         "build_prefix": "build",
         "install_prefix": "install",
         "output_dir": os.getcwd(),
-        "generator": "Xcode",
+        "generator": "auto",
         "clean_up": False,
+        "jobs": 1,
+        "framework_jobs": None,
+        "max_procs": None,
+        "build_cache": False,
+        "build_cache_dir": None,
+        "build_cache_size": 4096,
+        "seed_cache": False,
+        "compiler_cache": None,
+        "compiler_cache_dir": None,
+        "trace_file": None,
+        "log_dir": None,
+        "compress_logs": False,
+        "log_lines": 100,
+        "server": None,
+        "workers": None,
+        "history": True,
+        "watch": False,
+        "watch_interval": 1.0,
+        "watch_debounce": 0.5,
         "platforms": ["OS64", "SIMULATORARM64", "MAC_ARM64"],
+        "configs": ["Release"],
         "cmake_options": {},
     }
 
@@ -137,3 +169,158 @@ def testJSON(capsys):
 
     result2 = parse(args=["example", *platform_options])
     assert result2["platform_options"] == example_dict
+
+
+def testJobs(capsys):
+    result = parse(args=["example", "--jobs", "4"])
+    assert result["jobs"] == 4
+
+    result = parse(args=["example", "-j", "2"])
+    assert result["jobs"] == 2
+    assert result["framework_jobs"] is None
+
+    result = parse(args=["example", "--framework-jobs", "8"])
+    assert result["jobs"] == 1
+    assert result["framework_jobs"] == 8
+
+    for value in ["0", "-1", "many"]:
+        with pytest.raises(ParserError):
+            parse(args=["example", "--jobs", value])
+        capture = capsys.readouterr()
+        assert (
+            "iOSBuild: error: argument --jobs/-j: invalid positive integer value: '{}'".format(
+                value
+            )
+            in capture.err
+        )
+
+
+def testDownloadRetries(capsys):
+    assert parse(args=["example", "--download-retries", "0"])["download_retries"] == 0
+
+    with pytest.raises(ParserError):
+        parse(args=["example", "--download-retries", "-1"])
+    capture = capsys.readouterr()
+    assert "invalid non-negative integer value: '-1'" in capture.err
+
+
+def testWatch():
+    result = parse(args=["example", "--watch"])
+    assert result["watch"]
+
+    result = parse(
+        args=["example", "--watch", "--watch-interval", "0.1", "--watch-debounce", "2"]
+    )
+    assert result["watch_interval"] == 0.1
+    assert result["watch_debounce"] == 2.0
+
+
+def testToolchainMirrors():
+    mirrors = ["https://example.com/ios.toolchain.cmake", "ios.toolchain.cmake"]
+    result = parse(args=["example", "--toolchain", *mirrors])
+    assert result["toolchain"] == mirrors
+
+    result = parse(args=["example", "-t", mirrors[0]])
+    assert result["toolchain"] == mirrors[:1]
+
+
+def testLogs():
+    result = parse(
+        args=["example", "--log-dir", "logs", "--compress-logs", "--log-lines", "10"]
+    )
+    assert result["log_dir"] == "logs"
+    assert result["compress_logs"]
+    assert result["log_lines"] == 10
+
+    with pytest.raises(ParserError):
+        parse(args=["example", "--log-lines", "0"])
+
+
+def testMaxProcs():
+    result = parse(args=["example", "--max-procs", "4"])
+    assert result["max_procs"] == 4
+
+    result = parse(args=["example", "--max-procs"])
+    assert result["max_procs"] == (os.cpu_count() or 1)
+
+    with pytest.raises(ParserError):
+        parse(args=["example", "--max-procs", "0"])
+
+
+def testConfigs(capsys):
+    with pytest.raises(ParserError):
+        parse(args=["example", "--configs"])
+    capture = capsys.readouterr()
+    assert (
+        "iOSBuild: error: argument --configs: expected at least one argument"
+        in capture.err
+    )
+
+    result = parse(args=["example", "--configs", "Debug", "Release", "Debug"])
+    assert result["configs"] == ["Debug", "Release"]
+
+
+def testServer():
+    result = parse(args=["example", "--server", "server.sock"])
+    assert result["server"] == "server.sock"
+
+    result = parse(args=["example", "--server"])
+    assert result["server"] == SERVER_SOCKET
+
+    result = parseServe(args=["--socket", "server.sock", "-j", "2", "-v"])
+    assert result == {"socket_path": "server.sock", "jobs": 2, "print_level": 1}
+
+
+def testWorkers():
+    result = parse(args=["example", "--workers", "mac1:8000", "mac2"])
+    assert result["workers"] == ["mac1:8000", "mac2:7390"]
+
+    with pytest.raises(ParserError):
+        parse(args=["example", "--workers", "mac1:port"])
+
+    result = parseWorker(args=["--listen", "0.0.0.0:8000", "-j", "2"])
+    assert result == {
+        "listen": "0.0.0.0:8000",
+        "jobs": 2,
+        "work_dir": None,
+        "cmake_command": "cmake",
+        "print_level": 0,
+    }
+
+
+def testStats():
+    assert parse(args=["example", "--no-history"])["history"] is False
+
+    result = parseStats(args=["--project", "example", "--days", "7", "-q"])
+    assert result == {"project": "example", "days": 7, "limit": 10, "print_level": -1}
+
+    with pytest.raises(ParserError):
+        parseStats(args=["--days", "0"])
+
+
+def testCheckOptions():
+    options = {
+        "platforms": ["OS64", "MAC_ARM64"],
+        "generator": "Ninja",
+        "jobs": 2,
+        "download_timeout": 5,
+        "clean": True,
+        "toolchain": "ios.toolchain.cmake",
+        "cmake_options": {"FOO": "ON"},
+        "depends": ["zlib"],
+    }
+    assert checkOptions(options) == {**options, "download_timeout": 5.0}
+
+    invalid = [
+        ({"platforms": ["OS65"]}, "platforms: invalid choice: 'OS65'"),
+        ({"generator": "Make"}, "generator: invalid choice: 'Make'"),
+        ({"jobs": 0}, "jobs: invalid value: 0"),
+        ({"max_procs": -1}, "max_procs: invalid value: -1"),
+        ({"jobs": True}, "jobs: invalid value: True"),
+        ({"download_timeout": "soon"}, "download_timeout: invalid value: 'soon'"),
+        ({"clean": 1}, "clean: expected true or false"),
+        ({"generator": ["Ninja"]}, "generator: expected one value"),
+    ]
+    for option, message in invalid:
+        with pytest.raises(IOSBuildError, match=message):
+            checkOptions(option)
@@ -187,6 +187,13 @@ def testPrintError(capsys, print_level):
     assert capture.out == ""
     assert capture.err == "An error"
 
+    # Invalid UTF-8 in tool output is replaced
+    printer.printError(b"Invalid \xff\n")
+    printer.printOutput(b"Invalid \xfe\n")
+    capture = capsys.readouterr()
+    assert capture.err == "Invalid \ufffd\n"
+    assert capture.out == "Invalid \ufffd\n"
+
 
 @pytest.mark.parametrize("print_level", range(-1, 3))
 def testPrintHeader(capsys, print_level):
@@ -224,3 +231,36 @@ def testPrintFooter(capsys, print_level):
     expected += "\n"
 
     assert capture.out == expected
+
+
+@pytest.mark.parametrize("print_level", range(-1, 3))
+def testBuffered(capsys, print_level):
+    printer = Printer(print_level=print_level)
+    assert not printer.isBuffered()
+
+    buffered = printer.buffered()
+    assert buffered.isBuffered()
+    assert buffered.verbosity == print_level
+
+    buffered.printValue("text", "value", verbosity=print_level)
+    buffered.printOutput("output\n".encode())
+
+    captured = capsys.readouterr()
+    assert captured.out == ""
+
+    printer.printBuffer(buffered)
+    captured = capsys.readouterr()
+    assert captured.out == "text                             value\noutput\n"
+    assert captured.err == ""
+
+    # Errors are buffered separately and printed to stderr
+    buffered = printer.buffered()
+    buffered.printError("error\n".encode())
+
+    captured = capsys.readouterr()
+    assert captured.err == ""
+
+    printer.printBuffer(buffered)
+    captured = capsys.readouterr()
+    assert captured.out == ""
+    assert captured.err == "error\n"
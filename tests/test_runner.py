@@ -1,6 +1,11 @@
+import os
+import sys
 import pytest
+import subprocess
 from ios_build.run import runner
 
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
 
 def testRunnerNoArgs(capsys):
     assert runner() == 2
@@ -29,6 +34,18 @@ test_cases = [
     ),
     (["example", "--cmake", "notcmake"], 1, "Error: CMake not found"),
     (["example", "--cmake", "xcodebuild"], 2, "xcodebuild: error: invalid option"),
+    (
+        ["batch"],
+        2,
+        "iOSBuild batch: error: the following arguments are required: manifest",
+    ),
+    (["batch", "missing.toml"], 1, "Error: Cannot read manifest"),
+    (["stats", "--limit", "0"], 2, "invalid positive integer value: '0'"),
+    (
+        ["worker", "--listen", "localhost:port"],
+        2,
+        "invalid worker address: 'localhost:port'",
+    ),
 ]
 
 
@@ -46,3 +63,30 @@ def testRunner(capsys, args, exit_code, error):
 def testRun(tmp_path):
     args = ["example", "--output-dir={}".format(tmp_path)]
     assert runner(args=args) == 0
+
+
+@pytest.mark.parametrize(
+    "args", [["--help"], ["example", "-DPLATFORM=IOS"], ["stats", "--help"]]
+)
+def testStartupImports(args):
+    # Printing help and reporting invalid input must not load the build modules
+    script = "\n".join(
+        [
+            "import sys",
+            "from ios_build import run",
+            "sys.platform = 'darwin'",
+            "run.runner(args={!r})".format(args),
+            "print(','.join(sorted(sys.modules)))",
+        ]
+    )
+    process = subprocess.run(
+        [sys.executable, "-c", script],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    modules = process.stdout.strip().splitlines()[-1].split(",")
+    assert "ios_build.parser" in modules
+    for module in ["requests", "asyncio", "sqlite3", "ios_build.build"]:
+        assert module not in modules
@@ -0,0 +1,159 @@
+import os
+import pytest
+
+from ios_build import build, history, schedule
+from ios_build.printer import Printer
+from ios_build.errors import CMakeError
+from .test_watch import TOOLS, createProject, readLog
+
+
+@pytest.fixture(autouse=True)
+def cache_home(tmp_path, monkeypatch):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+
+
+def recordTotals(path, totals: dict):
+    with history.recordRun(path=path) as recorder:
+        for platform, total in totals.items():
+            recorder.step("total", total, platform=platform)
+
+
+def testEstimateDurations(tmp_path):
+    path = str(tmp_path)
+    assert schedule.estimateDurations(path, ["OS64"]) == {}
+
+    for total in range(10):
+        recordTotals(path, {"OS64": total})
+    recordTotals(path, {"MAC_ARM64": 4.0})
+
+    # Platforms without history are estimated from the others
+    estimates = schedule.estimateDurations(
+        path, ["OS64", "MAC_ARM64", "MAC_UNIVERSAL", "SIMULATOR64"]
+    )
+    assert estimates == {
+        "OS64": 7.0,
+        "MAC_ARM64": 4.0,
+        "MAC_UNIVERSAL": 11.0,
+        "SIMULATOR64": 5.5,
+    }
+
+
+def testSchedulePlatforms():
+    platforms = ["OS64", "MAC_UNIVERSAL", "SIMULATOR64", "MAC_CATALYST_UNIVERSAL"]
+    assert schedule.schedulePlatforms(platforms, {}) == [
+        "MAC_UNIVERSAL",
+        "MAC_CATALYST_UNIVERSAL",
+        "OS64",
+        "SIMULATOR64",
+    ]
+
+    estimates = {"OS64": 3, "MAC_UNIVERSAL": 5, "SIMULATOR64": 4}
+    assert schedule.schedulePlatforms(platforms[:3], estimates) == [
+        "MAC_UNIVERSAL",
+        "SIMULATOR64",
+        "OS64",
+    ]
+
+
+def testEstimateCriticalPath():
+    estimates = {"A": 5, "B": 4, "C": 3, "D": 3}
+    assert schedule.estimateCriticalPath(["A", "B", "C", "D"], estimates, 2) == (
+        8,
+        ["A", "D"],
+    )
+    assert schedule.estimateCriticalPath(["A", "B"], estimates, 4) == (5, ["A"])
+    assert schedule.estimateCriticalPath(["A", "B"], estimates) == (9, ["A", "B"])
+
+
+def testCriticalPath():
+    assert schedule.criticalPath({}) == (0.0, [])
+
+    spans = {"A": (10.0, 15.0), "B": (10.0, 12.0), "C": (12.05, 18.0)}
+    assert schedule.criticalPath(spans) == (8.0, ["B", "C"])
+    assert schedule.formatPath(8.0, ["B", "C"]) == "8.0s (B -> C)"
+
+
+@pytest.mark.parametrize("print_level", range(-1, 3))
+def testScheduledBuild(tmp_path, monkeypatch, capsys, print_level):
+    log_file = os.path.join(tmp_path, "cmake.log")
+    monkeypatch.setenv("IOS_BUILD_FAKE_LOG", log_file)
+    path = os.path.join(tmp_path, "project")
+    createProject(path)
+    toolchain = os.path.join(tmp_path, "ios.toolchain.cmake")
+    with open(toolchain, "w") as f:
+        f.write("# toolchain\n")
+
+    kwargs = {
+        "path": path,
+        "toolchain_path": toolchain,
+        "install_dir": os.path.join(tmp_path, "install"),
+        "log_dir": os.path.join(tmp_path, "logs"),
+        "platforms": ["OS64", "SIMULATOR64", "MAC_UNIVERSAL"],
+        "cmake_command": os.path.join(TOOLS, "cmake"),
+        "printer": Printer(print_level=print_level),
+        "jobs": 2,
+    }
+    recordTotals(path, {"SIMULATOR64": 2.0})
+
+    # The universal platform is estimated to be the slowest and starts first
+    with history.recordRun(**kwargs) as recorder:
+        build.build(os.path.join(tmp_path, "build"), recorder=recorder, **kwargs)
+    platforms = [
+        arg[len("-DPLATFORM=") :]
+        for args in readLog(log_file)
+        for arg in args
+        if arg.startswith("-DPLATFORM=")
+    ]
+    assert sorted(platforms[:2]) == ["MAC_UNIVERSAL", "OS64"]
+    assert platforms[2] == "SIMULATOR64"
+
+    durations = history.platformDurations(path, kwargs["platforms"], runs=5)
+    assert len(durations["OS64"]) == 1
+    assert len(durations["SIMULATOR64"]) == 2
+
+    captured = capsys.readouterr()
+    if print_level >= 0:
+        assert "Critical path estimate" in captured.out
+        assert "(MAC_UNIVERSAL)" in captured.out
+        assert "Critical path " in captured.out
+    else:
+        assert captured.out == ""
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def testCriticalPathOutput(tmp_path, monkeypatch, capsys, jobs):
+    toolchain = os.path.join(tmp_path, "ios.toolchain.cmake")
+    with open(toolchain, "w") as f:
+        f.write("# toolchain\n")
+
+    def buildPlatform(platform, **kwargs):
+        if platform == "OS64":
+            raise CMakeError("Build failed for OS64")
+        return {"build": 0.1}
+
+    monkeypatch.setattr(build, "buildPlatform", buildPlatform)
+    kwargs = {
+        "path": str(tmp_path),
+        "toolchain_path": toolchain,
+        "install_dir": os.path.join(tmp_path, "install"),
+        "printer": Printer(print_level=0),
+        "jobs": jobs,
+    }
+
+    # Failed platforms are not on the critical path
+    with pytest.raises(CMakeError):
+        build.build(
+            os.path.join(tmp_path, "build"),
+            platforms=["SIMULATOR64", "OS64"],
+            **kwargs,
+        )
+    output = capsys.readouterr().out
+    if jobs > 1:
+        assert "(SIMULATOR64)" in output
+    else:
+        assert "Critical path" not in output
+
+    # Nothing is printed if no platforms were built
+    with pytest.raises(CMakeError):
+        build.build(os.path.join(tmp_path, "build"), platforms=["OS64"], **kwargs)
+    assert "Critical path" not in capsys.readouterr().out
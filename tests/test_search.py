@@ -114,3 +114,71 @@ def testFindLibraries(tmp_path, print_level):
         "libexample": expected_output,
         "lib2": {"bsd": lib2_path},
     }
+
+
+def testPrunedDirectories(tmp_path):
+    lib_paths = {"library": createEmptyFile(tmp_path, "lib", "library.a")}
+    for directory in [
+        "include",
+        "share",
+        os.path.join("lib", "cmake"),
+        "lib.xcframework",
+    ]:
+        createEmptyFile(tmp_path, directory, "hidden.a")
+
+    checkPaths(tmp_path, lib_paths)
+
+    assert search.isPruned("include")
+    assert search.isPruned("libexample.xcframework")
+    assert not search.isPruned("lib")
+
+
+@pytest.mark.parametrize("print_level", range(-1, 3))
+def testDuplicateLibraries(tmp_path, capsys, print_level):
+    printer = Printer(print_level=print_level)
+    nested = createEmptyFile(tmp_path, "lib", "nested", "libexample.a")
+    versioned = createEmptyFile(tmp_path, "lib", "libexample.1.2.a")
+    top = createEmptyFile(tmp_path, "lib", "libexample.a")
+    other = createEmptyFile(tmp_path, "lib", "libother.a")
+
+    libraries, duplicates = search.scanLibraries(str(tmp_path))
+    assert libraries == {"libexample": top, "libother": other}
+    assert duplicates == {"libexample": [top, versioned, nested]}
+
+    assert search.findPlatformLibraries(str(tmp_path), printer=printer) == libraries
+    captured = capsys.readouterr()
+    if print_level >= 0:
+        assert "Duplicate library name: libexample" in captured.out
+        assert "Ignoring                         {}".format(nested) in captured.out
+    else:
+        assert captured.out == ""
+
+
+def testSymlinkedDirectories(tmp_path):
+    library = createEmptyFile(tmp_path, "lib", "libexample.a")
+    os.symlink("lib", os.path.join(tmp_path, "lib64"))
+    os.symlink("..", os.path.join(tmp_path, "lib", "loop"))
+
+    libraries, duplicates = search.scanLibraries(str(tmp_path))
+    assert libraries == {"libexample": library}
+    assert duplicates == {}
+
+
+@pytest.mark.parametrize("jobs", [1, 4])
+def testFindLibrariesJobs(tmp_path, jobs):
+    platforms = ["OS64", "SIMULATORARM64", "MAC_ARM64", "TVOS"]
+    expected = {}
+    for i in range(10):
+        lib = "lib{}".format(i)
+        expected[lib] = {}
+        for platform in platforms:
+            expected[lib][platform] = createEmptyFile(
+                tmp_path, platform, "lib", "{}.a".format(lib)
+            )
+
+    result = search.findlibraries(
+        tmp_path, platforms=platforms, jobs=jobs, printer=Printer(print_level=-1)
+    )
+    assert result == expected
+    for lib in result:
+        assert list(result[lib]) == platforms
@@ -0,0 +1,160 @@
+import os
+import pytest
+
+from ios_build import cmake
+from ios_build import seed
+from ios_build.printer import Printer
+from .test_watch import TOOLS
+
+CACHE = """# This is the CMakeCache file.
+
+//Path to a program.
+CMAKE_AR:FILEPATH=/usr/bin/ar
+
+//C compiler
+CMAKE_C_COMPILER:FILEPATH={compiler}
+
+//Have include unistd.h
+HAVE_UNISTD_H:INTERNAL=1
+
+//Test HAVE_ATOMICS
+HAVE_ATOMICS:INTERNAL=
+
+//ADVANCED property for variable: CMAKE_AR
+CMAKE_AR-ADVANCED:INTERNAL=1
+"""
+
+
+@pytest.fixture(autouse=True)
+def seeds_home(tmp_path, monkeypatch):
+    """
+    Start each test without stored seeds.
+    """
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+
+
+def writeCache(platform_dir, compiler):
+    os.makedirs(platform_dir, exist_ok=True)
+    with open(os.path.join(platform_dir, "CMakeCache.txt"), "w") as f:
+        f.write(CACHE.format(compiler=compiler))
+
+
+def writeFile(path, contents):
+    with open(path, "w") as f:
+        f.write(contents)
+
+    return str(path)
+
+
+def testReadCache(tmp_path):
+    writeCache(tmp_path, "/usr/bin/cc")
+    entries = seed.readCache(os.path.join(tmp_path, "CMakeCache.txt"))
+
+    assert entries[0] == ("CMAKE_AR", "FILEPATH", "/usr/bin/ar", "Path to a program.")
+    assert seed.probeEntries(entries) == [
+        ("HAVE_UNISTD_H", "INTERNAL", "1", "Have include unistd.h"),
+        ("HAVE_ATOMICS", "INTERNAL", "", "Test HAVE_ATOMICS"),
+    ]
+    assert list(seed.toolSignature(entries)) == ["/usr/bin/cc"]
+
+
+def testCMakeString():
+    assert seed.cmakeString('a "b" \\ ${c}') == '"a \\"b\\" \\\\ \\${c}"'
+
+
+def testSeedKey(tmp_path):
+    toolchain = writeFile(tmp_path / "toolchain.cmake", "# toolchain")
+    key = seed.seedKey("OS64", toolchain, [])
+
+    assert seed.seedKey("OS64", toolchain, []) == key
+    assert seed.seedKey("SIMULATORARM64", toolchain, []) != key
+    assert seed.seedKey("OS64", toolchain, ["-DOPTION=1"]) != key
+    assert seed.seedKey("OS64", toolchain, [], generator="Ninja") != key
+    assert seed.seedKey("OS64", toolchain, [], configs=["Debug"]) != key
+    assert seed.seedKey("OS64", toolchain, [], configs=["Release"]) != (
+        seed.seedKey("OS64", toolchain, [], configs=["Debug"])
+    )
+    writeFile(toolchain, "# new toolchain")
+    assert seed.seedKey("OS64", toolchain, []) != key
+
+
+def testStoreSeed(tmp_path):
+    compiler = writeFile(tmp_path / "cc", "compiler")
+    writeCache(tmp_path / "build", compiler)
+
+    assert seed.findSeed("key") is None
+    assert seed.storeSeed("key", tmp_path / "build", 2.5) == 2
+
+    found = seed.findSeed("key")
+    assert found["duration"] == 2.5
+    assert seed.seedOptions(found) == ["-C", found["script"]]
+    assert seed.seedOptions(None) == []
+    with open(found["script"]) as f:
+        assert f.read() == (
+            'set(HAVE_UNISTD_H "1" CACHE INTERNAL "Have include unistd.h")\n'
+            'set(HAVE_ATOMICS "" CACHE INTERNAL "Test HAVE_ATOMICS")\n'
+        )
+
+    # Seeds are invalidated when the compiler changes
+    writeFile(compiler, "new compiler")
+    assert seed.findSeed("key") is None
+    assert not os.path.exists(found["script"])
+
+
+@pytest.mark.parametrize("print_level", range(-1, 3))
+def testConfigureSeed(tmp_path, monkeypatch, capsys, print_level):
+    path = tmp_path / "project"
+    os.makedirs(path)
+    writeFile(
+        path / "CMakeLists.txt",
+        "check_include_file(unistd.h HAVE_UNISTD_H)\n"
+        "check_include_file(stdint.h HAVE_STDINT_H)\n",
+    )
+    compiler = writeFile(tmp_path / "cc", "compiler")
+    monkeypatch.setenv("IOS_BUILD_FAKE_COMPILER", compiler)
+    monkeypatch.setenv("IOS_BUILD_FAKE_LATENCY_PROBE", "0.1")
+    printer = Printer(print_level=print_level)
+
+    def configure(name):
+        log_dir = tmp_path / "logs" / name
+        cmake.configure(
+            path=str(path),
+            platform="OS64",
+            toolchain_path=writeFile(tmp_path / "toolchain.cmake", "# toolchain"),
+            install_dir=str(tmp_path / "install"),
+            platform_dir=str(tmp_path / name),
+            cmake_command=os.path.join(TOOLS, "cmake"),
+            seed_cache=True,
+            log_dir=str(log_dir),
+            printer=printer,
+        )
+        with open(log_dir / "OS64" / "configure.log") as f:
+            return f.read().count("Looking for")
+
+    def probes(name):
+        entries = seed.readCache(tmp_path / name / "CMakeCache.txt")
+        return {entry[0] for entry in seed.probeEntries(entries)}
+
+    assert configure("first") == 2
+    captured = capsys.readouterr()
+    if print_level >= 0:
+        assert "Stored configuration seed" in captured.out
+
+    # A new build directory reuses the results of the checks
+    assert configure("second") == 0
+    assert probes("second") == {"HAVE_UNISTD_H", "HAVE_STDINT_H"}
+    captured = capsys.readouterr()
+    if print_level >= 0:
+        assert "Seeded configuration" in captured.out
+        assert "2 checks" in captured.out
+
+    # The checks are repeated with a different compiler
+    monkeypatch.setenv(
+        "IOS_BUILD_FAKE_COMPILER", writeFile(tmp_path / "clang", "compiler")
+    )
+    assert configure("third") == 2
+    assert probes("third") == {"HAVE_UNISTD_H", "HAVE_STDINT_H"}
+    captured = capsys.readouterr()
+    if print_level >= 0:
+        assert "Configuration seed removed" in captured.out
+    assert configure("fourth") == 0
@@ -0,0 +1,153 @@
+import os
+import pytest
+import threading
+
+from ios_build import serve
+from ios_build.client import requestOptions, runClient, sendRequest
+from ios_build.parser import parse
+from ios_build.printer import Printer
+from ios_build.errors import IOSBuildError
+from .test_watch import TOOLS, createProject, readLog
+
+
+@pytest.fixture(autouse=True)
+def cache_home(tmp_path, monkeypatch):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+
+
+@pytest.fixture
+def server(tmp_path):
+    socket_path = os.path.join(tmp_path, "server.sock")
+    ready = threading.Event()
+    thread = threading.Thread(
+        target=serve.serve,
+        args=(socket_path,),
+        kwargs={"ready": ready, "jobs": 2, "printer": Printer(print_level=-1)},
+        daemon=True,
+    )
+    thread.start()
+    assert ready.wait(10)
+
+    yield socket_path
+
+    list(sendRequest(socket_path, {"command": "shutdown"}))
+    thread.join(10)
+    assert not os.path.exists(socket_path)
+
+
+def buildRequest(tmp_path, **kwargs) -> dict:
+    path = os.path.join(tmp_path, "project")
+    if not os.path.isdir(path):
+        createProject(path)
+    toolchain = os.path.join(tmp_path, "ios.toolchain.cmake")
+    with open(toolchain, "w") as f:
+        f.write("# toolchain\n")
+
+    options = {
+        "path": path,
+        "toolchain": toolchain,
+        "platforms": ["OS64", "SIMULATORARM64"],
+        "generator": "Xcode",
+        "output_dir": os.path.join(tmp_path, "output"),
+        "cmake_command": os.path.join(TOOLS, "cmake"),
+        "xcode_build_command": os.path.join(TOOLS, "xcodebuild"),
+        **kwargs,
+    }
+    return {"command": "build", "options": options}
+
+
+def testRequestOptions(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    kwargs = parse(args=["project", "--server", "-t", "toolchain.cmake", "-o", "out"])
+    options = requestOptions(**kwargs)
+
+    assert options["path"] == os.path.join(tmp_path, "project")
+    assert options["output_dir"] == os.path.join(tmp_path, "out")
+    assert options["toolchain"] == [os.path.join(tmp_path, "toolchain.cmake")]
+    # Temporary directories of the parser are chosen by the server
+    for key in ["server", "build_prefix", "install_prefix", "toolchain_dest"]:
+        assert key not in options
+
+
+def testServe(tmp_path, monkeypatch, server):
+    log_file = os.path.join(tmp_path, "cmake.log")
+    monkeypatch.setenv("IOS_BUILD_FAKE_LOG", log_file)
+
+    assert list(sendRequest(server, {"command": "ping"}))[0]["pid"] == os.getpid()
+
+    events = list(sendRequest(server, buildRequest(tmp_path)))
+    assert events[0] == {"event": "queued"}
+    assert events[-1] == {"event": "done", "status": 0, "message": None}
+    names = [event["name"] for event in events if event["event"] == "begin"]
+    assert names[:2] == ["getToolchain", "iosBuild"]
+    assert "buildPlatforms" in names
+    assert any(event["event"] == "output" for event in events)
+
+    frameworks = sorted(os.listdir(os.path.join(tmp_path, "output")))
+    assert frameworks == ["libalpha.xcframework", "libbeta.xcframework"]
+
+    # The tools are checked once, the build directory is reused
+    output_dir = os.path.join(tmp_path, "output2")
+    events = list(sendRequest(server, buildRequest(tmp_path, output_dir=output_dir)))
+    assert events[-1]["status"] == 0
+    calls = readLog(log_file)
+    assert calls.count(["cmake", "--version"]) == 1
+    assert calls.count(["xcodebuild", "-version"]) == 1
+    assert len([args for args in calls if "-S" in args]) == 2
+
+
+def testServeDeduplicate(tmp_path, monkeypatch, server):
+    log_file = os.path.join(tmp_path, "cmake.log")
+    monkeypatch.setenv("IOS_BUILD_FAKE_LOG", log_file)
+    monkeypatch.setenv("IOS_BUILD_FAKE_LATENCY_BUILD", "0.5")
+
+    request = buildRequest(tmp_path)
+    results = []
+
+    def client():
+        results.append(list(sendRequest(server, request)))
+
+    threads = [threading.Thread(target=client) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(60)
+
+    assert len(results) == 2
+    for events in results:
+        assert events[-1]["status"] == 0
+    assert sum(1 for events in results if {"event": "attached"} in events) == 1
+    assert len([args for args in readLog(log_file) if "--build" in args]) == 2
+
+
+def testServeError(tmp_path, server):
+    request = buildRequest(tmp_path)
+    os.remove(os.path.join(request["options"]["path"], "CMakeLists.txt"))
+
+    events = list(sendRequest(server, request))
+    assert events[-1]["status"] == 1
+    assert events[-1]["message"].startswith("Error: Invalid CMake project")
+
+    events = list(sendRequest(server, {"command": "unknown"}))
+    assert events == [
+        {"event": "done", "status": 1, "message": "Unknown command: unknown"}
+    ]
+
+    with pytest.raises(IOSBuildError, match="Build server already running"):
+        serve.serve(server)
+
+
+@pytest.mark.parametrize("print_level", range(-1, 3))
+def testClient(tmp_path, capsys, server, print_level):
+    options = buildRequest(tmp_path)["options"]
+    status = runClient(server=server, print_level=print_level, **options)
+    assert status == 0
+
+    captured = capsys.readouterr()
+    if print_level >= 0:
+        assert "Created XC Framework" in captured.out
+    else:
+        assert captured.out == ""
+
+    with pytest.raises(IOSBuildError, match="Cannot connect to build server"):
+        runClient(server=os.path.join(tmp_path, "missing.sock"), **options)
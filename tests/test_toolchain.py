@@ -1,6 +1,9 @@
 import os
+import time
 import pytest
+import hashlib
 
+from ios_build import toolchain
 from ios_build.errors import IOSBuildError
 from ios_build.printer import Printer
 from ios_build.toolchain import getToolchain, download
@@ -32,3 +35,254 @@ def testGetToolchain(print_level, toolchain_file):
     with pytest.raises(IOSBuildError):
         fake_file = os.path.join(file, "something")
         getToolchain(printer=printer, toolchain=fake_file)
+
+
+def testDownloadLocal(tmp_path, http_server):
+    http_server.files["/file.txt"] = b"contents"
+    output_file = os.path.join(tmp_path, "file.txt")
+
+    r = download(http_server.url("/file.txt"), output_file)
+    assert r.status_code == 200
+    with open(output_file, "rb") as f:
+        assert f.read() == b"contents"
+
+    r = download(
+        http_server.url("/file.txt"),
+        output_file,
+        headers={"If-None-Match": r.headers["ETag"]},
+    )
+    assert r.status_code == 304
+
+    with pytest.raises(IOSBuildError, match="Unable to download file"):
+        download(http_server.url("/missing.txt"), output_file)
+
+    # No partial or temporary files are left behind
+    assert os.listdir(tmp_path) == ["file.txt"]
+
+
+def testCachePath(tmp_path, monkeypatch):
+    url = "https://example.com/ios.toolchain.cmake"
+    path = toolchain.cachePath(url, tmp_path)
+    assert path == toolchain.cachePath(url, str(tmp_path))
+    assert path.startswith(str(tmp_path))
+    assert path.endswith("ios.toolchain.cmake")
+    assert path != toolchain.cachePath(url + "?raw=true", tmp_path)
+
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+    assert toolchain.cacheDirectory() == os.path.join(
+        tmp_path, "ios_build", "toolchain"
+    )
+
+
+@pytest.mark.parametrize("print_level", range(-1, 3))
+def testCachedToolchain(tmp_path, http_server, print_level):
+    printer = Printer(print_level=print_level)
+    content = b"set(IOS_TOOLCHAIN ON)"
+    digest = hashlib.sha256(content).hexdigest()
+    http_server.files["/ios.toolchain.cmake"] = content
+    url = http_server.url("/ios.toolchain.cmake")
+    cache = os.path.join(tmp_path, "cache")
+
+    with pytest.raises(IOSBuildError, match="Toolchain not cached"):
+        getToolchain(
+            toolchain=url, toolchain_cache=cache, offline=True, printer=printer
+        )
+    assert len(http_server.requests) == 0
+
+    path = getToolchain(toolchain=url, toolchain_cache=cache, printer=printer)
+    assert path == toolchain.cachePath(url, cache)
+    with open(path, "rb") as f:
+        assert f.read() == content
+    assert toolchain.loadMetadata(path)["sha256"] == digest
+
+    # Revalidated using the ETag
+    assert getToolchain(toolchain=url, toolchain_cache=cache, printer=printer) == path
+    assert len(http_server.requests) == 2
+    assert "If-None-Match" in http_server.requests[-1][1]
+
+    # Offline and pinned toolchains do not access the network
+    kwargs = {"toolchain_cache": cache, "printer": printer}
+    assert getToolchain(toolchain=url, offline=True, **kwargs) == path
+    assert getToolchain(toolchain=url, toolchain_sha256=digest, **kwargs) == path
+    assert len(http_server.requests) == 2
+
+    # Updated file is downloaded to the same path
+    new_content = b"set(IOS_TOOLCHAIN OFF)"
+    http_server.files["/ios.toolchain.cmake"] = new_content
+    assert getToolchain(toolchain=url, **kwargs) == path
+    with open(path, "rb") as f:
+        assert f.read() == new_content
+
+    with pytest.raises(IOSBuildError, match="Checksum mismatch"):
+        getToolchain(toolchain=url, toolchain_sha256=digest, **kwargs)
+    with pytest.raises(IOSBuildError, match="Checksum mismatch"):
+        getToolchain(toolchain=url, toolchain_sha256=digest, offline=True, **kwargs)
+    with open(path, "rb") as f:
+        assert f.read() == new_content
+
+    # Server unavailable, fall back to cache
+    del http_server.files["/ios.toolchain.cmake"]
+    assert getToolchain(toolchain=url, **kwargs) == path
+
+    # Only the toolchain and metadata are left in the cache
+    assert sorted(os.listdir(os.path.dirname(path))) == [
+        "ios.toolchain.cmake",
+        "ios.toolchain.cmake.json",
+    ]
+
+
+def testLocalToolchainDigest(tmp_path):
+    path = os.path.join(tmp_path, "ios.toolchain.cmake")
+    with open(path, "wb") as f:
+        f.write(b"toolchain")
+
+    digest = hashlib.sha256(b"toolchain").hexdigest()
+    assert getToolchain(toolchain=path, toolchain_sha256=digest) == path
+    with pytest.raises(IOSBuildError, match="Checksum mismatch"):
+        getToolchain(toolchain=path, toolchain_sha256="0" * 64)
+
+
+@pytest.mark.parametrize("ranges", [True, False])
+def testDownloadResume(tmp_path, http_server, ranges):
+    content = os.urandom(1 << 18)
+    http_server.files["/file.bin"] = content
+    http_server.ranges = ranges
+    http_server.drops = 2
+    url = http_server.url("/file.bin")
+    output_file = os.path.join(tmp_path, "file.bin")
+
+    r = download(url, output_file, chunk_size=1024)
+    assert r.status_code == (206 if ranges else 200)
+    with open(output_file, "rb") as f:
+        assert f.read() == content
+
+    assert len(http_server.requests) == 3
+    ranges_requested = [headers.get("Range") for _, headers in http_server.requests]
+    assert ranges_requested[0] is None
+    assert ranges_requested[1] == "bytes={}-".format(len(content) // 2)
+    if ranges:
+        assert ranges_requested[2] == "bytes={}-".format(3 * len(content) // 4)
+
+    # Too many dropped connections
+    http_server.drops = 3
+    with pytest.raises(IOSBuildError):
+        download(url, os.path.join(tmp_path, "other.bin"), retries=2)
+    assert os.listdir(tmp_path) == ["file.bin"]
+
+
+def testDownloadDigest(tmp_path, http_server):
+    content = b"toolchain contents"
+    http_server.files["/file.txt"] = content
+    url = http_server.url("/file.txt")
+    output_file = os.path.join(tmp_path, "file.txt")
+
+    download(url, output_file, sha256=hashlib.sha256(content).hexdigest())
+    with open(output_file, "rb") as f:
+        assert f.read() == content
+
+    http_server.files["/file.txt"] = b"tampered contents"
+    with pytest.raises(IOSBuildError, match="Checksum mismatch"):
+        download(url, output_file, sha256=hashlib.sha256(content).hexdigest())
+
+    # Existing file is untouched
+    with open(output_file, "rb") as f:
+        assert f.read() == content
+    assert os.listdir(tmp_path) == ["file.txt"]
+
+
+def testDownloadTimeout(tmp_path, http_server):
+    http_server.files["/file.txt"] = b"contents"
+    http_server.delays["/file.txt"] = 0.5
+    output_file = os.path.join(tmp_path, "file.txt")
+
+    with pytest.raises(IOSBuildError, match="Timed out downloading file"):
+        download(http_server.url("/file.txt"), output_file, timeout=0.1, retries=1)
+    assert len(http_server.requests) == 2
+    assert os.listdir(tmp_path) == []
+
+
+def testDownloadBackoff(tmp_path, http_server):
+    http_server.files["/file.txt"] = b"contents"
+    http_server.failures["/file.txt"] = 2
+    output_file = os.path.join(tmp_path, "file.txt")
+
+    start = time.perf_counter()
+    download(http_server.url("/file.txt"), output_file, backoff=0.1)
+    assert time.perf_counter() - start >= 0.3
+    assert len(http_server.requests) == 3
+
+    http_server.failures["/file.txt"] = 3
+    with pytest.raises(IOSBuildError, match="HTTP 503"):
+        download(http_server.url("/file.txt"), output_file, retries=2, backoff=0)
+
+
+def testToolchainRetries(tmp_path, http_server):
+    http_server.files["/ios.toolchain.cmake"] = b"set(IOS_TOOLCHAIN ON)"
+    http_server.failures["/ios.toolchain.cmake"] = 1
+    url = http_server.url("/ios.toolchain.cmake")
+    cache = os.path.join(tmp_path, "cache")
+
+    with pytest.raises(IOSBuildError, match="HTTP 503"):
+        getToolchain(toolchain=url, toolchain_cache=cache, download_retries=0)
+    assert len(http_server.requests) == 1
+
+    http_server.failures["/ios.toolchain.cmake"] = 1
+    path = getToolchain(toolchain=url, toolchain_cache=cache, download_retries=1)
+    assert os.path.isfile(path)
+    assert len(http_server.requests) == 3
+
+
+@pytest.mark.parametrize("print_level", range(-1, 3))
+def testToolchainMirrors(tmp_path, http_server, capsys, print_level):
+    printer = Printer(print_level=print_level)
+    content = b"set(IOS_TOOLCHAIN ON)"
+    http_server.files["/slow/ios.toolchain.cmake"] = content
+    http_server.files["/fast/ios.toolchain.cmake"] = content
+    http_server.files["/bad/ios.toolchain.cmake"] = b"invalid"
+    http_server.delays["/slow/ios.toolchain.cmake"] = 0.5
+
+    mirrors = [
+        http_server.url("/missing/ios.toolchain.cmake"),
+        http_server.url("/slow/ios.toolchain.cmake"),
+        http_server.url("/bad/ios.toolchain.cmake"),
+        http_server.url("/fast/ios.toolchain.cmake"),
+    ]
+    kwargs = {
+        "toolchain_cache": os.path.join(tmp_path, "cache"),
+        "toolchain_sha256": hashlib.sha256(content).hexdigest(),
+        "printer": printer,
+    }
+
+    start = time.perf_counter()
+    path = getToolchain(toolchain=mirrors, **kwargs)
+    assert time.perf_counter() - start < 0.5
+    assert path == toolchain.cachePath(mirrors[0], kwargs["toolchain_cache"])
+    with open(path, "rb") as f:
+        assert f.read() == content
+    assert toolchain.loadMetadata(path)["url"] == mirrors[3]
+
+    captured = capsys.readouterr()
+    if print_level >= 0:
+        assert "Toolchain mirror" in captured.out
+        assert mirrors[3] in captured.out
+
+    # Local files are used without downloading
+    local = os.path.join(tmp_path, "ios.toolchain.cmake")
+    with open(local, "wb") as f:
+        f.write(content)
+    n = len(http_server.requests)
+    assert getToolchain(toolchain=[mirrors[0], local], **kwargs) == local
+    assert len(http_server.requests) == n
+
+    # All mirrors fail
+    del kwargs["toolchain_sha256"]
+    kwargs["toolchain_cache"] = os.path.join(tmp_path, "other")
+    with pytest.raises(IOSBuildError, match="Unable to download file from any mirror"):
+        getToolchain(toolchain=[mirrors[0], mirrors[0] + "?2"], **kwargs)
+
+    time.sleep(0.5)
+    # Only the cached file and metadata remain once the slow mirror completes
+    assert sorted(os.listdir(os.path.dirname(path))) == [
+        "ios.toolchain.cmake",
+        "ios.toolchain.cmake.json",
+    ]
@@ -0,0 +1,151 @@
+import os
+import json
+import pytest
+import threading
+
+from ios_build import build
+from ios_build.trace import Tracer, getTracer, writeTrace
+from ios_build.printer import Printer
+from ios_build.errors import CMakeError
+from .test_watch import TOOLS, createProject
+
+
+def spans(trace: dict) -> list[dict]:
+    return [event for event in trace["traceEvents"] if event["ph"] == "X"]
+
+
+def testTracer():
+    tracer = Tracer()
+    with tracer.span("outer", platform="OS64", library=None):
+        with tracer.span("inner", category="test"):
+            pass
+
+    with pytest.raises(ValueError):
+        with tracer.span("failed"):
+            raise ValueError()
+
+    outer, inner, failed = spans(tracer.trace())
+    assert outer["name"] == "outer"
+    assert outer["args"] == {"platform": "OS64"}
+    assert inner["cat"] == "test"
+    assert outer["ts"] <= inner["ts"]
+    assert inner["ts"] + inner["dur"] <= outer["ts"] + outer["dur"]
+    assert failed["args"] == {"error": "ValueError"}
+    assert all(event["pid"] == os.getpid() for event in (outer, inner, failed))
+
+
+def testTracerThreads():
+    tracer = Tracer()
+
+    def job():
+        with tracer.span("job"):
+            pass
+
+    thread = threading.Thread(target=job, name="worker")
+    thread.start()
+    thread.join()
+    job()
+
+    trace = tracer.trace()
+    names = {
+        event["tid"]: event["args"]["name"]
+        for event in trace["traceEvents"]
+        if event["ph"] == "M"
+    }
+    assert sorted(names.values()) == ["MainThread", "worker"]
+    assert {event["tid"] for event in spans(trace)} == set(names)
+
+
+def testGetTracer():
+    tracer = getTracer()
+    assert not tracer.enabled
+    with tracer.span("ignored"):
+        pass
+    assert spans(tracer.trace()) == []
+
+    tracer = Tracer()
+    assert getTracer(tracer=tracer, printer=Printer()) is tracer
+
+
+@pytest.mark.parametrize("print_level", range(-1, 3))
+def testWriteTrace(tmp_path, capsys, print_level):
+    printer = Printer(print_level=print_level)
+    tracer = Tracer()
+    with tracer.span("span"):
+        pass
+
+    writeTrace(tracer, printer=printer)
+    assert os.listdir(tmp_path) == []
+
+    trace_file = os.path.join(tmp_path, "trace.json")
+    writeTrace(tracer, trace_file, printer=printer)
+    with open(trace_file) as f:
+        assert json.load(f) == tracer.trace()
+
+    captured = capsys.readouterr()
+    if print_level >= 0:
+        assert "Trace file" in captured.out
+    else:
+        assert captured.out == ""
+
+
+def buildOptions(tmp_path, **kwargs):
+    toolchain = os.path.join(tmp_path, "ios.toolchain.cmake")
+    with open(toolchain, "w") as f:
+        f.write("# toolchain\n")
+    createProject(os.path.join(tmp_path, "project"))
+
+    return {
+        "path": os.path.join(tmp_path, "project"),
+        "build_prefix": os.path.join(tmp_path, "build"),
+        "install_prefix": os.path.join(tmp_path, "install"),
+        "output_dir": os.path.join(tmp_path, "output"),
+        "toolchain": toolchain,
+        "platforms": ["OS64", "SIMULATORARM64"],
+        "cmake_command": os.path.join(TOOLS, "cmake"),
+        "xcode_build_command": os.path.join(TOOLS, "xcodebuild"),
+        "trace_file": os.path.join(tmp_path, "trace.json"),
+        **kwargs,
+    }
+
+
+@pytest.mark.parametrize("print_level", range(-1, 3))
+@pytest.mark.parametrize("jobs", [1, 2])
+def testBuildTrace(tmp_path, print_level, jobs):
+    options = buildOptions(tmp_path, jobs=jobs)
+    build.runBuild(print_level=print_level, **options)
+
+    with open(options["trace_file"]) as f:
+        events = spans(json.load(f))
+    names = [event["name"] for event in events]
+    for name in ["iosBuild", "getToolchain", "createFrameworks", "cleanUp"]:
+        assert names.count(name) == 1
+
+    platforms = {"OS64", "SIMULATORARM64"}
+    for name in ["configure", "build", "install"]:
+        tagged = {e["args"]["platform"] for e in events if e["name"] == name}
+        assert tagged == platforms
+    libraries = {e["args"]["library"] for e in events if e["name"] == "xcframework"}
+    assert libraries == {"libalpha", "libbeta"}
+
+    # All phases are within the full build
+    (root,) = [event for event in events if event["name"] == "iosBuild"]
+    for event in events:
+        assert root["ts"] <= event["ts"]
+        assert event["ts"] + event["dur"] <= root["ts"] + root["dur"]
+
+
+def testBuildTraceFailure(tmp_path, monkeypatch):
+    fail_file = os.path.join(tmp_path, "fail")
+    open(fail_file, "w").close()
+    monkeypatch.setenv("IOS_BUILD_FAKE_FAIL", fail_file)
+    options = buildOptions(tmp_path)
+
+    # The trace is written when the build fails
+    with pytest.raises(CMakeError):
+        build.runBuild(print_level=-1, **options)
+
+    with open(options["trace_file"]) as f:
+        events = spans(json.load(f))
+    errors = {event["name"] for event in events if "error" in event["args"]}
+    assert errors == {"iosBuild", "build"}
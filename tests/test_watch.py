@@ -0,0 +1,204 @@
+import os
+import json
+import time
+import pytest
+import threading
+
+from ios_build import watch
+from ios_build.printer import Printer
+
+TOOLS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tools")
+
+
+def createProject(path):
+    """
+    Create a CMake project containing two libraries in `path`.
+    """
+    os.makedirs(path)
+    with open(os.path.join(path, "CMakeLists.txt"), "w") as f:
+        f.write("add_library(alpha alpha.c)\n")
+        f.write("add_subdirectory(beta)\n")
+    with open(os.path.join(path, "alpha.c"), "w") as f:
+        f.write("int alpha() { return 1; }\n")
+    os.makedirs(os.path.join(path, "beta"))
+    with open(os.path.join(path, "beta", "CMakeLists.txt"), "w") as f:
+        f.write("add_library(beta beta.c)\n")
+    with open(os.path.join(path, "beta", "beta.c"), "w") as f:
+        f.write("int beta() { return 2; }\n")
+
+
+def watchOptions(tmp_path, printer, **kwargs):
+    toolchain = os.path.join(tmp_path, "ios.toolchain.cmake")
+    with open(toolchain, "w") as f:
+        f.write("# toolchain\n")
+
+    return {
+        "path": os.path.join(tmp_path, "project"),
+        "build_prefix": os.path.join(tmp_path, "build"),
+        "install_prefix": os.path.join(tmp_path, "install"),
+        "output_dir": os.path.join(tmp_path, "output"),
+        "toolchain": toolchain,
+        "platforms": ["OS64", "SIMULATORARM64"],
+        "cmake_command": os.path.join(TOOLS, "cmake"),
+        "xcode_build_command": os.path.join(TOOLS, "xcodebuild"),
+        "watch_interval": 0.05,
+        "watch_debounce": 0.05,
+        "printer": printer,
+        **kwargs,
+    }
+
+
+def readLog(log_file):
+    with open(log_file) as f:
+        return [json.loads(line) for line in f]
+
+
+def waitFor(condition, timeout=30):
+    end = time.time() + timeout
+    while not condition():
+        assert time.time() < end, "Timed out"
+        time.sleep(0.05)
+
+
+def testLibraryDigests(tmp_path):
+    for name, contents in [("a", "1"), ("b", "2")]:
+        with open(os.path.join(tmp_path, name), "w") as f:
+            f.write(contents)
+
+    libraries = {"lib": {"OS64": os.path.join(tmp_path, "a")}}
+    digests = watch.libraryDigests(libraries)
+    assert list(digests) == ["lib"]
+
+    assert watch.libraryDigests(libraries) == digests
+    libraries["lib"]["SIMULATORARM64"] = os.path.join(tmp_path, "b")
+    assert watch.libraryDigests(libraries) != digests
+
+
+@pytest.mark.parametrize("print_level", range(-1, 3))
+def testWaitForChanges(tmp_path, print_level):
+    project = os.path.join(tmp_path, "project")
+    createProject(project)
+    index_file = os.path.join(tmp_path, "index.json")
+    state = watch.fingerprint.fingerprint(project, index_file=index_file)
+
+    stop = threading.Event()
+    result = {}
+
+    def wait():
+        result["state"] = watch.waitForChanges(
+            project,
+            state,
+            index_file=index_file,
+            watch_interval=0.05,
+            watch_debounce=0.2,
+            stop=stop,
+            printer=Printer(print_level=print_level),
+        )
+
+    thread = threading.Thread(target=wait)
+    thread.start()
+
+    # A burst of changes is reported once
+    time.sleep(0.1)
+    with open(os.path.join(project, "alpha.c"), "a") as f:
+        f.write("// edit\n")
+    with open(os.path.join(project, "gamma.c"), "w") as f:
+        f.write("int gamma();\n")
+    thread.join(timeout=10)
+
+    assert not thread.is_alive()
+    assert result["state"].digest != state.digest
+    assert result["state"].changed == ["alpha.c", "gamma.c"]
+
+    # Stopping returns None
+    stop.set()
+    assert watch.waitForChanges(project, result["state"], stop=stop) is None
+
+
+@pytest.mark.parametrize("print_level", range(-1, 3))
+def testWatchBuild(tmp_path, monkeypatch, capfd, print_level):
+    log_file = os.path.join(tmp_path, "log.jsonl")
+    monkeypatch.setenv("IOS_BUILD_FAKE_LOG", log_file)
+    createProject(os.path.join(tmp_path, "project"))
+    printer = Printer(print_level=print_level)
+    options = watchOptions(tmp_path, printer, clean=True)
+
+    stop = threading.Event()
+    result = {}
+
+    def run():
+        result["builds"] = watch.watchBuild(stop=stop, **options)
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    try:
+        output = options["output_dir"]
+        alpha = os.path.join(output, "libalpha.xcframework")
+        beta = os.path.join(output, "libbeta.xcframework")
+        waitFor(lambda: os.path.isdir(alpha) and os.path.isdir(beta))
+        waitFor(
+            lambda: "Watching for changes" in capfd.readouterr().out or print_level < 0
+        )
+
+        calls = readLog(log_file)
+        assert calls[0] == ["cmake", "--version"]
+        assert calls[1] == ["xcodebuild", "-version"]
+        assert sum(1 for call in calls if "-S" in call) == 2
+        assert sum(1 for call in calls if "-create-xcframework" in call) == 2
+
+        # Only the changed library is recreated, configuration is skipped
+        # even though the first build was clean
+        beta_mtime = os.stat(os.path.join(beta, "Info.plist")).st_mtime_ns
+        open(log_file, "w").close()
+        with open(os.path.join(tmp_path, "project", "alpha.c"), "a") as f:
+            f.write("int alpha2() { return 3; }\n")
+
+        def rebuilt():
+            calls = readLog(log_file)
+            return any("-create-xcframework" in call for call in calls)
+
+        waitFor(rebuilt)
+        waitFor(
+            lambda: "Watching for changes" in capfd.readouterr().out or print_level < 0
+        )
+    finally:
+        stop.set()
+        thread.join(timeout=10)
+    assert not thread.is_alive()
+    assert result["builds"] == 2
+
+    calls = readLog(log_file)
+    assert not any("--version" in call or "-version" in call for call in calls)
+    assert not any("-S" in call for call in calls)
+    assert sum(1 for call in calls if "--build" in call) == 2
+    frameworks = [call[-1] for call in calls if "-create-xcframework" in call]
+    assert frameworks == [alpha]
+    assert os.stat(os.path.join(beta, "Info.plist")).st_mtime_ns == beta_mtime
+
+
+@pytest.mark.parametrize("print_level", range(-1, 3))
+def testWatchBuildErrors(tmp_path, monkeypatch, capfd, print_level):
+    createProject(os.path.join(tmp_path, "project"))
+    options = watchOptions(tmp_path, Printer(print_level=print_level))
+
+    # Setup errors are raised
+    with pytest.raises(watch.IOSBuildError, match="Unable to find toolchain"):
+        watch.watchBuild(**{**options, "toolchain": "missing.cmake"})
+
+    # Build errors are reported and the next change is built
+    fail_file = os.path.join(tmp_path, "fail")
+    open(fail_file, "w").close()
+    monkeypatch.setenv("IOS_BUILD_FAKE_FAIL", fail_file)
+
+    def waitForChanges(state, **kwargs):
+        os.remove(fail_file)
+        return state._replace(digest="changed", changed=["alpha.c"])
+
+    monkeypatch.setattr(watch, "waitForChanges", waitForChanges)
+    assert watch.watchBuild(max_builds=2, **options) == 2
+    assert os.path.isdir(os.path.join(options["output_dir"], "libalpha.xcframework"))
+
+    captured = capfd.readouterr()
+    if print_level >= 0:
+        assert "Build 1 failed" in captured.out
+        assert "Build 2 complete" in captured.out